@@ -2,94 +2,340 @@ import os
 import sys
 import shutil
 import json
+import threading
+import multiprocessing
 
+from utils.trackers import StartupTimer
+
+# Set `enabled=True` to print how long each stage of the startup takes
+startupTimer = StartupTimer(enabled=False)
 
 from tkinter import Tk, Menu, BooleanVar
+from tkinter.messagebox import showinfo, askyesno, showwarning
 
 from window.widgets import WorldQuestFrame, QuestDetailsFrame, FilterFrame
+from window.quest_view import QuestView, questViewCache, questLoader
 from utils.file_functions import load_json
-
-from lib.quest_extract.download_gui import (
-    download,
-    reFetchWorldQuestsAndDownload,
-    download_data_prompt,
+from utils.app_context import AppContext
+from utils.data_generations import (
+    GENERATION_POINTER,
+    collect_generations,
+    changed_quest_files,
+    read_current_generation,
 )
+from utils.data_writer import TEMP_SUFFIX
+from utils.file_watcher import FileWatcher, is_affected
+from lib.quest_index.reward_matrix import RewardMatrix, build_reward_matrix
+from lib.quest_extract.integrity import RepairPlan, pinned_images, pinned_pages, verify_data
+from utils.cache_manager import imageStore, pageCache
+from utils.startup_snapshot import (
+    load_startup_snapshot,
+    read_startup_snapshot,
+    save_startup_snapshot,
+    remove_startup_snapshot,
+    quest_files_fingerprint,
+    source_fingerprints,
+)
+
+# The downloader (requests, bs4, lxml) is slow to import and only needed on demand,
+# so `lib.quest_extract.download_gui` is imported by the functions that use it
+
+startupTimer.mark("imports")
 
 
 class App(Tk):
-    def __init__(self, basepath: str, *args, **kwargs):
+    def __init__(self, context: AppContext, *args, **kwargs):
         # Initialize the Tkinter window
         super().__init__(*args, **kwargs)
         # Hide the window
         self.withdraw()
 
-        # Set environment variables
-        os.environ["basePath"] = basepath
-        os.environ["dataPath"] = os.path.join(basepath, "data")
-        os.environ["baseQuestPath"] = os.path.join(os.environ["dataPath"], "quests")
-        os.environ["currentSelectedQuestPath"] = os.environ["baseQuestPath"]
-
-        os.environ["imgPath"] = os.path.join(os.environ["dataPath"], "img")
-        os.environ["cachePath"] = os.path.join(basepath, "cache")
-        os.environ["bkp"] = os.path.join(basepath, "bkp")
-        os.environ["worldQuestSeriesData"] = os.path.join(
-            os.environ["dataPath"], "quests"
-        )
-        os.environ["questLoadingErrorFlag"] = "False"
+        # Paths and state of the app
+        self.context = context
 
         # Set icon
-        if os.path.exists(os.path.join(os.environ["basePath"], "icon.ico")):
-            self.iconbitmap(os.path.join(os.environ["basePath"], "icon.ico"))
+        if os.path.exists(os.path.join(context.basePath, "icon.ico")):
+            self.iconbitmap(os.path.join(context.basePath, "icon.ico"))
 
-        # File paths
-        os.environ["worldQuestDataDict"] = os.path.join(
-            os.environ["dataPath"], "worldQuestDataDict.json"
-        )
+        self.rewardMatrix = None
 
         # Check for the existence of the data folder
-        if not os.path.exists(os.environ["worldQuestSeriesData"]):
-            download_data_prompt(tk_window=self)
+        if not os.path.exists(context.baseQuestPath):
+            self.download_data_prompt()
 
-        self.worldQuestDataDict = load_json(
-            os.path.join(os.environ["dataPath"], "worldQuestDataDict.json")
-        )
-        self.completedQuestData = load_json(
-            os.path.join(os.environ["dataPath"], "completedQuestData.json")
-        )
+        self.worldQuestDataDict = load_json(context.worldQuestDataDictPath)
 
         # Check if the worldQuestDataDict is empty
         if self.worldQuestDataDict == {}:
-            download_data_prompt(tk_window=self)
+            self.download_data_prompt()
+            self.worldQuestDataDict = load_json(context.worldQuestDataDictPath)
 
         # Get the regions
         self.regions = list(self.worldQuestDataDict["regions"].keys())
-
-        with open(
-            os.path.join(os.environ["dataPath"], "completedQuestData.json"),
-            "r",
-            encoding="utf-8",
-        ) as file:
-            completedQuestData = json.load(file)
-        for region in self.worldQuestDataDict["regions"]:
-            if region not in completedQuestData:
-                completedQuestData[region] = {"series": {}, "single": []}
-        with open(
-            os.path.join(os.environ["dataPath"], "completedQuestData.json"),
-            "w",
-            encoding="utf-8",
-        ) as file:
-            json.dump(completedQuestData, file, indent=4)
+        self.add_missing_regions()
+        # Remove the generations left by earlier downloads
+        collect_generations(context.dataPath, [context.generation], context.cachePath, keepStaging=True)
+        startupTimer.mark("data")
 
         # Initialize the window
         self.initialize()
         # Place the widgets
         self.place_widgets()
-        # Load the quests
-        self.filterFrame.update()
+        startupTimer.mark("widgets")
+        # Load the quests, from the startup snapshot if it is up to date
+        if not self.show_startup_snapshot():
+            self.filterFrame.update()
+            self.save_startup_snapshot()
         self.filterFrame.set_expand_button(False)
         self.filterFrame.set_back_button(False)
+        # Downloads switch the context to a new generation, which is then loaded without restarting
+        self.loadedQuestPath = context.baseQuestPath
+        context.generationListeners.append(self.generation_changed)
+        # Files changed by other programs (another download, a sync tool) are shown without reloading everything
+        self.fileWatcher = None
+        self.WATCH_POLL_MS = 250
+        self.watch_data()
+        self.after(self.WATCH_POLL_MS, self.check_data_changes)
+        startupTimer.mark("quest list")
         # Show the window
         self.deiconify()
+        self.after_idle(self.after_first_paint)
+
+    def add_missing_regions(self):
+        """Adds the regions of the dataset that are missing from `completedQuestData.json`."""
+        self.completedQuestData = load_json(self.context.completedQuestDataPath)
+        # The file only has to be rewritten if a region is missing from it
+        missingRegions = [
+            region
+            for region in self.worldQuestDataDict["regions"]
+            if region not in self.completedQuestData
+        ]
+        if missingRegions:
+            for region in missingRegions:
+                self.completedQuestData[region] = {"series": {}, "single": []}
+            with open(self.context.completedQuestDataPath, "w", encoding="utf-8") as file:
+                json.dump(self.completedQuestData, file, indent=4)
+
+    def generation_changed(self, context: AppContext):
+        # The previous generation is removed once the switch is done, so its quest files are compared now
+        oldQuestPath = self.loadedQuestPath
+        self.loadedQuestPath = context.baseQuestPath
+        changed = changed_quest_files(oldQuestPath, context.baseQuestPath)
+        self.watch_data()
+        self.after_idle(self.reload_data, oldQuestPath, changed)
+
+    def watch_data(self):
+        """Watches the quest files of the current generation, the progress file and the generation pointer."""
+        if self.fileWatcher is not None:
+            self.fileWatcher.stop()
+        self.fileWatcher = FileWatcher([(self.context.dataPath, False), (self.context.baseQuestPath, True)])
+
+    def check_data_changes(self):
+        self.after(self.WATCH_POLL_MS, self.check_data_changes)
+        changed = {path for path in self.fileWatcher.poll() if not path.endswith(TEMP_SUFFIX)}
+        if not changed:
+            return
+
+        if os.path.join(self.context.dataPath, GENERATION_POINTER) in changed:
+            generation = read_current_generation(self.context.dataPath)
+            if generation != self.context.generation:
+                # Another process downloaded a new generation, `generation_changed` reloads everything that differs
+                self.context.use_generation(generation)
+                return
+
+        questFiles = {path for path in changed if is_affected(path, {self.context.baseQuestPath})}
+        if questFiles:
+            questViewCache.invalidate_changed(questFiles)
+            # The indexes were built from the previous files, they are built again when needed
+            self.rewardMatrix = None
+            for path in [self.context.searchIndexPath, self.context.rewardMatrixPath]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.worldQuestFrame.refresh_files(questFiles)
+            self.questDetailsFrame.refresh_files(questFiles, self.show_loaded_quest)
+
+        progressChanged = self.context.completedQuestDataPath in changed and (
+            load_json(self.context.completedQuestDataPath) != self.worldQuestFrame.completedQuestData
+        )
+        if progressChanged:
+            self.worldQuestFrame.refresh_states()
+        if questFiles or progressChanged:
+            self.save_startup_snapshot()
+
+    def reload_data(self, oldQuestPath: str, changed: set):
+        """Loads the dataset generation the context is using, after a download switched it.
+
+        `changed` are the quest files (relative to the quests folders) that differ from the
+        generation in `oldQuestPath`. Only the views showing them are reloaded.
+        """
+        self.worldQuestDataDict = load_json(self.context.worldQuestDataDictPath)
+        regions = list(self.worldQuestDataDict["regions"].keys())
+        self.add_missing_regions()
+        # The prepared views of the quests that did not change are kept
+        self.rewardMatrix = None
+        questViewCache.rebase(oldQuestPath, self.context.baseQuestPath, changed)
+        self.context.questLoadingError = False
+
+        if regions != self.regions:
+            self.regions = regions
+            self.filterFrame.set_regions(regions)
+
+        region = self.worldQuestFrame.get_region()
+        if not self.worldQuestFrame.searchMode and region is not None and region not in regions:
+            # The shown region is gone, show the first region
+            self.questDetailsFrame.reset()
+            self.worldQuestFrame.set_data(self.worldQuestDataDict["regions"])
+            self.filterFrame.update()
+            self.filterFrame.set_expand_button(False)
+            self.filterFrame.set_back_button(False)
+        else:
+            self.worldQuestFrame.swap_data(self.worldQuestDataDict["regions"], oldQuestPath, changed)
+            self.questDetailsFrame.swap_generation(oldQuestPath, changed, self.show_loaded_quest)
+            if not self.worldQuestFrame.searchMode and self.context.at_region_root():
+                self.filterFrame.set_back_button(False)
+        self.save_startup_snapshot()
+
+    def data_fingerprints(self) -> dict:
+        return source_fingerprints(
+            self.context.worldQuestDataDictPath, self.context.completedQuestDataPath
+        )
+
+    def after_first_paint(self):
+        startupTimer.mark("first paint")
+        startupTimer.report()
+        self.verify_data()
+
+    def verify_data(self):
+        """Checks the quest files and images in the background, and offers to repair them if any are missing or broken."""
+        result = []
+        generation = self.context.generation
+        regions = self.worldQuestDataDict["regions"]
+
+        def check():
+            plan = verify_data(self.context)
+            result.append(plan)
+            # The pins are only known if the quests could be checked
+            if plan.catalogueReadable:
+                self.trim_caches(regions, plan)
+
+        thread = threading.Thread(target=check, daemon=True)
+        thread.start()
+        self.after(100, self.check_verification, thread, result, generation)
+
+    def trim_caches(self, regions: dict, plan: RepairPlan):
+        """Keeps the page cache and the images in their budgets, keeping the ones of the current quests."""
+        try:
+            pinnedPages = pinned_pages(self.context, regions)
+        except (OSError, ValueError):
+            return
+        pageCache.enforce(pinnedPages)
+        imageStore.enforce(pinned_images(plan))
+
+    def check_verification(self, thread: threading.Thread, result: list, generation: str | None):
+        if thread.is_alive():
+            self.after(100, self.check_verification, thread, result, generation)
+            return
+        # The plan is of a generation that is no longer used
+        if not result or result[0].is_empty() or generation != self.context.generation:
+            return
+        plan = result[0]
+        if askyesno("Repair Resources", f"{plan.summary()}\n\nDownload them again now?"):
+            self.menu_repair(plan)
+
+    def show_startup_snapshot(self) -> bool:
+        """Lists the quests from the startup snapshot. Returns False if there is no up to date snapshot."""
+        region, shownQuests = self.filterFrame.get_filter()
+        snapshot = load_startup_snapshot(
+            self.context.startupSnapshotPath,
+            self.regions,
+            region,
+            shownQuests,
+            self.data_fingerprints(),
+        )
+        if snapshot is None:
+            return False
+        self.change_region(region, reload=False)
+        self.change_shown_types(shownQuests, reload=False)
+        self.worldQuestFrame.show_rows(snapshot["rows"])
+
+        # Check the quest files of the region in the background
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.append(
+                quest_files_fingerprint(os.path.join(self.context.baseQuestPath, region))
+            ),
+            daemon=True,
+        )
+        thread.start()
+        self.after(50, self.check_startup_snapshot, thread, result, snapshot)
+        return True
+
+    def check_startup_snapshot(self, thread: threading.Thread, result: list, snapshot: dict):
+        if thread.is_alive():
+            self.after(50, self.check_startup_snapshot, thread, result, snapshot)
+            return
+        if result and result[0] == snapshot["questFiles"]:
+            return
+        # Only reload if the snapshot's rows are still shown, other lists were read from the quest files
+        if (
+            self.worldQuestFrame.get_region() == snapshot["filter"]["region"]
+            and self.worldQuestFrame.shown_quests == snapshot["filter"]["shownQuests"]
+            and self.worldQuestFrame.get_rows() is not None
+        ):
+            self.worldQuestFrame.reload()
+        self.save_startup_snapshot()
+
+    def save_startup_snapshot(self):
+        """Saves the quests shown at startup: the first region, with every quest type shown."""
+        region, shownQuests = self.regions[0], self.filterFrame.questTypes[0]
+        rows = None
+        if (
+            self.worldQuestFrame.get_region() == region
+            and self.worldQuestFrame.shown_quests == shownQuests
+        ):
+            rows = self.worldQuestFrame.get_rows()
+        if rows is None:
+            # The rows are not shown, so reuse the saved rows if the quest files have not changed
+            snapshot = read_startup_snapshot(self.context.startupSnapshotPath)
+            if (
+                snapshot is not None
+                and snapshot["regions"] == self.regions
+                and snapshot["filter"] == {"region": region, "shownQuests": shownQuests}
+                and snapshot["questFiles"]
+                == quest_files_fingerprint(os.path.join(self.context.baseQuestPath, region))
+            ):
+                rows = self.worldQuestFrame.update_row_states(region, snapshot["rows"])
+        if rows is None:
+            remove_startup_snapshot(self.context.startupSnapshotPath)
+            return
+
+        save_startup_snapshot(
+            self.context.startupSnapshotPath,
+            self.regions,
+            region,
+            shownQuests,
+            rows,
+            self.data_fingerprints(),
+            self.context.baseQuestPath,
+        )
+
+    def show_cache_usage(self):
+        lines = []
+        for label, cache in [("Wiki pages", pageCache), ("Images", imageStore)]:
+            stats = cache.stats()
+            hitRate = f"{stats['hitRate']:.0%}" if stats["hitRate"] is not None else "n/a"
+            lines.append(
+                f"{label}: {stats['entries']} entries, {stats['size'] / 1024 / 1024:,.1f} of "
+                f"{stats['budget'] / 1024 / 1024:,.0f} MiB, hit rate {hitRate}"
+            )
+        showinfo("Cache Usage", "\n".join(lines))
+
+    def download_data_prompt(self):
+        from lib.quest_extract.download_gui import download_data_prompt
+
+        download_data_prompt(self.context, tk_window=self)
 
     def initialize(self):
         # Initialize the window
@@ -115,7 +361,8 @@ class App(Tk):
             variable=self.convert_axp_to_mora,
         )
         self.fileMenu.add_separator()
-        self.fileMenu.add_command(label="Repair Resources", command=self.menu_download)
+        self.fileMenu.add_command(label="Repair Resources", command=self.menu_repair)
+        self.fileMenu.add_command(label="Cache Usage", command=self.show_cache_usage)
         self.fileMenu.add_command(
             label="Re-Download Resources",
             command=self.menu_reFetchWorldQuestsAndDownload,
@@ -125,35 +372,44 @@ class App(Tk):
         self.menu.add_cascade(label="File", menu=self.fileMenu)
 
         self.menu.add_command(label="Mark Complete", command=self.mark_complete)
+        self.menu.add_command(
+            label="Remaining Rewards", command=self.show_remaining_rewards
+        )
         self.menu.add_separator()
 
         self.config(menu=self.menu)
 
     def toggle_axp_mora_convert(self):
+        self.questDetailsFrame.finish_loading()
         self.questDetailsFrame.set_axp_mora_convert(self.convert_axp_to_mora.get())
         # Reload the current quest to update the rewards display
         currentQuestID = self.questDetailsFrame.get_id()
         self.change_loaded_quest(currentQuestID)
 
-    def menu_download(self):
-        download()
-        self.worldQuestFrame.reload()
-        os.environ["questLoadingErrorFlag"] = "False"
+    # The downloads switch the context to the new generation, which `reload_data` then shows
+    def menu_repair(self, plan: RepairPlan = None):
+        from lib.quest_extract.download_gui import repair
+
+        repair(self.context, plan)
 
     def menu_reFetchWorldQuestsAndDownload(self):
-        reFetchWorldQuestsAndDownload()
-        self.worldQuestFrame.reload()
-        os.environ["questLoadingErrorFlag"] = "False"
+        from lib.quest_extract.download_gui import reFetchWorldQuestsAndDownload
+
+        reFetchWorldQuestsAndDownload(self.context)
 
     def place_frames(self):
         self.worldQuestFrame = WorldQuestFrame(
             self,
+            self.context,
             self.worldQuestDataDict["regions"],
             bg="black",
             width=int(self.size[0] / 4),
             height=int(self.size[1]),
             select_listbox=self.change_loaded_quest,
             double_click=self.expand_world_quest,
+            prefetch=lambda paths: questLoader.prefetch(
+                paths, self.convert_axp_to_mora.get(), self.context.imgPath
+            ),
         )
 
         # Filter options (Area, search ect...)
@@ -166,9 +422,11 @@ class App(Tk):
             update_type_command=self.change_shown_types,
             open_world_quest_command=self.expand_world_quest,
             back_world_quest_command=self.collapse_world_quest,
+            search_command=self.search_quests,
         )
         self.questDetailsFrame = QuestDetailsFrame(
             self,
+            self.context,
             bg="white",
             width=int(self.size[0] / 4 * 3),
             height=int(self.size[1] / 8 * 7),
@@ -181,12 +439,16 @@ class App(Tk):
     def change_loaded_quest(self, questID: str):
         if questID in ["", "None", None]:
             return
+        # Load the new quest details in the background, only the latest selection is shown
+        self.questDetailsFrame.load(
+            self.context.quest_file(questID),
+            on_loaded=self.show_loaded_quest,
+        )
+
+    def show_loaded_quest(self, view: QuestView):
         # Hide the current quest details
         self.questDetailsFrame.grid_forget()
-        # Load the new quest details
-        self.questDetailsFrame.set_data(
-            os.path.join(os.environ["currentSelectedQuestPath"], f"{questID}.json")
-        )
+        self.questDetailsFrame.show_view(view)
         # Disable the expand button if the quest is not a series
         if self.questDetailsFrame.get_type() not in ["series", "act"]:
             self.filterFrame.set_expand_button(False)
@@ -197,6 +459,11 @@ class App(Tk):
         self.questDetailsFrame.grid(row=1, column=1, sticky="se")
 
     def change_region(self, region: str, reload: bool = True):
+        # Changing the region leaves search mode
+        if self.worldQuestFrame.searchMode:
+            self.filterFrame.clear_search()
+            self.worldQuestFrame.end_search(restore_path=False, reload=False)
+            self.filterFrame.set_back_button(False)
         self.worldQuestFrame.set_region(region, reload=reload)
         if reload:
             self.questDetailsFrame.reset()
@@ -206,11 +473,27 @@ class App(Tk):
         if reload:
             self.questDetailsFrame.reset()
 
+    def search_quests(self, query: str):
+        self.worldQuestFrame.search(query)
+        self.questDetailsFrame.reset()
+        self.filterFrame.set_expand_button(False)
+        # The back button is only usable when not searching, and inside of a quest series
+        self.filterFrame.set_back_button(
+            not self.worldQuestFrame.searchMode and not self.context.at_region_root()
+        )
+
     def expand_world_quest(self):
+        # Make sure the details are of the selected quest
+        self.questDetailsFrame.finish_loading()
         # Check if the quest is a series
         if self.questDetailsFrame.get_type() not in ["series", "act"]:
             return
 
+        # Expanding a search result leaves search mode, and moves to the result's region
+        if self.worldQuestFrame.searchMode:
+            self.filterFrame.clear_search()
+            self.filterFrame.set_region_text(self.worldQuestFrame.get_region())
+
         questID = self.questDetailsFrame.get_id()
         self.worldQuestFrame.expand_quest_series(questID)
         self.questDetailsFrame.reset()
@@ -223,19 +506,61 @@ class App(Tk):
         self.worldQuestFrame.collapse_quest_series()
         self.questDetailsFrame.reset()
 
-        # Check if the current path is the base path + a region
-        if os.environ["currentSelectedQuestPath"] in [
-            os.path.join(os.environ["baseQuestPath"], region) for region in self.regions
-        ]:
+        # Check if the current path is the top of a region
+        if self.context.at_region_root():
             self.filterFrame.set_back_button(False)
         self.filterFrame.set_expand_button(False)
 
     def mark_complete(self):
         self.worldQuestFrame.mark_complete()
         self.worldQuestFrame.reload()
+        self.save_startup_snapshot()
+
+    def get_reward_matrix(self):
+        """Returns the reward matrix, with the completion state of the quests up to date."""
+        if self.rewardMatrix is None:
+            self.rewardMatrix = RewardMatrix.load(self.context.rewardMatrixPath)
+        # Datasets downloaded before the reward matrix existed need it to be built once
+        if self.rewardMatrix is None:
+            self.rewardMatrix = build_reward_matrix(
+                self.worldQuestDataDict["regions"],
+                self.context.baseQuestPath,
+                self.context.rewardMatrixPath,
+            )
+        self.rewardMatrix.set_completed(
+            self.worldQuestDataDict["regions"],
+            load_json(self.context.completedQuestDataPath),
+        )
+        return self.rewardMatrix
+
+    def show_remaining_rewards(self):
+        region = self.worldQuestFrame.get_region()
+        rewards = self.get_reward_matrix().remaining_rewards(
+            region, convertXp=self.convert_axp_to_mora.get()
+        )
+        if rewards == []:
+            showinfo("Remaining Rewards", f"There are no rewards left in {region}.")
+            return
+        self.questDetailsFrame.questRewards.rewards_popup(
+            rewards,
+            title=f"Remaining Rewards: {region}",
+            reward_click=lambda reward: self.show_quests_giving(reward["Name"], region),
+        )
+
+    def show_quests_giving(self, itemName: str, region: str):
+        quests = self.get_reward_matrix().quests_giving(itemName, region)
+        lines = [f"{questName}: {amount:,}" for questName, _, _, amount in quests[:25]]
+        if len(quests) > 25:
+            lines.append(f"... and {len(quests) - 25} more")
+        showinfo(
+            itemName,
+            f"Uncompleted quests in {region} that give {itemName}:\n\n" + "\n".join(lines),
+        )
 
 
 if __name__ == "__main__":
+    # The quest upgrade runs in worker processes, which frozen builds start through this script
+    multiprocessing.freeze_support()
     if getattr(sys, "frozen", False):
         loc = os.path.dirname(sys.executable)
         # Change the working directory to the executable directory
@@ -244,12 +569,22 @@ if __name__ == "__main__":
         # Get the directory of the script
         loc = os.path.dirname(os.path.realpath(__file__))
 
-    app = App(loc)
+    context = AppContext(loc)
+    # The data format and the cache budgets can be changed in `data/settings.json`
+    settingsProblems = context.load_settings()
+    # Budgets of the fetched pages and images, trimmed once the data has been checked
+    pageCache.open(context.cachePath, context.pageCacheBudget, context.cacheMaxAge)
+    imageStore.open(context.imgPath, context.imageCacheBudget, context.cacheMaxAge)
+    app = App(context)
+    if settingsProblems:
+        app.after_idle(showwarning, "Settings", "\n".join(settingsProblems) + "\n\nThe default values are used instead.")
     app.mainloop()
+    pageCache.save()
+    imageStore.save()
     # Copy the completedQuestData.json to the backup folder
-    if not os.path.exists(os.environ["bkp"]):
-        os.makedirs(os.environ["bkp"])
+    if not os.path.exists(context.bkpPath):
+        os.makedirs(context.bkpPath)
     shutil.copy(
-        os.path.join(os.environ["dataPath"], "completedQuestData.json"),
-        os.path.join(os.environ["bkp"], "completedQuestData.json"),
+        context.completedQuestDataPath,
+        os.path.join(context.bkpPath, "completedQuestData.json"),
     )
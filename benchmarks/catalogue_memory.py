@@ -0,0 +1,133 @@
+"""
+Memory benchmark of the full quest catalogue.
+
+Loads every quest file of the downloaded data at once, the way the app holds
+them (the parsed quest data and one quest list item per quest), and prints the
+memory it takes, with the steps and rewards as plain dicts and as records.
+
+Each layout is measured in a new process, so they do not share memory.
+
+Usage: python benchmarks/catalogue_memory.py [path to the app folder]
+"""
+
+import os
+import sys
+import json
+import gc
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.quest_data.quest_records import load_quest_data
+from utils.app_context import AppContext
+
+LAYOUTS = ["dicts", "records"]
+
+
+class DictQuestItem:
+    """A quest list item as it was before `__slots__`, with a dict per instance."""
+
+    def __init__(self, questData: dict, path: str) -> None:
+        self.MAX_CHARS = 40
+        self.questName = questData["name"]
+        self.questType = questData["type"]
+        self.filePath = path
+
+
+class RecordQuestItem:
+    """The same item, laid out as the app's quest list items are."""
+
+    __slots__ = ("questName", "questType", "filePath")
+    MAX_CHARS = 40
+
+    def __init__(self, questData: dict, path: str) -> None:
+        self.questName = questData["name"]
+        self.questType = sys.intern(questData["type"])
+        self.filePath = path
+
+
+def quest_files(baseQuestPath: str) -> list:
+    paths = []
+    for folder, _, files in os.walk(baseQuestPath):
+        paths.extend(os.path.join(folder, name) for name in files if name.endswith(".json"))
+    paths.sort()
+    return paths
+
+
+def resident_size() -> int | None:
+    """Resident size of the process in bytes, or None if it cannot be read on this platform."""
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def measure(layout: str, basePath: str) -> dict:
+    paths = quest_files(AppContext(basePath).baseQuestPath)
+    # Read the files first, so only the parsed catalogue is measured
+    contents = []
+    for path in paths:
+        with open(path, "rb") as file:
+            contents.append(file.read())
+
+    parse, itemClass = (json.loads, DictQuestItem) if layout == "dicts" else (load_quest_data, RecordQuestItem)
+
+    gc.collect()
+    rssBefore = resident_size()
+    tracemalloc.start()
+    catalogue = []
+    for path, content in zip(paths, contents):
+        questData = parse(content)
+        catalogue.append((questData, itemClass(questData, path)))
+    gc.collect()
+    traced, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rssAfter = resident_size()
+
+    return {
+        "layout": layout,
+        "quests": len(catalogue),
+        "traced": traced,
+        "peak": peak,
+        "resident": rssAfter - rssBefore if rssBefore is not None else None,
+    }
+
+
+def format_size(size: int | None) -> str:
+    if size is None:
+        return "n/a"
+    return f"{size / 1024:,.0f} KiB"
+
+
+def main(basePath: str):
+    results = []
+    for layout in LAYOUTS:
+        # A new process per layout, so the resident sizes are not mixed up
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--measure", layout, basePath],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        results.append(json.loads(output))
+
+    print(f"Catalogue: {results[0]['quests']} quest files in {AppContext(basePath).baseQuestPath}")
+    print(f"{'Layout':<10}{'Allocated':>14}{'Peak':>14}{'Resident':>14}")
+    for result in results:
+        print(
+            f"{result['layout']:<10}"
+            f"{format_size(result['traced']):>14}"
+            f"{format_size(result['peak']):>14}"
+            f"{format_size(result['resident']):>14}"
+        )
+    if results[0]["traced"]:
+        print(f"Records use {results[1]['traced'] / results[0]['traced']:.0%} of the memory of dicts")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        print(json.dumps(measure(sys.argv[2], sys.argv[3])))
+    else:
+        main(sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
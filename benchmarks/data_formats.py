@@ -0,0 +1,86 @@
+"""
+Size and load time benchmark of the data codecs.
+
+Re-encodes the whole downloaded dataset (every quest file,
+`worldQuestDataDict.json` and `convertIDToNameDict.json`) with each codec
+that is installed, writes it to a temporary folder and prints its total size
+and the time taken to load all of it back, the way the app loads quest files.
+
+Usage: python benchmarks/data_formats.py [path to the app folder] [repeats]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.quest_data.quest_records import load_quest_data, record_to_json
+from utils.app_context import AppContext
+from utils.data_codec import CODECS, read_data, write_data
+
+
+def data_files(context: AppContext) -> list:
+    """Paths of the data files relative to the data folder, the quest files first."""
+    paths = []
+    for folder, _, files in os.walk(context.baseQuestPath):
+        paths.extend(
+            os.path.relpath(os.path.join(folder, name), context.dataPath)
+            for name in files
+            if name.endswith(".json")
+        )
+    paths.sort()
+    for path in [context.worldQuestDataDictPath, context.convertIDToNameDictPath]:
+        if os.path.exists(path):
+            paths.append(os.path.relpath(path, context.dataPath))
+    return paths
+
+
+def load_all(folder: str, paths: list) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        with open(os.path.join(folder, path), "rb") as file:
+            load_quest_data(file.read())
+    return time.perf_counter() - start
+
+
+def main(basePath: str, repeats: int):
+    context = AppContext(basePath)
+    paths = data_files(context)
+    dataset = [read_data(os.path.join(context.dataPath, path)) for path in paths]
+    originalSize = sum(os.path.getsize(os.path.join(context.dataPath, path)) for path in paths)
+
+    print(f"Dataset: {len(paths)} files in {context.dataPath}, {originalSize / 1024:,.0f} KiB as downloaded")
+    results = {}
+    for name, codec in CODECS.items():
+        if not codec.available():
+            results[name] = None
+            continue
+        with tempfile.TemporaryDirectory() as folder:
+            for path, data in zip(paths, dataset):
+                os.makedirs(os.path.dirname(os.path.join(folder, path)), exist_ok=True)
+                write_data(os.path.join(folder, path), data, codec, default=record_to_json)
+            size = sum(os.path.getsize(os.path.join(folder, path)) for path in paths)
+            # Best of `repeats`, the files are in the OS cache after the first run
+            loadTime = min(load_all(folder, paths) for _ in range(repeats))
+        results[name] = (size, loadTime)
+
+    # Compared to the format the files used to be written in
+    baseline = results["json-indent"]
+    print(f"{'Format':<14}{'Size':>12}{'Load':>12}{'Size/load vs json-indent':>28}")
+    for name, result in results.items():
+        if result is None:
+            print(f"{name:<14}not installed (needs `{CODECS[name].module}`)")
+            continue
+        size, loadTime = result
+        print(
+            f"{name:<14}{size / 1024:>8,.0f} KiB{loadTime * 1000:>9.1f} ms"
+            f"{f'{size / baseline[0]:.0%} / {loadTime / baseline[1]:.0%}':>28}"
+        )
+
+if __name__ == "__main__":
+    main(
+        sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
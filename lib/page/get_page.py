@@ -3,12 +3,18 @@ import os
 import time
 from bs4 import BeautifulSoup
 
-def get_local_page(url: str, cachePath:str, refresh: bool = False, retryAmount: int = 10):
-    # Get the base path of the project
+from utils.cache_manager import pageCache
+
+def cached_page_path(url: str, cachePath:str) -> str:
+    """Path of the cached copy of the page at `url`."""
     # Convert the URL to a filename. preserve the directory structure
-    filename = os.path.join(cachePath, f"{url.replace('https://genshin-impact.fandom.com/', '').replace('/', '_')}.html")
+    return os.path.join(cachePath, f"{url.replace('https://genshin-impact.fandom.com/', '').replace('/', '_')}.html")
+
+def get_local_page(url: str, cachePath:str, refresh: bool = False, retryAmount: int = 10):
+    filename = cached_page_path(url, cachePath)
         
     if not refresh and os.path.exists(filename):
+        pageCache.touch(filename, hit=True)
         with open(filename, 'r', encoding='utf-8') as file:
             return file.read()
     else:
@@ -54,9 +60,11 @@ def get_local_page(url: str, cachePath:str, refresh: bool = False, retryAmount:
 
         # Get the modified HTML as a string
         modified_html = str(soup)
+        soup.decompose()
 
         # Write the modified HTML content to the file
         with open(filename, 'w', encoding='utf-8') as file:
             file.write(modified_html)
+        pageCache.touch(filename, hit=False)
 
         return modified_html
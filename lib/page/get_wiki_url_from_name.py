@@ -1,5 +1,8 @@
 import urllib.parse
 
+# The list of every world quest, which the quests are found from
+WORLD_QUEST_LIST_URL = "https://genshin-impact.fandom.com/wiki/World_Quest/List"
+
 def get_wiki_url_from_name(name, conversionRef):
     baseurl = 'https://genshin-impact.fandom.com/wiki/'
     # Construct the URL and url-encode the name
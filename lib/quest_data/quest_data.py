@@ -1,18 +1,25 @@
 from lib.page.get_page import get_local_page
 from lib.page.get_wiki_url_from_name import get_wiki_url_from_name
 from utils.file_functions import get_image_path
+from lib.quest_data.quest_records import QUEST_FORMAT_VERSION, Reward
 
 from bs4 import BeautifulSoup
 
 class Quest:
-    def __init__(self, name:str, basepath:str, conversionRef:dict) -> None:
+    """Extracts the data of a quest from its wiki page.
+
+    The page is only kept while the data is extracted, `cleanup` releases it so
+    a finished quest holds nothing but `quest_data` and `quest_img_urls`.
+    """
+    def __init__(self, name:str, basepath:str, conversionRef:dict, html:str=None) -> None:
         self.quest_url = get_wiki_url_from_name(name, conversionRef)
         self.quest_img_urls = []
-        self.html = get_local_page(self.quest_url, basepath)
+        # The page may already have been read by `getQuest`
+        self.html = html if html is not None else get_local_page(self.quest_url, basepath)
         self.soup = BeautifulSoup(self.html, 'lxml')
 
         self.quest_data = {
-            "version": "1.1", # Version of the quest data (For error checking)
+            "version": QUEST_FORMAT_VERSION, # Version of the quest data (For error checking)
             "type": "",       # Single or Series
             "name": conversionRef[name], # Name of the quest
             "url": self.quest_url, # URL for the quest
@@ -39,6 +46,11 @@ class Quest:
     def cleanup(self) -> None:
         del self.html
         self.html = None
+        # The parsed page links every tag to its parent, decompose breaks the
+        # cycles so it is freed now, not at the next garbage collection
+        if self.soup is not None:
+            self.soup.decompose()
+        self.soup = None
 
     def get_data(self) -> dict:
         return self.quest_data
@@ -53,12 +65,7 @@ def get_quest_rewards(soup:BeautifulSoup):
 
     # Iterate over all card containers
     for card_container in card_containers:
-        current_reward = {
-            "Name": "",
-            "Value": "",
-            "Link": "",
-            "Image": ""
-        }
+        current_reward = Reward()
         outer_span = card_container.select_one('span > span > span:nth-child(1)')
         inner_span = outer_span.select_one('span')
         # Get the amount of the item using the card-text class
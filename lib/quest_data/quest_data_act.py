@@ -2,12 +2,17 @@ from lib.quest_data.quest_data import Quest
 from lib.quest_data.quest_step_processor import extract_steps_from_soup
 
 class QuestAct(Quest):
-    def __init__(self, name:str, basepath:str, questDict:dict, conversionRef:dict) -> None:
-        super().__init__(name, basepath, conversionRef)
+    def __init__(self, name:str, basepath:str, questDict:dict, conversionRef:dict, html:str=None) -> None:
+        super().__init__(name, basepath, conversionRef, html)
         self.quest_data["type"] = "act"
         self.tempQuestDict = questDict
         self.when_created()
         self.cleanup()
+
+    def cleanup(self) -> None:
+        super().cleanup()
+        # Only needed to find the starting location
+        self.tempQuestDict = None
     
     def get_starting_location(self) -> dict[str,str]:
         for region in self.tempQuestDict["regions"]:
@@ -1,8 +1,8 @@
 from lib.quest_data.quest_data import Quest
 
 class QuestPlaceholder(Quest):
-    def __init__(self, name:str, basepath:str, conversionRef:dict) -> None:
-        super().__init__(name, basepath, conversionRef)
+    def __init__(self, name:str, basepath:str, conversionRef:dict, html:str=None) -> None:
+        super().__init__(name, basepath, conversionRef, html)
         self.quest_data["type"] = "series"
         self.when_created()
         self.cleanup()
@@ -1,10 +1,11 @@
 from utils.file_functions import get_image_path
+from lib.quest_data.quest_records import Reward
 from lib.quest_data.quest_data import Quest
 from lib.quest_data.quest_step_processor import extract_steps_from_soup
 
 class QuestSeries(Quest):
-    def __init__(self, name:str, basepath:str, conversionRef:dict) -> None:
-        super().__init__(name, basepath, conversionRef)
+    def __init__(self, name:str, basepath:str, conversionRef:dict, html:str=None) -> None:
+        super().__init__(name, basepath, conversionRef, html)
         self.quest_data["type"] = "series"
         self.when_created()
         self.cleanup()
@@ -23,12 +24,7 @@ class QuestSeries(Quest):
 
         # Iterate over all card containers
         for card_container in card_containers:
-            current_reward = {
-                "Name": "",
-                "Value": "",
-                "Link": "",
-                "Image": ""
-            }
+            current_reward = Reward()
             outer_span = card_container.select_one('span > span > span:nth-child(1)')
             inner_span = outer_span.select_one('span')
             # Get the value of the card using the path span > span > span:nth-child(2) inner text
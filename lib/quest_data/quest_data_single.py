@@ -2,8 +2,8 @@ from lib.quest_data.quest_data import Quest, get_quest_rewards
 from lib.quest_data.quest_step_processor import extract_steps_from_soup
 
 class QuestSingle(Quest):
-    def __init__(self, name:str, basepath:str, conversionRef:dict) -> None:
-        super().__init__(name, basepath, conversionRef)
+    def __init__(self, name:str, basepath:str, conversionRef:dict, html:str=None) -> None:
+        super().__init__(name, basepath, conversionRef, html)
         self.quest_data["type"] = "single"
         self.when_created()
         self.cleanup()
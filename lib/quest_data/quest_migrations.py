@@ -0,0 +1,233 @@
+"""
+Offline upgrades of quest files written in older formats.
+
+Every quest file has the `version` of the format it was written in (files
+without one are `"-1.0"`). `migrate_quests` upgrades the files that are not of
+`QUEST_FORMAT_VERSION`, without downloading anything:
+- through the registered migrations, which upgrade the data of a quest file from
+  one version to the next (`register_migration`)
+- if there is no migration path, by extracting the quest again from its cached
+  wiki page
+
+Files that can do neither (their page is not cached) are left as they are, and
+are reported as outdated by `lib.quest_extract.integrity.verify_data`, so they
+can be downloaded again on their own. Files of a newer format, written by a
+newer version of the app, are reported and never rewritten.
+
+The files are upgraded in parallel, by a pool of processes. Progress is saved
+to `migration.json` in the generation folder, so a stopped upgrade resumes
+where it stopped. The upgraded files are hashed again into the manifest, so
+they are not reported as corrupt.
+"""
+
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from lib.quest_data.quest_records import QUEST_FORMAT_VERSION, is_newer_format, record_to_json
+from lib.quest_extract.integrity import update_manifest
+from utils.app_context import AppContext
+from utils.data_codec import decode_data, get_codec, read_data, write_data
+from utils.data_writer import atomic_write
+from utils.quest_tree import iter_world_quests
+
+# Version of quest files that do not have one
+UNVERSIONED = "-1.0"
+
+# Version -> (next version, function upgrading the data of a quest file to it)
+MIGRATIONS = {}
+
+
+def register_migration(fromVersion: str, toVersion: str):
+    """Decorator, registers a function that upgrades the data (a dict) of a quest file from `fromVersion` to `toVersion`."""
+
+    def register(function: callable) -> callable:
+        MIGRATIONS[fromVersion] = (toVersion, function)
+        return function
+
+    return register
+
+
+def migrate_data(questData: dict) -> dict | None:
+    """Upgrades `questData` to `QUEST_FORMAT_VERSION` through the registered migrations.
+
+    Returns None if there is no migration path from its version.
+    """
+    version = questData.get("version", UNVERSIONED)
+    seen = set()
+    while version != QUEST_FORMAT_VERSION:
+        if version not in MIGRATIONS or version in seen:
+            return None
+        seen.add(version)
+        version, migration = MIGRATIONS[version]
+        questData = migration(questData)
+        questData["version"] = version
+    return questData
+
+
+# Why a quest file was, or was not, upgraded
+FROM_DATA = "data"
+FROM_PAGE = "page"
+NOT_CACHED = "page not cached"
+NEWER = "newer format"
+
+# Set in each worker process by `_init_worker`
+_worker = {}
+
+
+def _init_worker(worldQuestDataDictPath: str, convertIDToNameDictPath: str, cachePath: str, dataFormat: str):
+    _worker["worldQuestData"] = read_data(worldQuestDataDictPath)
+    _worker["conversionRef"] = read_data(convertIDToNameDictPath)
+    _worker["cachePath"] = cachePath
+    _worker["codec"] = get_codec(dataFormat)
+
+
+def _migrate_file(questID: str, path: str) -> tuple:
+    """Upgrades one quest file, in a worker process. Returns `(how, error)`."""
+    # Only needed to read pages, and slow to import
+    from lib.page.get_page import cached_page_path
+    from lib.page.get_wiki_url_from_name import get_wiki_url_from_name
+    from utils.quest_utils import getQuest
+
+    try:
+        with open(path, "rb") as file:
+            questData = decode_data(file.read())
+        if is_newer_format(questData.get("version")):
+            return None, NEWER
+        questData = migrate_data(questData)
+    except (OSError, ValueError, AttributeError):
+        # Unreadable files are extracted again too
+        questData = None
+    if questData is not None:
+        try:
+            write_data(path, questData, _worker["codec"], default=record_to_json)
+        except (OSError, TypeError, ValueError) as e:
+            return None, f"{type(e).__name__}: {e}"
+        return FROM_DATA, None
+
+    conversionRef = _worker["conversionRef"]
+    if questID not in conversionRef or not os.path.exists(
+        cached_page_path(get_wiki_url_from_name(questID, conversionRef), _worker["cachePath"])
+    ):
+        return None, NOT_CACHED
+    try:
+        quest = getQuest(questID, _worker["worldQuestData"], _worker["cachePath"], conversionRef)
+        questData = quest.quest_data
+        del quest
+        write_data(path, questData, _worker["codec"], default=record_to_json)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+    return FROM_PAGE, None
+
+
+def read_progress(path: str) -> dict | None:
+    """Reads the progress of an upgrade, returns None if there is none to resume."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            progress = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(progress, dict) or progress.get("target") != QUEST_FORMAT_VERSION:
+        return None
+    return progress
+
+
+def save_progress(path: str, progress: dict):
+    atomic_write(path, json.dumps(progress, indent=4).encode("utf-8"))
+
+
+def outdated_quests(context: AppContext) -> list:
+    """Returns `(key, steps, questID)` of the quest files that are not of the current format, `key` being `steps/questID`."""
+    regions = read_data(context.worldQuestDataDictPath)["regions"]
+    outdated = []
+    for steps, questID in iter_world_quests(regions):
+        path = context.quest_file(questID, steps)
+        try:
+            with open(path, "rb") as file:
+                version = decode_data(file.read()).get("version", UNVERSIONED)
+        except FileNotFoundError:
+            # Missing files are downloaded by the repair, not upgraded
+            continue
+        except (OSError, ValueError, AttributeError):
+            version = None
+        if version != QUEST_FORMAT_VERSION:
+            outdated.append(("/".join([*steps, questID]), steps, questID))
+    return outdated
+
+
+def update_upgraded_manifest(context: AppContext, progress: dict):
+    """Hashes the upgraded quest files into the manifest of the generation."""
+    if not progress["done"]:
+        return
+    regions = read_data(context.worldQuestDataDictPath)["regions"]
+    # Progress keys are `steps/questID`, manifest keys are the file names
+    update_manifest(context, regions, {f"{key}.json" for key in progress["done"]}, {}, set())
+
+
+def migrate_quests(context: AppContext, workers: int = None, saveEvery: int = 16):
+    """Generator. Upgrades the quest files of the current generation, yielding the same progress
+    updates as `Download.allData`. Its result (`StopIteration.value`) is the progress dict:
+    `{"target", "pending", "done", "failed", "newer"}`, by `steps/questID`. `newer` are the files
+    of a newer format, which are left as they are.
+    """
+    progressPath = context.migrationProgressPath
+    progress = read_progress(progressPath)
+    if progress is None or not progress["pending"]:
+        # Nothing to resume, look for the outdated files
+        progress = {"target": QUEST_FORMAT_VERSION, "pending": [], "done": {}, "failed": {}, "newer": {}}
+        progress["pending"] = [[key, steps, questID] for key, steps, questID in outdated_quests(context)]
+    # Progress saved before files of a newer format were reported
+    progress.setdefault("newer", {})
+    jobs = [
+        (key, steps, questID)
+        for key, steps, questID in progress["pending"]
+        if key not in progress["done"] and key not in progress["failed"] and key not in progress["newer"]
+    ]
+
+    yield {"action": "update", "regionCount": 1}
+    yield {"action": "update", "regionChange": "Upgrade"}
+    yield {"action": "update", "questType": "upgrade", "questCount": len(jobs)}
+    if not jobs:
+        progress["pending"] = []
+        save_progress(progressPath, progress)
+        update_upgraded_manifest(context, progress)
+        return progress
+    save_progress(progressPath, progress)
+
+    completed = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(context.worldQuestDataDictPath, context.convertIDToNameDictPath, context.cachePath, context.dataFormat),
+    ) as pool:
+        futures = {
+            pool.submit(_migrate_file, questID, context.quest_file(questID, steps)): (key, steps, questID)
+            for key, steps, questID in jobs
+        }
+        try:
+            for future in as_completed(futures):
+                key, steps, questID = futures[future]
+                try:
+                    how, error = future.result()
+                except Exception as e:
+                    # The worker process died, the other files are still upgraded
+                    how, error = None, f"{type(e).__name__}: {e}"
+                if how is not None:
+                    progress["done"][key] = how
+                elif error == NEWER:
+                    progress["newer"][key] = error
+                else:
+                    progress["failed"][key] = error
+                completed += 1
+                if completed % saveEvery == 0:
+                    save_progress(progressPath, progress)
+                yield {"action": "download", "region": steps[0], "questType": "upgrade", "questName": questID}
+        finally:
+            # Stopped (the generator was closed) or done, the upgraded files are kept either way
+            for future in futures:
+                future.cancel()
+            if completed == len(jobs):
+                progress["pending"] = []
+            save_progress(progressPath, progress)
+            update_upgraded_manifest(context, progress)
+    return progress
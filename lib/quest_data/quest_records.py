@@ -0,0 +1,143 @@
+"""
+Compact records for the steps and rewards of a quest.
+
+A quest file holds hundreds of small step and reward dicts, each repeating the
+same keys. The records keep their fields in `__slots__` instead, and intern the
+fields that repeat across quests (tags, reward names, links and image names),
+so loading many quests keeps one copy of each.
+
+The records can be read like the dicts they replace (`step["tag"]`,
+`"img" in step`, `reward.get("Link")`), and are written to the quest files in
+the same format, with `record_to_json` as the `default` of the data codec.
+"""
+
+import sys
+
+from utils.data_codec import decode_data
+
+# Version of the quest file format, written in the `version` of every quest file
+QUEST_FORMAT_VERSION = "1.1"
+
+
+def is_newer_format(version) -> bool:
+    """Returns True if `version` is a quest file format written by a newer version of the app."""
+    try:
+        return tuple(map(int, str(version).split("."))) > tuple(map(int, QUEST_FORMAT_VERSION.split(".")))
+    except ValueError:
+        return False
+
+# The tags of a step
+STEP_TAGS = ("h", "p", "li", "ul", "ol")
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Record:
+    """Base of the records. `FIELDS` are the keys of the dict the record replaces, in the order they are written."""
+
+    __slots__ = ()
+    FIELDS = ()
+    # Fields whose values are shared between quests
+    INTERNED = ()
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        if key in self.INTERNED:
+            value = _intern(value)
+        setattr(self, key, value)
+
+    def __delitem__(self, key: str):
+        self[key] = None
+
+    def __contains__(self, key: str) -> bool:
+        # Fields that are None are left out of the quest file
+        return key in self.FIELDS and getattr(self, key) is not None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_json()!r})"
+
+    def get(self, key: str, default=None):
+        return self[key] if key in self else default
+
+    def keys(self) -> list:
+        return [key for key in self.FIELDS if key in self]
+
+    def to_json(self) -> dict:
+        return {key: getattr(self, key) for key in self.keys()}
+
+    @classmethod
+    def from_json(cls, data: dict):
+        record = cls.__new__(cls)
+        for key in cls.FIELDS:
+            record[key] = data.get(key)
+        return record
+
+
+class Step(Record):
+    """A step of a quest.
+
+    - `h` and `p` steps, and `li` items have `text`, and `img` if the text has images
+    - `ul` and `ol` steps have `steps`, the items and nested lists
+    """
+
+    __slots__ = ("tag", "text", "img", "steps")
+    FIELDS = ("tag", "text", "img", "steps")
+    INTERNED = ("tag",)
+
+    def __init__(self, tag: str, text: str = None, img: dict = None, steps: list = None) -> None:
+        self["tag"] = tag
+        self["text"] = text
+        self["img"] = img
+        self["steps"] = steps
+
+    def __setitem__(self, key: str, value):
+        if key == "img" and value is not None:
+            # Image IDs and names are shared between steps
+            value = {_intern(imgID): _intern(name) for imgID, name in value.items()}
+        super().__setitem__(key, value)
+
+
+class Reward(Record):
+    """A reward of a quest, e.g. `Reward("Mora", "20,000", link, "Item_Mora.png", "3")`."""
+
+    __slots__ = ("Name", "Value", "Link", "Image", "Rarity")
+    FIELDS = ("Name", "Value", "Link", "Image", "Rarity")
+    INTERNED = ("Name", "Value", "Link", "Image", "Rarity")
+
+    def __init__(self, Name: str = "", Value: str = "", Link: str = "", Image: str = "", Rarity: str = None) -> None:
+        self["Name"] = Name
+        self["Value"] = Value
+        self["Link"] = Link
+        self["Image"] = Image
+        self["Rarity"] = Rarity
+
+    def copy(self):
+        return Reward.from_json(self)
+
+
+def record_to_json(value):
+    """`default` of `json.dump` and the data codecs, writes records as the dicts they replace."""
+    if isinstance(value, Record):
+        return value.to_json()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _record_hook(data: dict):
+    if "tag" in data:
+        return Step.from_json(data)
+    if "Name" in data and "Image" in data:
+        return Reward.from_json(data)
+    return data
+
+
+def load_quest_data(content: bytes) -> dict:
+    """Parses the content of a quest file (in any of the data codecs), with its steps and rewards as records."""
+    return decode_data(content, object_hook=_record_hook)
@@ -7,6 +7,7 @@ QuestSeries, and QuestAct classes.
 """
 
 from utils.file_functions import get_image_path, name_to_id
+from lib.quest_data.quest_records import Step
 
 
 def process_step_images(tag, quest_img_urls):
@@ -76,14 +77,10 @@ def process_text_step(tag_type, tag, quest_img_urls):
         quest_img_urls: List to append image URLs to
     
     Returns:
-        dict: Structured step data
+        Step: Structured step data
     """
-    # Initialize the step dictionary
-    step_dict = {
-        "tag": tag_type,
-        "text": None,
-        "img": {}
-    }
+    # Initialize the step record
+    step_dict = Step(tag_type)
     
     # Remove any span with the class "mobile-only"
     for span in tag.select('span.mobile-only'): 
@@ -93,8 +90,7 @@ def process_text_step(tag_type, tag, quest_img_urls):
     stepItems = tag.select('span.item')
 
     # Process images in stepItems
-    step_images = process_step_images(tag, quest_img_urls)
-    step_dict["img"].update(step_images)
+    step_dict["img"] = process_step_images(tag, quest_img_urls)
 
     # Format all anchor tags in the step using markdown
     process_step_links(tag, stepItems)
@@ -120,12 +116,9 @@ def process_list_step(tag_type, tag, quest_img_urls, use_scope_selector=True):
         use_scope_selector: Whether to use :scope selector for direct children
     
     Returns:
-        dict: Structured step data with nested substeps
+        Step: Structured step data with nested substeps
     """
-    internal_step_dict = {
-        "tag": tag_type,
-        "steps": []
-    }
+    internal_step_dict = Step(tag_type, steps=[])
 
     # Select list items - use different selectors based on quest type
     if use_scope_selector:
@@ -173,7 +166,7 @@ def extract_steps_from_soup(soup, quest_img_urls, quest_name, quest_type="single
         quest_type: Type of quest ("single", "series", "act")
     
     Returns:
-        list: List of structured step data
+        list: List of structured step data (`Step` records)
     """
     step_list = []
     correct_area = False
@@ -203,7 +196,7 @@ def extract_steps_from_soup(soup, quest_img_urls, quest_name, quest_type="single
         # If we're in the correct section, process the tag
         if correct_area:
             if tag.name in ["h2", "h3"]:
-                step_list.append({"tag": "h", "text": tag.get_text()})
+                step_list.append(Step("h", tag.get_text()))
             elif tag.name == "p":
                 step_list.append(process_text_step("p", tag, quest_img_urls))
             elif tag.name in ["ol", "ul"]:
@@ -1,16 +1,18 @@
 from bs4 import BeautifulSoup
 from copy import deepcopy
-import json
 
 from datetime import datetime
 
 from lib.page.get_page import get_local_page
+from lib.page.get_wiki_url_from_name import WORLD_QUEST_LIST_URL
 from utils.file_functions import name_to_id
+from utils.data_codec import write_data
+from utils.app_context import AppContext
 
 
 class WorldQuestSeriesData:
-    def __init__(self, paths:dict, conversionRef:dict) -> None:
-        self.paths = paths
+    def __init__(self, context:AppContext, conversionRef:dict) -> None:
+        self.context = context
         self.conversionRefFilePath = conversionRef
         self.conversionRef = {}
         self.all_quests = {}
@@ -39,8 +41,7 @@ class WorldQuestSeriesData:
 
     def _internal_getAll(self) -> dict:
         """Requires `_getAllSeries` to be run first to get the quest series."""
-        url = "https://genshin-impact.fandom.com/wiki/World_Quest/List"
-        html = get_local_page(url, self.paths["cachePath"])
+        html = get_local_page(WORLD_QUEST_LIST_URL, self.context.cachePath)
 
         # Parse the HTML content using BeautifulSoup
         soup = BeautifulSoup(html, 'lxml')
@@ -124,8 +125,7 @@ class WorldQuestSeriesData:
         yield "Getting all world quests"
         self.all_quests = self._internal_getAll()
 
-        with open(self.conversionRefFilePath, 'w', encoding="utf-8") as file:
-            json.dump(self.conversionRef, file, indent=4)
+        write_data(self.conversionRefFilePath, self.conversionRef, self.context.dataCodec)
 
         yield {
             "timeUpdated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
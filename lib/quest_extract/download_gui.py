@@ -1,25 +1,36 @@
 import os
 import sys
-import shutil
 
 from lib.quest_extract.extract_all import Download
-from tkinter import Tk, Label
+from lib.quest_extract.integrity import OUTDATED, RepairPlan, verify_data
+from lib.quest_data.quest_migrations import migrate_quests
+from utils.app_context import AppContext
+from utils.data_generations import (
+    begin_generation,
+    commit_generation,
+    collect_generations,
+    discard_generation,
+    generation_path,
+)
+from tkinter import Tk, Label, TclError
 from tkinter.ttk import Progressbar
 from tkinter.messagebox import askokcancel, showinfo
 
 class DownloadPopup(Tk):
-    def __init__(self, title=None):
+    def __init__(self, context:AppContext, title=None, work=None):
+        """`work(download)` returns the generator to run, `Download.allData` if it is not given."""
         # Create all the necessary folders
-        for key in ["dataPath", "baseQuestPath", "imgPath", "cachePath", "bkp", "worldQuestSeriesData"]:
-            if not os.path.exists(os.environ[key]): os.makedirs(os.environ[key])
-        d = Download()
-        self.generator = d.allData()
+        context.make_folders()
+        d = Download(context)
+        self.generator = work(d) if work is not None else d.allData()
         self.regionCount = next(self.generator)["regionCount"]
         self.currentRegion = 0
         self.currentQuest = 0
         self.currentQuestCount = 0
 
         self.complete = False
+        # What the generator returned
+        self.result = None
         
         super().__init__()
         self.title(title)
@@ -55,84 +66,139 @@ class DownloadPopup(Tk):
                 self.regionBar["value"] = (self.currentRegion / self.regionCount) * 100
                 self.questText.config(text=f"Current Quest ({self.currentQuest}/{self.currentQuestCount}):\n{resp['questName']}")
                 self.questBar["value"] = (self.currentQuest / self.currentQuestCount) * 100
-        except StopIteration:
+        except StopIteration as e:
             self.complete = True
+            self.result = e.value
             # Destroy the window
             self.destroy()
 
     def buttonbox(self):
         return
 
-def download():
-    p = DownloadPopup("Downloading")
-    while True:
-        p.update()
-        p.step()
-        if p.complete: 
-            break
-
-def _cleanup_common_files():
-    """Clean up common files that need to be removed during data refresh."""
-    # Delete the world quest data dictionary
+def _run_popup(p:DownloadPopup) -> bool:
+    """Runs the popup until its generator is done. Returns False if the popup was closed, which stops the generator."""
+    try:
+        while True:
+            p.update()
+            p.step()
+            if p.complete: 
+                return True
+    except TclError:
+        p.generator.close()
+        return False
+
+def _download_generation(context:AppContext, seedQuests:bool, seedQuestList:bool, freshCache:bool=False, title:str="Downloading", work=None) -> bool:
+    """Downloads a new dataset generation in a staging folder and switches `context` to it once it is complete.
+
+    The current generation is left as it is until then, so the app keeps working
+    while the download runs. Returns False if the download did not complete.
+    """
+    staging = begin_generation(context.dataPath, context.generation, seedQuests, seedQuestList)
+    try:
+        stagingContext = context.for_generation(
+            staging,
+            cachePath=os.path.join(generation_path(context.dataPath, staging), "cache") if freshCache else None,
+        )
+        # The popup starts the download (it fetches the quest list), so it may fail too
+        p = DownloadPopup(stagingContext, title, work)
+        completed = _run_popup(p)
+    except Exception:
+        discard_generation(context.dataPath, staging)
+        raise
+    if not completed:
+        # The popup was closed, which stops the download. The current generation is kept
+        discard_generation(context.dataPath, staging)
+        return False
+
+    generation = commit_generation(context.dataPath, staging, context.cachePath)
+    context.use_generation(generation)
+    # The previous generation is no longer used
+    collect_generations(context.dataPath, [generation], context.cachePath)
+    return True
+
+def download(context:AppContext) -> bool:
+    """Downloads the missing quests into a new generation, reusing the quests of the current one."""
+    return _download_generation(context, seedQuests=True, seedQuestList=True)
+
+def reFetchWorldQuestsAndDownload(context:AppContext) -> bool:
+    """Re-fetch world quest data by fetching the world quest list again."""
+    # Delete the world quest list cache
     try: 
-        os.remove(os.environ["worldQuestDataDict"])
+        os.remove(os.path.join(context.cachePath, "wiki_World_Quest_List.html"))
     except FileNotFoundError: 
         pass
-    # Delete the conversion reference
-    try: 
-        os.remove(os.path.join(os.environ["dataPath"], "convertIDToNameDict.json"))
-    except FileNotFoundError: 
-        pass
-
-
-def _download_and_exit():
-    """Download data and exit with success message."""
-    download()
-    showinfo("Done", "Data has been downloaded. Please re-launch the program for the changes to take effect.")
-    sys.exit()
-
-
-def reFetchWorldQuestsAndDownload():
-    """Re-fetch world quest data by clearing specific cache files."""
-    if os.path.exists(os.environ["cachePath"]):
-        # Delete the world quest list cache
-        try: 
-            os.remove(os.path.join(os.environ["cachePath"], "wiki_World_Quest_List.html"))
-        except FileNotFoundError: 
-            pass
-        
-        _cleanup_common_files()
-        _download_and_exit()
-
-
-def resetAndDownload():
-    """Reset all data by clearing cache and data folders completely."""
-    # Delete the cached data folder
-    if os.path.exists(os.environ["cachePath"]): 
-        shutil.rmtree(os.environ["cachePath"])
-    
-    # Delete the data folder (but not the completed quests file)
-    if os.path.exists(os.environ["dataPath"]): 
-        data_path = os.environ["dataPath"]
-        for folder in ["quests", "img"]:
-            folder_path = os.path.join(data_path, folder)
-            if os.path.exists(folder_path):
-                shutil.rmtree(folder_path)
-    
-    _cleanup_common_files()
-    _download_and_exit()
-
-def download_data_prompt(tk_window=None, show_prompt=True):
+    if _download_generation(context, seedQuests=True, seedQuestList=False):
+        showinfo("Done", "Data has been downloaded.")
+        return True
+    return False
+
+
+def resetAndDownload(context:AppContext) -> bool:
+    """Reset all data by downloading every page and quest again, into a new generation."""
+    if _download_generation(context, seedQuests=False, seedQuestList=False, freshCache=True):
+        showinfo("Done", "Data has been downloaded.")
+        return True
+    return False
+
+def _upgrade(context:AppContext) -> dict | None:
+    """Upgrades the quest files of older formats offline, returns the progress (None if it was stopped)."""
+    p = DownloadPopup(context, "Upgrading quests", work=lambda _: migrate_quests(context))
+    if not _run_popup(p):
+        return None
+    return p.result
+
+def upgrade_quests(context:AppContext) -> bool:
+    """Upgrades the quest files of older formats from the data or the cached pages, without downloading them.
+
+    The files that cannot be upgraded offline are offered to be downloaded again.
+    Returns False if the upgrade was stopped.
+    """
+    progress = _upgrade(context)
+    if progress is None:
+        return False
+    if progress["newer"]:
+        showinfo("Upgrading quests", f"{len(progress['newer'])} quest files were written by a newer version of the app, and were left as they are.")
+    if progress["failed"]:
+        repair(context, upgrade=False)
+    return True
+
+def repair(context:AppContext, plan:RepairPlan=None, upgrade:bool=True) -> bool:
+    """Checks the quest files and images, and downloads only the ones that are missing or broken, into a new generation.
+
+    `plan` is the result of `verify_data`, if it has already been run. If `upgrade` is
+    True, quest files of older formats are upgraded offline first, and only the ones
+    that could not be are downloaded.
+    """
+    if plan is None:
+        plan = verify_data(context)
+    if upgrade and any(reason == OUTDATED for *_, reason in plan.quests):
+        if _upgrade(context) is None:
+            return False
+        plan = verify_data(context)
+    if plan.is_empty():
+        showinfo("Repair Resources", "All quest files and images are present and intact.")
+        return False
+    if not askokcancel("Repair Resources", f"{plan.summary()}\n\nDownload them again?"):
+        return False
+    if not plan.catalogueReadable:
+        # Nothing can be checked without the quest list, fetch everything again
+        return reFetchWorldQuestsAndDownload(context)
+    if _download_generation(context, seedQuests=True, seedQuestList=True, title="Repairing", work=lambda d: d.repair(plan)):
+        showinfo("Done", "The missing and broken files have been downloaded again.")
+        return True
+    return False
+
+def download_data_prompt(context:AppContext, tk_window=None, show_prompt=True):
     downloadAutomatic = askokcancel("Error", "World Quest Data is missing. This is either available on the github page or can be generated now. Would you like to generate it now?")
-    if downloadAutomatic:
-        download()
+    # A download that was stopped leaves no data, the app cannot start without it
+    if downloadAutomatic and download(context):
         # Create a temporary top-level window to ensure showinfo is always on top
         temp = Tk()
         temp.withdraw()
         temp.attributes("-topmost", True)
-        showinfo("Done", "Data has been downloaded. Please re-launch the program for the changes to take effect.", parent=temp)
+        showinfo("Done", "Data has been downloaded.", parent=temp)
         temp.destroy()
     else:
         if tk_window is not None: 
             tk_window.quit()
-    sys.exit()
\ No newline at end of file
+        sys.exit()
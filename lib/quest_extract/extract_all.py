@@ -3,18 +3,35 @@ import json
 import requests
 from datetime import datetime
 from lib.quest_extract.all_world_quests import WorldQuestSeriesData
+from lib.quest_index.search_index import build_search_index
+from lib.quest_index.reward_matrix import build_reward_matrix
+from lib.quest_extract.integrity import CORRUPT, RepairPlan, remove_image, update_manifest
 from utils.quest_utils import getQuest
+from lib.quest_data.quest_records import record_to_json
 from utils.file_functions import name_to_id, get_image_path
+from utils.image_functions import has_scaled_images, save_scaled_images
+from utils.app_context import AppContext
+from utils.data_codec import read_data, write_data
+from utils.data_writer import DataWriter
+from utils.cache_manager import imageStore
 
 class Download:
-    def __init__(self, forceUpdate:bool=False):
+    def __init__(self, context:AppContext, forceUpdate:bool=False):
         print("Initializing download object")
 
+        self.context = context
         self.forceUpdate = forceUpdate
 
-        #TODO: When implementing into the app, replace os.environ with os.environ
-
-        self.convertIDToNameDict = os.path.join(os.environ["dataPath"], "convertIDToNameDict.json")
+        self.convertIDToNameDict = context.convertIDToNameDictPath
+        # Kept in memory once they are fetched (or read), so they are not read back from disk
+        self.worldQuestData = None
+        self.convertIDToNameDictOpen = None
+        # Writes the quest files atomically, in batches
+        self.writer = DataWriter()
+        # For the manifest: the quests written (manifest keys), the images downloaded and their addresses
+        self.writtenQuests = set()
+        self.writtenImages = set()
+        self.imageUrls = {}
 
         # Create the files
         if not os.path.exists(self.convertIDToNameDict):
@@ -25,13 +42,14 @@ class Download:
         """`filepath` is the path to the file where the data should be stored
         """
         # Check if the file exists, or if the user wants to force an update
-        if os.path.exists(os.environ["worldQuestDataDict"]) and not self.forceUpdate:
-            with open(os.environ["worldQuestDataDict"], 'r', encoding="utf-8") as file:
-                if json.load(file) != {}:
-                    print("Data already exists. Use `forceUpdate=True` to force update the data")
-                    return
+        if os.path.exists(self.context.worldQuestDataDictPath) and not self.forceUpdate:
+            worldQuestData = read_data(self.context.worldQuestDataDictPath)
+            if worldQuestData != {}:
+                print("Data already exists. Use `forceUpdate=True` to force update the data")
+                self.worldQuestData = worldQuestData
+                return
     
-        questSeriesDataObject = WorldQuestSeriesData(os.environ, self.convertIDToNameDict)
+        questSeriesDataObject = WorldQuestSeriesData(self.context, self.convertIDToNameDict)
         questSeriesData = questSeriesDataObject.getAll()
         
         while True:
@@ -42,31 +60,18 @@ class Download:
                     print(res)
                 # Check if the result is a dictionary
                 elif isinstance(res, dict):
-                    with open(os.path.join(os.environ["worldQuestDataDict"]), 'w', encoding="utf-8") as file:
-                        json.dump(res, file, indent=4)
+                    write_data(self.context.worldQuestDataDictPath, res, self.context.dataCodec)
+                    self.worldQuestData = res
             except StopIteration:
                 break
+        # Written by `getAll` before it returned the quests
+        self.convertIDToNameDictOpen = questSeriesDataObject.conversionRef
 
     def _allWorldQuestsData(self):
         """It is assumed that `allWorldQuests` has been called before this method
         """
-        with open(self.convertIDToNameDict, 'r', encoding="utf-8") as file:
-            self.convertIDToNameDictOpen = json.load(file)
-        def saveQuestData(name:str, path:str, quest=None):
-            # Get the quest data if not provided
-            if quest is None:
-                quest = getQuest(name, worldQuestDataDict, os.environ["cachePath"], self.convertIDToNameDictOpen)
-            # Save the quest data
-            with open(os.path.join(path, name_to_id(name) + ".json"), 'w', encoding="utf-8") as file:
-                json.dump(quest.quest_data, file, indent=4)
-
-
-            if quest.quest_img_urls != []:
-                for url in quest.quest_img_urls:
-                    path = os.path.join(os.environ["imgPath"], get_image_path(url))
-                    if not os.path.exists(path):
-                        self.download_image(url, get_image_path(url))
-        
+        if self.convertIDToNameDictOpen is None:
+            self.convertIDToNameDictOpen = read_data(self.convertIDToNameDict)
         def loopThroughSeries(seriesData:dict, path:str):
             # Loop through the quests
             i = 0
@@ -75,15 +80,14 @@ class Download:
                 # Check if the quest is a single quest
                 if isinstance(quest, str):
                     # Save the quest data
-                    saveQuestData(quest, path)
+                    self.save_quest(quest, path)
                 else:
                     # Get the series name
                     seriesName = f"{quest['name']}"
-                    # Check if the folder exists
-                    if not os.path.exists(os.path.join(path, name_to_id(seriesName))):
-                        os.makedirs(os.path.join(path, name_to_id(seriesName)))
+                    # Create the folder (only checked once per folder)
+                    self.writer.ensure_folder(os.path.join(path, name_to_id(seriesName)))
                     # Replace any spaces with underscores in the immediate path
-                    saveQuestData(seriesName, path)
+                    self.save_quest(seriesName, path)
 
                     
 
@@ -92,13 +96,14 @@ class Download:
                         # Check if the subquest is a single quest
                         if isinstance(subquest, str):
                             # Save the quest data
-                            saveQuestData(subquest, os.path.join(path, name_to_id(seriesName)))
+                            self.save_quest(subquest, os.path.join(path, name_to_id(seriesName)))
                         else:
                             loopThroughSeries(subquest, os.path.join(path, name_to_id(seriesName)))
         
-        # Load worldQuestDataDict
-        with open(os.environ["worldQuestDataDict"], 'r', encoding="utf-8") as file:
-            worldQuestDataDict = json.load(file)
+        # Load worldQuestDataDict, unless `_allWorldQuests` already has it
+        if self.worldQuestData is None:
+            self.worldQuestData = read_data(self.context.worldQuestDataDictPath)
+        worldQuestDataDict = self.worldQuestData
 
         if "timeUpdated" not in worldQuestDataDict: 
             lastUpdated = datetime.now()
@@ -111,59 +116,102 @@ class Download:
         # Yield the number of regions, to be used in the progress bar
         yield {"action": "update", "regionCount": len(self.worldQuestDataDict)}
 
-        # Loop through the regions
-        for region in self.worldQuestDataDict:
-            # Yield the region name, to be used in the progress bar
-            yield {"action": "update", "regionChange": region}
-            # Check if the folder exists
-            if not os.path.exists(os.path.join(os.environ["worldQuestSeriesData"], region)):
+        try:
+            # Loop through the regions
+            for region in self.worldQuestDataDict:
+                # Yield the region name, to be used in the progress bar
+                yield {"action": "update", "regionChange": region}
                 # Create the folder for the current region
-                os.makedirs(os.path.join(os.environ["worldQuestSeriesData"], region))
-            # Loop through the quest types
-            for questType in self.worldQuestDataDict[region]:
-                # Yield the number of quests in the current quest type, to be used in the progress bar
-                yield {"action": "update", "questType": questType, "questCount": len(self.worldQuestDataDict[region][questType])}
-                # Loop through the quests
-                for questName in self.worldQuestDataDict[region][questType]:
-                    # Check if the json file exists
-                    if os.path.exists(os.path.join(os.environ["worldQuestSeriesData"], region, name_to_id(questName) + ".json")) and not self.forceUpdate:
+                self.writer.ensure_folder(os.path.join(self.context.baseQuestPath, region))
+                # Loop through the quest types
+                for questType in self.worldQuestDataDict[region]:
+                    # Yield the number of quests in the current quest type, to be used in the progress bar
+                    yield {"action": "update", "questType": questType, "questCount": len(self.worldQuestDataDict[region][questType])}
+                    # Loop through the quests
+                    for questName in self.worldQuestDataDict[region][questType]:
+                        # Check if the json file exists
+                        if os.path.exists(os.path.join(self.context.baseQuestPath, region, name_to_id(questName) + ".json")) and not self.forceUpdate:
 
-                        yield {
-                            "action": "skip",
-                            "region": region,
-                            "questType": questType,
-                            "questName": questName
-                        }
+                            yield {
+                                "action": "skip",
+                                "region": region,
+                                "questType": questType,
+                                "questName": questName
+                            }
 
-                        continue
+                            continue
                     
-                    yield {
-                            "action": "download",
-                            "region": region,
-                            "questType": questType,
-                            "questName": questName
-                        }
+                        yield {
+                                "action": "download",
+                                "region": region,
+                                "questType": questType,
+                                "questName": questName
+                            }
 
-                    currentPath = os.path.join(os.environ["worldQuestSeriesData"], region)
-                    quest = getQuest(questName, worldQuestDataDict, os.environ["cachePath"], self.convertIDToNameDictOpen)
+                        currentPath = os.path.join(self.context.baseQuestPath, region)
+                        savedType = self.save_quest(questName, currentPath)
+
+                        if savedType in ["series", "act"]:
+                            self.writer.ensure_folder(os.path.join(currentPath, name_to_id(questName)))
+                            try:
+                                loopThroughSeries(self.worldQuestDataDict[region]["series"][questName], os.path.join(currentPath, name_to_id(questName)))
+                            except KeyError:
+                                print(f"Warn > Series '{questName}' not found in '{region}'.", end="\t\t\t\t\t\t\t\t\n")
+        finally:
+            # Rename the last batch of quest files into place, also if the download is stopped
+            self.writer.flush()
+
+    def save_quest(self, name:str, path:str, refresh:bool=False) -> str:
+        """Extracts the quest, writes it and downloads its images. Returns the type of the quest.
+
+        Only the extracted data is kept past this point (the page is released by
+        `Quest.cleanup`), so the series recursion does not hold on to any pages.
+        `refresh` fetches the quest's page again instead of reading it from the cache.
+        """
+        quest = getQuest(name, self.worldQuestData, self.context.cachePath, self.convertIDToNameDictOpen, refresh)
+        questData, questImgUrls = quest.quest_data, quest.quest_img_urls
+        del quest
+        # Save the quest data
+        filePath = os.path.join(path, name_to_id(name) + ".json")
+        write_data(
+            filePath,
+            questData,
+            self.context.dataCodec,
+            default=record_to_json,
+            writer=self.writer,
+        )
+        self.writtenQuests.add(os.path.relpath(filePath, self.context.baseQuestPath).replace(os.sep, "/"))
+
+        for url in questImgUrls:
+            self.download_image(url, get_image_path(url))
+
+        return questData["type"]
 
-                    
-                    saveQuestData(questName, currentPath, quest)
-
-                    if quest.quest_data["type"] in ["series", "act"]:
-                        if not os.path.exists(os.path.join(currentPath, name_to_id(questName))):
-                            os.makedirs(os.path.join(currentPath, name_to_id(questName)))
-                        try:
-                            loopThroughSeries(self.worldQuestDataDict[region]["series"][questName], os.path.join(currentPath, name_to_id(questName)))
-                        except KeyError:
-                            print(f"Warn > Series '{questName}' not found in '{region}'.", end="\t\t\t\t\t\t\t\t\n")
-                        
     def download_image(self, url:str, name:str):
-        path = os.path.join(os.environ["imgPath"], name)
-        if not os.path.exists(path):
-            resp = requests.get(url)
+        """Downloads an image, and saves it pre-scaled to the sizes the UI shows it at."""
+        imgPath = self.context.imgPath
+        self.imageUrls[name] = url
+        if has_scaled_images(imgPath, name):
+            imageStore.touch(os.path.join(imgPath, name), hit=True)
+            return
+        imageStore.touch(os.path.join(imgPath, name), hit=False)
+        self.writtenImages.add(name)
+        path = os.path.join(imgPath, name)
+        # Images downloaded before the pre-scaled copies existed only need to be scaled
+        if os.path.exists(path):
+            with open(path, "rb") as img:
+                content = img.read()
+        else:
+            content = requests.get(url).content
+
+        if save_scaled_images(imgPath, name, content):
+            # The full size image is not used once the scaled copies exist
+            if os.path.exists(path):
+                os.remove(path)
+        elif not os.path.exists(path):
+            # Keep images that cannot be decoded as they are
             with open(path, "wb") as img:
-                img.write(resp.content)
+                img.write(content)
     
     def allData(self):
         # Download placeholder images
@@ -180,3 +228,61 @@ class Download:
                 yield next(generator)
             except StopIteration:
                 break
+
+        # Build the search index from the quests that were just written
+        yield {"action": "update", "buildIndex": "search"}
+        build_search_index(self.worldQuestDataDict, self.context.baseQuestPath, self.context.searchIndexPath)
+        # Build the reward matrix, for the reward totals
+        yield {"action": "update", "buildIndex": "rewards"}
+        build_reward_matrix(self.worldQuestDataDict, self.context.baseQuestPath, self.context.rewardMatrixPath)
+        yield {"action": "update", "buildIndex": "manifest"}
+        update_manifest(self.context, self.worldQuestDataDict, self.writtenQuests, self.imageUrls, self.writtenImages)
+
+    def repair(self, plan:RepairPlan):
+        """Generator. Downloads only the quests and images in `plan` (see `lib.quest_extract.integrity`),
+        yielding the same progress updates as `allData`."""
+        self.worldQuestData = read_data(self.context.worldQuestDataDictPath)
+        self.worldQuestDataDict = self.worldQuestData["regions"]
+        self.convertIDToNameDictOpen = read_data(self.convertIDToNameDict)
+
+        yield {"action": "update", "regionCount": 1}
+        yield {"action": "update", "regionChange": "Repair"}
+        yield {"action": "update", "questType": "repair", "questCount": len(plan.quests) + len(plan.images)}
+
+        # Broken images are removed first, `download_image` skips the images that exist
+        for name in plan.images:
+            remove_image(self.context.imgPath, name)
+        try:
+            for steps, questID, reason in plan.quests:
+                yield {"action": "download", "region": steps[0], "questType": "repair", "questName": questID}
+                path = os.path.join(self.context.baseQuestPath, *steps)
+                self.writer.ensure_folder(path)
+                # A broken quest file may come from a broken page, which is fetched again
+                self.save_quest(questID, path, refresh=reason == CORRUPT)
+        finally:
+            self.writer.flush()
+
+        for name in plan.images:
+            yield {"action": "download", "region": "Repair", "questType": "repair", "questName": name}
+            # Already downloaded again with a repaired quest
+            if has_scaled_images(self.context.imgPath, name) or os.path.exists(os.path.join(self.context.imgPath, name)):
+                continue
+            if name in plan.imageUrls:
+                self.download_image(plan.imageUrls[name], name)
+                continue
+            # Images downloaded before the manifest existed: find the address in a quest that shows it
+            for steps, questID in plan.imageQuests.get(name, [])[:1]:
+                quest = getQuest(questID, self.worldQuestData, self.context.cachePath, self.convertIDToNameDictOpen)
+                for url in quest.quest_img_urls:
+                    if get_image_path(url) == name:
+                        self.download_image(url, name)
+                del quest
+
+        if plan.quests:
+            # The indexes are built from the quest files
+            yield {"action": "update", "buildIndex": "search"}
+            build_search_index(self.worldQuestDataDict, self.context.baseQuestPath, self.context.searchIndexPath)
+            yield {"action": "update", "buildIndex": "rewards"}
+            build_reward_matrix(self.worldQuestDataDict, self.context.baseQuestPath, self.context.rewardMatrixPath)
+        yield {"action": "update", "buildIndex": "manifest"}
+        update_manifest(self.context, self.worldQuestDataDict, self.writtenQuests, self.imageUrls, self.writtenImages)
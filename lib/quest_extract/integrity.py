@@ -0,0 +1,296 @@
+"""
+Integrity checks of the downloaded data, and the plan to repair it.
+
+`verify_data` checks every quest of the catalogue (`worldQuestDataDict.json`)
+and every image the quests show, in parallel:
+- quest files must exist, match their checksum in the manifest, decode, and be
+  of the current quest format
+- images must exist (pre-scaled or as downloaded) and match the manifest
+
+The manifest (`manifest.json`, one per generation) is written at the end of
+every download. It holds the SHA-256 of the quest files and images that were
+downloaded, and the address of every image so it can be downloaded again on
+its own. Files that are not in the manifest (datasets downloaded before it
+existed) are checked by decoding them instead.
+
+`verify_data` returns a `RepairPlan`, and `Download.repair` fetches only what
+is in it.
+"""
+
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.page.get_wiki_url_from_name import WORLD_QUEST_LIST_URL, get_wiki_url_from_name
+from lib.quest_data.quest_records import QUEST_FORMAT_VERSION, is_newer_format, load_quest_data
+from utils.app_context import AppContext
+from utils.data_codec import read_data
+from utils.data_writer import atomic_write
+from utils.image_functions import ICON_SIZES, scaled_image_path
+from utils.quest_tree import iter_world_quests
+
+MANIFEST_VERSION = 1
+
+# Downloaded by `Download.allData`, and shown whatever the quests are
+PLACEHOLDER_IMAGES = {"74.png", "256.png", "!Img_more.png", "!Img_close.png"}
+
+# Why an entry is in a repair plan
+MISSING = "missing"
+CORRUPT = "corrupt"
+OUTDATED = "outdated"
+
+
+def file_checksum(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def quest_key(steps: list, questID: str) -> str:
+    """Key of a quest file in the manifest, its path relative to the quests folder."""
+    return "/".join([*steps, f"{questID}.json"])
+
+
+def image_files(imgPath: str, name: str) -> list:
+    """Paths of the files of an image, relative to `imgPath`: the pre-scaled copies if they exist, else the downloaded image."""
+    scaled = [f"{size}/{name}" for size in ICON_SIZES if os.path.exists(scaled_image_path(imgPath, name, size))]
+    if scaled:
+        return scaled
+    if os.path.exists(os.path.join(imgPath, name)):
+        return [name]
+    return []
+
+
+def remove_image(imgPath: str, name: str):
+    """Removes every file of an image, so it is downloaded again."""
+    for path in [os.path.join(imgPath, name)] + [scaled_image_path(imgPath, name, size) for size in ICON_SIZES]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def quest_images(questData: dict) -> set:
+    """Names of the images shown by a quest: its rewards and the images inside of its steps."""
+    images = set()
+    for reward in questData.get("rewards") or []:
+        if reward.get("Image"):
+            images.add(reward["Image"])
+
+    def add_steps(steps: list):
+        for step in steps or []:
+            if "img" in step:
+                images.update(step["img"].values())
+            if "steps" in step:
+                add_steps(step["steps"])
+
+    add_steps(questData.get("steps"))
+    return images
+
+
+def empty_manifest() -> dict:
+    return {"version": MANIFEST_VERSION, "quests": {}, "images": {}}
+
+
+def read_manifest(path: str) -> dict:
+    """Reads a manifest, returns an empty one if it does not exist or cannot be read."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return empty_manifest()
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest()
+    return manifest
+
+
+def update_manifest(
+    context: AppContext,
+    regions: dict,
+    writtenQuests: set,
+    imageUrls: dict,
+    writtenImages: set,
+    workers: int = None,
+):
+    """Writes the manifest of the generation of `context` after a download.
+
+    The quests in `writtenQuests` (manifest keys) and the images in `writtenImages`
+    are hashed again. Entries that were already in the manifest keep their checksum,
+    so files that were damaged since still do not match; entries that are not in it
+    yet are hashed as they are.
+    """
+    manifest = read_manifest(context.manifestPath)
+    oldQuests, oldImages = manifest["quests"], manifest["images"]
+
+    questJobs = []
+    quests = {}
+    for steps, questID in iter_world_quests(regions):
+        key = quest_key(steps, questID)
+        path = context.quest_file(questID, steps)
+        if key in oldQuests and key not in writtenQuests:
+            quests[key] = oldQuests[key]
+        elif os.path.exists(path):
+            questJobs.append((key, path))
+
+    images = {}
+    imageJobs = []
+    for name in oldImages.keys() | imageUrls.keys():
+        entry = dict(oldImages.get(name, {}))
+        if name in imageUrls:
+            entry["url"] = imageUrls[name]
+        if "files" in entry and name not in writtenImages:
+            images[name] = entry
+            continue
+        entry["files"] = {}
+        images[name] = entry
+        for relative in image_files(context.imgPath, name):
+            imageJobs.append((name, relative))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (key, _), checksum in zip(questJobs, pool.map(lambda job: file_checksum(job[1]), questJobs)):
+            quests[key] = checksum
+        imageChecksums = pool.map(
+            lambda job: file_checksum(os.path.join(context.imgPath, *job[1].split("/"))), imageJobs
+        )
+        for (name, relative), checksum in zip(imageJobs, imageChecksums):
+            images[name]["files"][relative] = checksum
+
+    manifest = {"version": MANIFEST_VERSION, "quests": quests, "images": images}
+    atomic_write(context.manifestPath, json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+
+
+class RepairPlan:
+    """The quests and images that are missing or broken, see `verify_data`."""
+
+    def __init__(self) -> None:
+        # False if `worldQuestDataDict.json` itself cannot be read, everything has to be downloaded
+        self.catalogueReadable = True
+        # (steps, questID, reason)
+        self.quests = []
+        # Image name -> reason
+        self.images = {}
+        # Image name -> address, from the manifest
+        self.imageUrls = {}
+        # Image name -> (steps, questID) of the quests that show it, to find the address of
+        # images that are not in the manifest
+        self.imageQuests = {}
+
+    def is_empty(self) -> bool:
+        return self.catalogueReadable and not self.quests and not self.images
+
+    def summary(self) -> str:
+        if not self.catalogueReadable:
+            return "The list of world quests is missing or cannot be read."
+        lines = []
+        for label, entries in [("quest files", [reason for *_, reason in self.quests]), ("images", list(self.images.values()))]:
+            for reason in [MISSING, CORRUPT, OUTDATED]:
+                count = entries.count(reason)
+                if count:
+                    lines.append(f"{label.capitalize()} {reason}: {count}")
+        return "\n".join(lines)
+
+
+def _check_quest(path: str, checksum: str | None) -> tuple:
+    """Returns `(reason, images)`, `reason` being None if the quest file is intact."""
+    try:
+        with open(path, "rb") as file:
+            content = file.read()
+    except FileNotFoundError:
+        return MISSING, set()
+    except OSError:
+        return CORRUPT, set()
+    if checksum is not None and hashlib.sha256(content).hexdigest() != checksum:
+        return CORRUPT, set()
+    try:
+        questData = load_quest_data(content)
+        images = quest_images(questData)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return CORRUPT, set()
+    # Files of a newer format are left as they are, downloading them again would downgrade them
+    if questData.get("version") != QUEST_FORMAT_VERSION and not is_newer_format(questData.get("version")):
+        return OUTDATED, images
+    return None, images
+
+
+def _check_image(imgPath: str, name: str, entry: dict | None) -> str | None:
+    """Returns why the image is broken, or None if it is intact."""
+    files = image_files(imgPath, name)
+    if not files:
+        return MISSING
+    if entry is not None and entry.get("files"):
+        for relative, checksum in entry["files"].items():
+            path = os.path.join(imgPath, *relative.split("/"))
+            if not os.path.exists(path):
+                return MISSING
+            if file_checksum(path) != checksum:
+                return CORRUPT
+        return None
+
+    # Not in the manifest, check that the image can be decoded
+    from PIL import Image
+
+    for relative in files:
+        try:
+            with Image.open(os.path.join(imgPath, *relative.split("/"))) as image:
+                image.verify()
+        except (OSError, ValueError, SyntaxError):
+            return CORRUPT
+    return None
+
+
+def verify_data(context: AppContext, workers: int = None) -> RepairPlan:
+    """Checks the quest files and images of the current generation, returns what has to be repaired."""
+    plan = RepairPlan()
+    try:
+        regions = read_data(context.worldQuestDataDictPath)["regions"]
+    except (OSError, ValueError, KeyError, TypeError):
+        plan.catalogueReadable = False
+        return plan
+    manifest = read_manifest(context.manifestPath)
+
+    quests = list(iter_world_quests(regions))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(
+            lambda quest: _check_quest(
+                context.quest_file(quest[1], quest[0]), manifest["quests"].get(quest_key(*quest))
+            ),
+            quests,
+        )
+        for (steps, questID), (reason, images) in zip(quests, results):
+            if reason is not None:
+                plan.quests.append((steps, questID, reason))
+            for name in images:
+                plan.imageQuests.setdefault(name, []).append((steps, questID))
+
+        # Only the images that are shown, others may have been removed by the image cache
+        names = sorted(plan.imageQuests.keys() | PLACEHOLDER_IMAGES)
+        reasons = pool.map(lambda name: _check_image(context.imgPath, name, manifest["images"].get(name)), names)
+        for name, reason in zip(names, reasons):
+            if reason is not None:
+                plan.images[name] = reason
+                if manifest["images"].get(name, {}).get("url"):
+                    plan.imageUrls[name] = manifest["images"][name]["url"]
+    return plan
+
+
+def pinned_pages(context: AppContext, regions: dict) -> set:
+    """Names of the cached pages of the current quests (and the quest list), which are kept
+    by the page cache so the quests can be upgraded and repaired offline."""
+    # Only needed here, and slow to import
+    from lib.page.get_page import cached_page_path
+
+    conversionRef = read_data(context.convertIDToNameDictPath)
+    pages = {os.path.basename(cached_page_path(WORLD_QUEST_LIST_URL, context.cachePath))}
+    for _, questID in iter_world_quests(regions):
+        if questID in conversionRef:
+            url = get_wiki_url_from_name(questID, conversionRef)
+            pages.add(os.path.basename(cached_page_path(url, context.cachePath)))
+    return pages
+
+
+def pinned_images(plan: RepairPlan) -> set:
+    """Names of the images shown by the current quests, found by `verify_data`."""
+    return set(plan.imageQuests) | PLACEHOLDER_IMAGES
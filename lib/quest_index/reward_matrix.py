@@ -0,0 +1,196 @@
+"""
+Precomputed quest × item reward matrix.
+
+Built once from the `rewards` lists of the downloaded quests (at the end of a
+download) and saved next to `worldQuestDataDict.json`. Every item is stored as
+a dense column of amounts, one per quest, so totals are computed by masking the
+columns with the selected quests instead of walking the quest files.
+"""
+
+import os
+import re
+import json
+from array import array
+from itertools import compress
+
+from utils.data_codec import read_data
+from utils.quest_tree import iter_world_quests, get_completed_quests
+
+REWARD_MATRIX_VERSION = 1
+
+# Mora given per Adventure EXP when converting Xp to Mora
+XP_MORA_MULTIPLIER = 10
+
+_NUMBER_PATTERN = re.compile(r"\d[\d,]*")
+
+
+def parse_reward_value(value) -> int:
+    """Converts a reward `Value` (e.g. `"10,000"`) to an integer. Values without a number count as 1."""
+    match = _NUMBER_PATTERN.search(str(value))
+    if match is None:
+        return 1
+    return int(match.group().replace(",", ""))
+
+
+class RewardMatrix:
+    def __init__(self, quests: list, items: dict, cells: dict) -> None:
+        # Each quest is `[questName, steps, questID]`
+        self.quests = quests
+        self.questKeys = [tuple(steps) + (questID,) for _, steps, questID in quests]
+        # item name -> {"Image", "Link", "Rarity"} of the first quest that gives it
+        self.items = items
+
+        # One column of amounts per item, indexed by quest
+        self.columns = {}
+        for itemName, entries in cells.items():
+            column = array("q", bytes(8 * len(quests)))
+            for questIndex, amount in zip(entries[::2], entries[1::2]):
+                column[questIndex] += amount
+            self.columns[itemName] = column
+
+        self.regions = {}
+        for questIndex, key in enumerate(self.questKeys):
+            self.regions.setdefault(key[0], []).append(questIndex)
+
+        # Quests are uncompleted until `set_completed` is called
+        self.uncompleted = bytearray(b"\x01" * len(quests))
+
+    @classmethod
+    def build(cls, regions: dict, baseQuestPath: str):
+        """Builds the matrix from the quest files of every region in `regions`."""
+        quests = []
+        items = {}
+        cells = {}
+        for steps, questID in iter_world_quests(regions):
+            path = os.path.join(baseQuestPath, *steps, f"{questID}.json")
+            if not os.path.exists(path):
+                continue
+            questData = read_data(path)
+            if not questData.get("rewards"):
+                continue
+
+            questIndex = len(quests)
+            quests.append([questData["name"], steps, questID])
+            for reward in questData["rewards"]:
+                if reward["Name"] not in items:
+                    items[reward["Name"]] = {
+                        "Image": reward["Image"],
+                        "Link": reward["Link"],
+                        "Rarity": reward["Rarity"],
+                    }
+                cells.setdefault(reward["Name"], []).extend(
+                    [questIndex, parse_reward_value(reward["Value"])]
+                )
+
+        return cls(quests, items, cells)
+
+    def save(self, path: str):
+        # Only the non-zero cells are saved, as [questIndex, amount, questIndex, amount, ...]
+        cells = {
+            itemName: [
+                value
+                for questIndex, amount in enumerate(column)
+                if amount
+                for value in (questIndex, amount)
+            ]
+            for itemName, column in self.columns.items()
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": REWARD_MATRIX_VERSION,
+                    "quests": self.quests,
+                    "items": self.items,
+                    "cells": cells,
+                },
+                file,
+                separators=(",", ":"),
+            )
+
+    @classmethod
+    def load(cls, path: str):
+        """Loads a saved matrix, returns `None` if the file is missing or was written by another matrix version."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != REWARD_MATRIX_VERSION:
+            return None
+        return cls(data["quests"], data["items"], data["cells"])
+
+    def set_completed(self, regions: dict, completedQuestData: dict):
+        """Updates which quests are completed, from the contents of `completedQuestData.json`."""
+        completed = get_completed_quests(regions, completedQuestData)
+        self.uncompleted = bytearray(key not in completed for key in self.questKeys)
+
+    def _selection(self, region: str = None, uncompletedOnly: bool = True) -> bytearray:
+        """Returns a mask of the quests in `region` (or every region), optionally leaving out completed quests."""
+        if region is None:
+            selection = bytearray(b"\x01" * len(self.quests))
+        else:
+            selection = bytearray(len(self.quests))
+            for questIndex in self.regions.get(region, []):
+                selection[questIndex] = 1
+        if uncompletedOnly:
+            # AND the two masks in one go, as big integers
+            selection = bytearray(
+                (int.from_bytes(selection) & int.from_bytes(self.uncompleted)).to_bytes(len(selection))
+            )
+        return selection
+
+    def totals(self, region: str = None, uncompletedOnly: bool = True, itemNames: list = None) -> dict:
+        """Returns `{itemName: total}` for the selected quests, leaving out items with a total of 0."""
+        selection = self._selection(region, uncompletedOnly)
+        result = {}
+        for itemName in itemNames if itemNames is not None else self.columns:
+            if itemName not in self.columns:
+                continue
+            total = sum(compress(self.columns[itemName], selection))
+            if total:
+                result[itemName] = total
+        return result
+
+    def quests_giving(self, itemName: str, region: str = None, uncompletedOnly: bool = True) -> list:
+        """Returns `[(questName, steps, questID, amount)]` of the selected quests that give `itemName`, largest amounts first."""
+        if itemName not in self.columns:
+            return []
+        column = self.columns[itemName]
+        selection = self._selection(region, uncompletedOnly)
+        result = [
+            (*self.quests[questIndex], column[questIndex])
+            for questIndex in compress(range(len(self.quests)), selection)
+            if column[questIndex]
+        ]
+        result.sort(key=lambda quest: -quest[3])
+        return result
+
+    def remaining_rewards(self, region: str = None, convertXp: bool = False) -> list:
+        """Returns the totals of the uncompleted quests as reward dicts, in the same format as a quest's `rewards`."""
+        totals = self.totals(region)
+        items = dict(self.items)
+        if convertXp and "Adventure EXP" in totals:
+            totals["Mora"] = totals.get("Mora", 0) + totals.pop("Adventure EXP") * XP_MORA_MULTIPLIER
+            items.setdefault(
+                "Mora",
+                {
+                    "Link": "https://genshin-impact.fandom.com/wiki/Mora",
+                    "Image": "Item_Mora.png",
+                    "Rarity": "3",
+                },
+            )
+        return [
+            {
+                "Name": itemName,
+                "Value": "{:,}".format(total),
+                "Link": items[itemName]["Link"],
+                "Image": items[itemName]["Image"],
+                "Rarity": items[itemName]["Rarity"],
+            }
+            for itemName, total in sorted(totals.items(), key=lambda item: -item[1])
+        ]
+
+
+def build_reward_matrix(regions: dict, baseQuestPath: str, matrixPath: str) -> RewardMatrix:
+    matrix = RewardMatrix.build(regions, baseQuestPath)
+    matrix.save(matrixPath)
+    return matrix
@@ -0,0 +1,209 @@
+"""
+Inverted index over the downloaded quests, used by the quest search.
+
+The index is built once from the quest files (at the end of a download) and
+saved next to `worldQuestDataDict.json`. Searching only ever touches the
+in-memory index, the quest files are never opened at query time.
+"""
+
+import os
+import re
+import json
+from bisect import bisect_left
+
+from utils.data_codec import read_data
+from utils.quest_tree import iter_world_quests
+
+SEARCH_INDEX_VERSION = 1
+
+# Weight of a match in each of the indexed fields
+FIELD_WEIGHTS = {
+    "name": 8,
+    "location": 4,
+    "rewards": 2,
+    "steps": 1,
+}
+
+_LINK_PATTERN = re.compile(r"◀(.*?)▶◁.*?▷")
+_IMAGE_PATTERN = re.compile(r"<img:[^>]*>")
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+
+def strip_markdown(text: str) -> str:
+    """Removes the link urls and image tags from a quest markdown string, keeping the visible text."""
+    text = _LINK_PATTERN.sub(r"\1", text)
+    return _IMAGE_PATTERN.sub(" ", text)
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _iter_step_text(steps: list):
+    for step in steps:
+        if "steps" in step:
+            yield from _iter_step_text(step["steps"])
+        elif step.get("text"):
+            yield step["text"]
+
+
+def _bounded_edit_distance(a: str, b: str, maxDistance: int) -> int:
+    """Levenshtein distance between `a` and `b`, giving up once it is larger than `maxDistance`."""
+    if abs(len(a) - len(b)) > maxDistance:
+        return maxDistance + 1
+    previous = list(range(len(b) + 1))
+    for i, charA in enumerate(a, 1):
+        current = [i]
+        for j, charB in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (charA != charB),
+                )
+            )
+        if min(current) > maxDistance:
+            return maxDistance + 1
+        previous = current
+    return previous[-1]
+
+
+class QuestSearchIndex:
+    def __init__(self, docs: list, postings: dict) -> None:
+        # Each doc is `[questID, questName, questType, steps]`
+        self.docs = docs
+        # token -> {docIndex: weight}
+        self.postings = postings
+
+        self.tokens = sorted(self.postings)
+        # Tokens grouped by their first character, for the fuzzy matching
+        self.tokensByInitial = {}
+        for token in self.tokens:
+            self.tokensByInitial.setdefault(token[0], []).append(token)
+
+    @classmethod
+    def build(cls, regions: dict, baseQuestPath: str):
+        """Builds the index from the quest files of every region in `regions`."""
+        docs = []
+        postings = {}
+
+        def add_field(docIndex: int, field: str, text: str):
+            for token in tokenize(text):
+                weights = postings.setdefault(token, {})
+                # The field weights are powers of two, so a doc's weight is the sum of the fields the token is in
+                weights[docIndex] = weights.get(docIndex, 0) | FIELD_WEIGHTS[field]
+
+        for steps, questID in iter_world_quests(regions):
+            path = os.path.join(baseQuestPath, *steps, f"{questID}.json")
+            if not os.path.exists(path):
+                continue
+            questData = read_data(path)
+
+            docIndex = len(docs)
+            docs.append([questID, questData["name"], questData["type"], steps])
+
+            add_field(docIndex, "name", questData["name"])
+            if questData.get("starting_location"):
+                add_field(docIndex, "location", strip_markdown(questData["starting_location"]["text"]))
+            for reward in questData.get("rewards") or []:
+                add_field(docIndex, "rewards", reward["Name"])
+            for text in _iter_step_text(questData.get("steps") or []):
+                add_field(docIndex, "steps", strip_markdown(text))
+
+        return cls(docs, postings)
+
+    def save(self, path: str):
+        # Postings are flattened to [docIndex, weight, docIndex, weight, ...] to keep the file small
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": SEARCH_INDEX_VERSION,
+                    "docs": self.docs,
+                    "postings": {
+                        token: [value for item in weights.items() for value in item]
+                        for token, weights in self.postings.items()
+                    },
+                },
+                file,
+                separators=(",", ":"),
+            )
+
+    @classmethod
+    def load(cls, path: str):
+        """Loads a saved index, returns `None` if the file is missing or was written by another index version."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != SEARCH_INDEX_VERSION:
+            return None
+        postings = {
+            token: dict(zip(flat[::2], flat[1::2]))
+            for token, flat in data["postings"].items()
+        }
+        return cls(data["docs"], postings)
+
+    def _prefix_tokens(self, prefix: str) -> list:
+        start = bisect_left(self.tokens, prefix)
+        end = start
+        while end < len(self.tokens) and self.tokens[end].startswith(prefix):
+            end += 1
+        return self.tokens[start:end]
+
+    def _fuzzy_tokens(self, term: str) -> list:
+        if len(term) < 3:
+            return []
+        maxDistance = 1 if len(term) <= 5 else 2
+        return [
+            token
+            for token in self.tokensByInitial.get(term[0], [])
+            if _bounded_edit_distance(term, token, maxDistance) <= maxDistance
+        ]
+
+    def _match_term(self, term: str, fuzzy: bool) -> dict:
+        """Returns `{docIndex: score}` for a single query term."""
+        scores = {}
+        # Exact matches score the full field weight, prefix matches half of it
+        for token in self._prefix_tokens(term):
+            factor = 2 if token == term else 1
+            for docIndex, weight in self.postings[token].items():
+                scores[docIndex] = max(scores.get(docIndex, 0), weight * factor)
+        if scores or not fuzzy:
+            return scores
+        for token in self._fuzzy_tokens(term):
+            for docIndex, weight in self.postings[token].items():
+                scores[docIndex] = max(scores.get(docIndex, 0), weight)
+        return scores
+
+    def search(self, query: str, limit: int = 100, fuzzy: bool = True) -> list:
+        """Returns the docs matching every term of `query`, best matches first.
+
+        Each term matches whole words and word prefixes, and falls back to
+        fuzzy matching (small typos) if nothing starts with it.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        results = None
+        for term in terms:
+            scores = self._match_term(term, fuzzy)
+            if results is None:
+                results = scores
+            else:
+                results = {
+                    docIndex: results[docIndex] + score
+                    for docIndex, score in scores.items()
+                    if docIndex in results
+                }
+            if not results:
+                return []
+
+        ranked = sorted(results, key=lambda docIndex: (-results[docIndex], self.docs[docIndex][1]))
+        return [self.docs[docIndex] for docIndex in ranked[:limit]]
+
+
+def build_search_index(regions: dict, baseQuestPath: str, indexPath: str) -> QuestSearchIndex:
+    index = QuestSearchIndex.build(regions, baseQuestPath)
+    index.save(indexPath)
+    return index
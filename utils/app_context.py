@@ -0,0 +1,173 @@
+import os
+import json
+
+from utils.cache_manager import DEFAULT_IMAGE_BUDGET, DEFAULT_MAX_AGE, DEFAULT_PAGE_BUDGET
+from utils.data_codec import DEFAULT_DATA_FORMAT, Codec, get_codec
+from utils.data_generations import generation_path, read_current_generation
+
+
+class AppContext:
+    """The paths and state of one instance of the app (or of a download).
+
+    Passed to the app, the quest list and the downloader, so several contexts
+    can be used in one process. The quest list's current folder is kept as a
+    stack of the folders below the quests folder, e.g. `["Mondstadt", "series_id"]`.
+    """
+
+    def __init__(self, basePath: str, dataFormat: str = DEFAULT_DATA_FORMAT) -> None:
+        self.basePath = basePath
+        # Codec the downloaded data files are written with, see `utils.data_codec`
+        self.dataFormat = dataFormat
+        self.dataPath = os.path.join(basePath, "data")
+        self.imgPath = os.path.join(self.dataPath, "img")
+        self.cachePath = os.path.join(basePath, "cache")
+        self.bkpPath = os.path.join(basePath, "bkp")
+        # Byte budgets of the page cache and the images, see `utils.cache_manager`
+        self.pageCacheBudget = DEFAULT_PAGE_BUDGET
+        self.imageCacheBudget = DEFAULT_IMAGE_BUDGET
+        self.cacheMaxAge = DEFAULT_MAX_AGE
+
+        # Files shared by every dataset generation
+        self.completedQuestDataPath = os.path.join(self.dataPath, "completedQuestData.json")
+        self.settingsPath = os.path.join(self.dataPath, "settings.json")
+        self.startupSnapshotPath = os.path.join(self.dataPath, "startupSnapshot.json")
+
+        # The dataset generation in use, see `utils.data_generations`. None is the
+        # dataset downloaded before generations existed, kept directly in `data/`
+        self.generation = read_current_generation(self.dataPath)
+        # Called with the context after it has been moved to another generation
+        self.generationListeners = []
+
+        # Set when a quest in the list could not be loaded
+        self.questLoadingError = False
+        # Set once the user has been asked to upgrade quest files of an older format
+        self.questFormatChecked = False
+
+        # The folders between the quests folder and the folder shown in the quest list
+        self.questSteps = []
+
+    # The files of the current generation
+    @property
+    def generationPath(self) -> str:
+        return generation_path(self.dataPath, self.generation)
+
+    @property
+    def baseQuestPath(self) -> str:
+        return os.path.join(self.generationPath, "quests")
+
+    @property
+    def worldQuestDataDictPath(self) -> str:
+        return os.path.join(self.generationPath, "worldQuestDataDict.json")
+
+    @property
+    def convertIDToNameDictPath(self) -> str:
+        return os.path.join(self.generationPath, "convertIDToNameDict.json")
+
+    @property
+    def searchIndexPath(self) -> str:
+        return os.path.join(self.generationPath, "searchIndex.json")
+
+    @property
+    def rewardMatrixPath(self) -> str:
+        return os.path.join(self.generationPath, "rewardMatrix.json")
+
+    @property
+    def manifestPath(self) -> str:
+        return os.path.join(self.generationPath, "manifest.json")
+
+    @property
+    def migrationProgressPath(self) -> str:
+        return os.path.join(self.generationPath, "migration.json")
+
+    def use_generation(self, generation: str | None):
+        """Moves the context to another dataset generation, and tells the listeners."""
+        self.generation = generation
+        for listener in list(self.generationListeners):
+            listener(self)
+
+    def for_generation(self, generation: str, cachePath: str = None):
+        """Returns a new context with the same settings, using `generation` (e.g. a staging
+        generation for a download) and `cachePath` for fetched pages if it is given."""
+        context = AppContext(self.basePath, self.dataFormat)
+        context.generation = generation
+        context.pageCacheBudget = self.pageCacheBudget
+        context.imageCacheBudget = self.imageCacheBudget
+        context.cacheMaxAge = self.cacheMaxAge
+        if cachePath is not None:
+            context.cachePath = cachePath
+        return context
+
+    def load_settings(self) -> list:
+        """Reads the optional settings file (`data/settings.json`), e.g.
+        `{"dataFormat": "msgpack", "pageCacheBudgetMB": 512, "imageCacheBudgetMB": 128, "cacheMaxAgeDays": 90}`.
+
+        Settings that are missing keep their default. Returns the problems found, the
+        settings they are about keep their default too.
+        """
+        try:
+            with open(self.settingsPath, "r", encoding="utf-8") as file:
+                settings = json.load(file)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            return [f"{os.path.basename(self.settingsPath)} cannot be read: {e}"]
+        if not isinstance(settings, dict):
+            return [f"{os.path.basename(self.settingsPath)} must hold an object"]
+
+        problems = []
+        if "dataFormat" in settings:
+            try:
+                get_codec(settings["dataFormat"])
+                self.dataFormat = settings["dataFormat"]
+            except (ValueError, TypeError) as e:
+                problems.append(str(e))
+        # Setting -> (attribute, bytes or seconds per unit)
+        for key, (attribute, unit) in {
+            "pageCacheBudgetMB": ("pageCacheBudget", 1024 * 1024),
+            "imageCacheBudgetMB": ("imageCacheBudget", 1024 * 1024),
+            "cacheMaxAgeDays": ("cacheMaxAge", 24 * 60 * 60),
+        }.items():
+            if key not in settings:
+                continue
+            value = settings[key]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                problems.append(f"'{key}' must be a number, 0 or more")
+                continue
+            setattr(self, attribute, int(value * unit))
+        return problems
+
+    @property
+    def dataCodec(self) -> Codec:
+        return get_codec(self.dataFormat)
+
+    def make_folders(self):
+        """Creates the folders the downloaded data is saved in."""
+        for path in [self.dataPath, self.baseQuestPath, self.imgPath, self.cachePath, self.bkpPath]:
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+    @property
+    def currentSelectedQuestPath(self) -> str:
+        return os.path.join(self.baseQuestPath, *self.questSteps)
+
+    def set_region(self, region: str):
+        self.questSteps = [region]
+
+    def push_step(self, step: str):
+        """Moves the quest list into the quest series (or act) `step`."""
+        self.questSteps.append(step)
+
+    def pop_step(self):
+        """Moves the quest list out of the current quest series (or act)."""
+        if len(self.questSteps) > 1:
+            self.questSteps.pop()
+
+    def at_region_root(self) -> bool:
+        """Returns True if the quest list is showing the top of a region."""
+        return len(self.questSteps) == 1
+
+    def quest_file(self, questID: str, steps: list = None) -> str:
+        """Path of the quest file of `questID`, in the folder `steps` (the current folder if not given)."""
+        if steps is None:
+            steps = self.questSteps
+        return os.path.join(self.baseQuestPath, *steps, f"{questID}.json")
@@ -0,0 +1,178 @@
+"""
+Size budgets for the fetched wiki pages (`cache/`) and the images (`data/img`).
+
+Both folders only ever grew: every page and image that was fetched once stayed
+forever. A `CacheManager` keeps a folder under a byte budget instead:
+- it records when each entry was last used, and the hits and misses of the
+  cache, in an index file kept in the folder
+- `enforce` removes the entries that have not been used for `maxAge`, then the
+  least recently used ones until the folder fits in its budget
+- pinned entries (the pages and images of the quests of the current dataset)
+  are never removed, even if the folder is over budget because of them
+
+An entry is a page file for the page cache, and an image with all of its
+pre-scaled copies for the images.
+"""
+
+import os
+import json
+import time
+import threading
+
+from utils.data_writer import TEMP_SUFFIX, atomic_write
+
+INDEX_NAME = ".cacheIndex.json"
+
+DEFAULT_PAGE_BUDGET = 256 * 1024 * 1024
+DEFAULT_IMAGE_BUDGET = 128 * 1024 * 1024
+# Entries that are not pinned are removed once they have not been used for this long
+DEFAULT_MAX_AGE = 180 * 24 * 60 * 60
+
+
+class CacheManager:
+    """Keeps the files of a folder under a byte budget, see the module docstring.
+
+    `entry_key(relativePath)` returns the entry a file belongs to.
+    """
+
+    def __init__(self, name: str, entry_key: callable = None) -> None:
+        self.name = name
+        self.entry_key = entry_key if entry_key is not None else (lambda relative: relative)
+        # Set by `open`
+        self.folder = None
+        self.budget = None
+        self.maxAge = None
+
+        self.lock = threading.Lock()
+        # Entry -> when it was last used (seconds since the epoch)
+        self.lastUsed = {}
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+
+    def open(self, folder: str, budget: int, maxAge: float = DEFAULT_MAX_AGE):
+        """Manages `folder`, reading its index if it has one."""
+        with self.lock:
+            self.folder = os.path.abspath(folder)
+            self.budget = budget
+            self.maxAge = maxAge
+            self.lastUsed, self.hits, self.misses = {}, 0, 0
+            try:
+                with open(os.path.join(self.folder, INDEX_NAME), "r", encoding="utf-8") as file:
+                    index = json.load(file)
+                self.lastUsed = dict(index["lastUsed"])
+                self.hits, self.misses = int(index["hits"]), int(index["misses"])
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+            self.dirty = False
+
+    def touch(self, path: str, hit: bool):
+        """Records a use of the file at `path`: a hit if it was already cached, a miss if it had to be fetched."""
+        if self.folder is None:
+            return
+        relative = os.path.relpath(os.path.abspath(path), self.folder)
+        # Files of another folder (e.g. the page cache of a reset download)
+        if relative.startswith(os.pardir) or os.path.isabs(relative):
+            return
+        with self.lock:
+            self.lastUsed[self.entry_key(relative)] = time.time()
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.dirty = True
+
+    def scan(self) -> dict:
+        """Returns `{entry: [size, last modified, paths]}` of the files in the folder."""
+        entries = {}
+        for folder, _, files in os.walk(self.folder):
+            for name in files:
+                if name == INDEX_NAME or name.endswith(TEMP_SUFFIX):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entry = entries.setdefault(self.entry_key(os.path.relpath(path, self.folder)), [0, 0.0, []])
+                entry[0] += stat.st_size
+                entry[1] = max(entry[1], stat.st_mtime)
+                entry[2].append(path)
+        return entries
+
+    def enforce(self, pinned: set) -> dict:
+        """Removes the old and least recently used entries that are not `pinned`, until the folder fits
+        in its budget. Returns `{"evicted": entries removed, "freed": bytes removed}`."""
+        if self.folder is None or not os.path.isdir(self.folder):
+            return {"evicted": 0, "freed": 0}
+        entries = self.scan()
+        now = time.time()
+        with self.lock:
+            # Entries that were used are ordered by their last use, others by when they were fetched
+            lastUsed = {key: self.lastUsed.get(key, entries[key][1]) for key in entries}
+
+        evict = []
+        candidates = sorted((key for key in entries if key not in pinned), key=lastUsed.get)
+        total = sum(entry[0] for entry in entries.values())
+        for key in candidates:
+            if self.maxAge is not None and now - lastUsed[key] > self.maxAge:
+                evict.append(key)
+                total -= entries[key][0]
+        for key in candidates:
+            if total <= self.budget:
+                break
+            if key not in evict:
+                evict.append(key)
+                total -= entries[key][0]
+
+        freed = 0
+        for key in evict:
+            for path in entries[key][2]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    # In use, removed by a later call
+                    continue
+            freed += entries[key][0]
+
+        with self.lock:
+            # Forget the entries that no longer exist
+            removed = set(evict) | (self.lastUsed.keys() - entries.keys())
+            for key in removed:
+                self.lastUsed.pop(key, None)
+            self.dirty = True
+        self.save()
+        return {"evicted": len(evict), "freed": freed}
+
+    def stats(self, pinned: set = None) -> dict:
+        """Returns the size and number of entries of the cache, and its hit rate since it was created."""
+        if self.folder is None:
+            return {"size": 0, "entries": 0, "pinned": 0, "budget": 0, "hits": 0, "misses": 0, "hitRate": None}
+        entries = self.scan() if os.path.isdir(self.folder) else {}
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "size": sum(entry[0] for entry in entries.values()),
+            "entries": len(entries),
+            "pinned": len(entries.keys() & pinned) if pinned is not None else None,
+            "budget": self.budget,
+            "hits": hits,
+            "misses": misses,
+            "hitRate": hits / (hits + misses) if hits + misses else None,
+        }
+
+    def save(self):
+        """Writes the index, if it changed."""
+        with self.lock:
+            if self.folder is None or not self.dirty or not os.path.isdir(self.folder):
+                return
+            index = {"lastUsed": self.lastUsed, "hits": self.hits, "misses": self.misses}
+            content = json.dumps(index, separators=(",", ":")).encode("utf-8")
+            self.dirty = False
+        atomic_write(os.path.join(self.folder, INDEX_NAME), content)
+
+
+# The fetched wiki pages, one entry per page
+pageCache = CacheManager("Page")
+# The images, one entry per image with its pre-scaled copies (`74/name`, `20/name`)
+imageStore = CacheManager("Image", entry_key=os.path.basename)
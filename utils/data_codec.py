@@ -0,0 +1,162 @@
+"""
+Encodings of the downloaded data files.
+
+The quest files, `worldQuestDataDict.json` and `convertIDToNameDict.json` are
+written with the codec named by `AppContext.dataFormat`:
+- `"json"`: minified JSON (the default)
+- `"json-indent"`: JSON indented by 4 spaces, the way the files used to be written
+- `"msgpack"`: MessagePack, needs the `msgpack` package
+- `"cbor"`: CBOR, needs the `cbor2` package
+
+The files keep their `.json` names whatever the encoding. `read_data` picks
+the codec from the first byte of the file (every data file holds a map), so a
+dataset can mix files written with different codecs.
+"""
+
+import importlib.util
+import json
+from abc import ABC, abstractmethod
+
+from utils.data_writer import DataWriter, atomic_write
+
+_BOM = b"\xef\xbb\xbf"
+
+
+class Codec(ABC):
+    name = ""
+    # Module needed by the codec, if it is not part of the standard library
+    module = None
+
+    def available(self) -> bool:
+        return self.module is None or importlib.util.find_spec(self.module) is not None
+
+    @abstractmethod
+    def dumps(self, data, default: callable = None) -> bytes:
+        """Encodes `data`. `default` is called with the objects the codec cannot encode, like `json.dump`'s `default`."""
+
+    @abstractmethod
+    def loads(self, content: bytes, object_hook: callable = None):
+        """Decodes `content`. `object_hook` is called with every decoded map, like `json.load`'s `object_hook`."""
+
+    @abstractmethod
+    def sniff(self, firstByte: int) -> bool:
+        """Returns True if a file starting with `firstByte` was written by this codec."""
+
+
+class JsonCodec(Codec):
+    def __init__(self, name: str, indent: int = None) -> None:
+        self.name = name
+        self.indent = indent
+
+    def dumps(self, data, default: callable = None) -> bytes:
+        if self.indent is None:
+            return json.dumps(data, default=default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        return json.dumps(data, default=default, indent=self.indent).encode("utf-8")
+
+    def loads(self, content: bytes, object_hook: callable = None):
+        return json.loads(content, object_hook=object_hook)
+
+    def sniff(self, firstByte: int) -> bool:
+        return firstByte in b"{["
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    module = "msgpack"
+
+    def dumps(self, data, default: callable = None) -> bytes:
+        import msgpack
+
+        return msgpack.packb(data, default=default, use_bin_type=True)
+
+    def loads(self, content: bytes, object_hook: callable = None):
+        import msgpack
+
+        return msgpack.unpackb(content, object_hook=object_hook, raw=False)
+
+    def sniff(self, firstByte: int) -> bool:
+        # fixmap, map 16 or map 32
+        return 0x80 <= firstByte <= 0x8F or firstByte in (0xDE, 0xDF)
+
+
+class CborCodec(Codec):
+    name = "cbor"
+    module = "cbor2"
+
+    def dumps(self, data, default: callable = None) -> bytes:
+        import cbor2
+
+        encode_default = None
+        if default is not None:
+            encode_default = lambda encoder, value: encoder.encode(default(value))
+        return cbor2.dumps(data, default=encode_default)
+
+    def loads(self, content: bytes, object_hook: callable = None):
+        import cbor2
+
+        decode_hook = None
+        if object_hook is not None:
+            # cbor2 5 calls the hook with `(decoder, map)`, cbor2 6 with `(map, immutable)`
+            decode_hook = lambda first, second: object_hook(first if isinstance(first, dict) else second)
+        return cbor2.loads(content, object_hook=decode_hook)
+
+    def sniff(self, firstByte: int) -> bool:
+        # Major type 5 (map)
+        return 0xA0 <= firstByte <= 0xBF
+
+
+# Name -> codec, in the order they are tried when reading
+CODECS = {}
+
+
+def register_codec(codec: Codec):
+    CODECS[codec.name] = codec
+
+
+register_codec(JsonCodec("json"))
+register_codec(JsonCodec("json-indent", indent=4))
+register_codec(MsgpackCodec())
+register_codec(CborCodec())
+
+DEFAULT_DATA_FORMAT = "json"
+
+
+def get_codec(name: str) -> Codec:
+    """Returns the codec called `name`. Raises a ValueError if it does not exist or its package is not installed."""
+    if name not in CODECS:
+        raise ValueError(f"Unknown data format '{name}', expected one of {', '.join(CODECS)}")
+    codec = CODECS[name]
+    if not codec.available():
+        raise ValueError(f"The '{name}' data format needs the `{codec.module}` package")
+    return codec
+
+
+def detect_codec(content: bytes) -> Codec:
+    """Returns the codec `content` was written with."""
+    # JSON files may start with a byte order mark or whitespace
+    stripped = content.removeprefix(_BOM).lstrip()
+    if not stripped:
+        raise ValueError("The data file is empty")
+    for codec in CODECS.values():
+        if codec.sniff(stripped[0]):
+            return codec
+    raise ValueError(f"Unknown data format (first byte {stripped[0]:#04x})")
+
+
+def decode_data(content: bytes, object_hook: callable = None):
+    return detect_codec(content).loads(content, object_hook=object_hook)
+
+
+def read_data(path: str, object_hook: callable = None):
+    """Reads the data file at `path`, in whichever format it was written."""
+    with open(path, "rb") as file:
+        return decode_data(file.read(), object_hook=object_hook)
+
+
+def write_data(path: str, data, codec: Codec, default: callable = None, writer: DataWriter = None):
+    """Writes `data` to `path` atomically, through `writer` if it is given (see `utils.data_writer`)."""
+    content = codec.dumps(data, default=default)
+    if writer is None:
+        atomic_write(path, content)
+    else:
+        writer.write(path, content)
@@ -0,0 +1,202 @@
+"""
+Versioned generations of the downloaded dataset.
+
+A generation is a complete dataset: the quest files, `worldQuestDataDict.json`,
+`convertIDToNameDict.json` and the indexes built from them. Generations are
+kept in `data/generations/<id>`, and `data/generation.json` names the current
+one. Data downloaded before generations existed (directly in `data/`) is the
+"legacy" generation, `None`.
+
+A download builds a new generation in a staging folder
+(`data/generations/<id>.staging`), so the current one is never touched while
+it runs. Once it is complete, `commit_generation` renames it into place and
+atomically replaces `generation.json`, then `collect_generations` removes the
+generations that are no longer used.
+
+The progress file (`completedQuestData.json`), the startup snapshot, the
+images and the fetched wiki pages are shared by every generation.
+"""
+
+import os
+import json
+import shutil
+from datetime import datetime
+
+from utils.data_writer import atomic_write
+
+GENERATIONS_FOLDER = "generations"
+GENERATION_POINTER = "generation.json"
+STAGING_SUFFIX = ".staging"
+
+# The files of a generation, relative to its folder
+GENERATION_FILES = [
+    "worldQuestDataDict.json",
+    "convertIDToNameDict.json",
+    "searchIndex.json",
+    "rewardMatrix.json",
+    "manifest.json",
+    "migration.json",
+]
+# The files that describe the quests, and are fetched again by a re-download
+QUEST_LIST_FILES = ["worldQuestDataDict.json", "convertIDToNameDict.json"]
+
+
+def generation_path(dataPath: str, generation: str | None) -> str:
+    """Folder of `generation`, `None` being the legacy dataset in `dataPath`."""
+    if generation is None:
+        return dataPath
+    return os.path.join(dataPath, GENERATIONS_FOLDER, generation)
+
+
+def read_current_generation(dataPath: str) -> str | None:
+    """Returns the current generation, or `None` if the legacy dataset is used."""
+    path = os.path.join(dataPath, GENERATION_POINTER)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            generation = json.load(file)["generation"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    # Ignore a pointer to a generation that has been removed
+    if not os.path.isdir(generation_path(dataPath, generation)):
+        return None
+    return generation
+
+
+def new_generation_id(dataPath: str) -> str:
+    base = datetime.now().strftime("%Y%m%d-%H%M%S")
+    generation, i = base, 1
+    while os.path.exists(generation_path(dataPath, generation)) or os.path.exists(
+        generation_path(dataPath, generation + STAGING_SUFFIX)
+    ):
+        i += 1
+        generation = f"{base}-{i}"
+    return generation
+
+
+def _link_or_copy(source: str, destination: str):
+    # Hard links make seeding free, files are only ever replaced (never edited) in place
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def begin_generation(dataPath: str, source: str | None, seedQuests: bool, seedQuestList: bool) -> str:
+    """Creates the staging folder of a new generation, returns its name.
+
+    If `seedQuests` is True the quest files of the generation `source` (and their
+    manifest, see `lib.quest_extract.integrity`) are linked into it, so they are
+    not downloaded again. If `seedQuestList` is True the
+    quest list files are as well.
+    """
+    staging = new_generation_id(dataPath) + STAGING_SUFFIX
+    stagingPath = generation_path(dataPath, staging)
+    os.makedirs(os.path.join(stagingPath, "quests"))
+
+    sourcePath = generation_path(dataPath, source)
+    if seedQuests and os.path.exists(os.path.join(sourcePath, "manifest.json")):
+        # The checksums of the seeded quests, and the addresses of the images
+        _link_or_copy(os.path.join(sourcePath, "manifest.json"), os.path.join(stagingPath, "manifest.json"))
+    if seedQuests and os.path.isdir(os.path.join(sourcePath, "quests")):
+        sourceQuests = os.path.join(sourcePath, "quests")
+        for folder, _, files in os.walk(sourceQuests):
+            target = os.path.join(stagingPath, "quests", os.path.relpath(folder, sourceQuests))
+            os.makedirs(target, exist_ok=True)
+            for name in files:
+                if name.endswith(".json"):
+                    _link_or_copy(os.path.join(folder, name), os.path.join(target, name))
+    if seedQuestList:
+        for name in QUEST_LIST_FILES:
+            if os.path.exists(os.path.join(sourcePath, name)):
+                _link_or_copy(os.path.join(sourcePath, name), os.path.join(stagingPath, name))
+    return staging
+
+
+def commit_generation(dataPath: str, staging: str, cachePath: str = None) -> str:
+    """Makes the staged generation the current one, returns its name.
+
+    If the staging folder has its own page cache (a reset), it replaces `cachePath`.
+    """
+    stagingPath = generation_path(dataPath, staging)
+    stagedCache = os.path.join(stagingPath, "cache")
+    if cachePath is not None and os.path.isdir(stagedCache):
+        oldCache = cachePath + ".old"
+        if os.path.exists(cachePath):
+            shutil.rmtree(oldCache, ignore_errors=True)
+            os.replace(cachePath, oldCache)
+        os.replace(stagedCache, cachePath)
+
+    generation = staging.removesuffix(STAGING_SUFFIX)
+    os.replace(stagingPath, generation_path(dataPath, generation))
+    atomic_write(
+        os.path.join(dataPath, GENERATION_POINTER),
+        json.dumps({"generation": generation}).encode("utf-8"),
+    )
+    return generation
+
+
+def discard_generation(dataPath: str, staging: str):
+    """Removes a staged generation that was not completed."""
+    shutil.rmtree(generation_path(dataPath, staging), ignore_errors=True)
+
+
+def collect_generations(dataPath: str, keep: list, cachePath: str = None, keepStaging: bool = False):
+    """Removes every generation that is not in `keep`, and the staging folders left by
+    stopped downloads unless `keepStaging` is True (another download may be running).
+
+    Files that are still open (on Windows) are left, and removed by a later call.
+    """
+    folder = os.path.join(dataPath, GENERATIONS_FOLDER)
+    if os.path.isdir(folder):
+        for name in os.listdir(folder):
+            if keepStaging and name.endswith(STAGING_SUFFIX):
+                continue
+            if name not in keep:
+                shutil.rmtree(os.path.join(folder, name), ignore_errors=True)
+
+    if None not in keep:
+        # The legacy dataset, kept in `data/` itself
+        shutil.rmtree(os.path.join(dataPath, "quests"), ignore_errors=True)
+        for name in GENERATION_FILES:
+            try:
+                os.remove(os.path.join(dataPath, name))
+            except OSError:
+                pass
+
+    if cachePath is not None:
+        shutil.rmtree(cachePath + ".old", ignore_errors=True)
+
+
+def relative_quest_path(path: str, baseQuestPath: str) -> str | None:
+    """Path of the quest file `path` relative to `baseQuestPath`, or `None` if it is not in it."""
+    relative = os.path.relpath(path, baseQuestPath)
+    if relative.startswith(os.pardir) or os.path.isabs(relative):
+        return None
+    return relative
+
+
+def quest_file_stats(baseQuestPath: str) -> dict:
+    """Returns `{relative path: (size, modification time)}` of the quest files in `baseQuestPath`."""
+    stats = {}
+    for folder, _, files in os.walk(baseQuestPath):
+        for name in files:
+            if name.endswith(".json"):
+                path = os.path.join(folder, name)
+                stat = os.stat(path)
+                stats[os.path.relpath(path, baseQuestPath)] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+
+def changed_quest_files(oldQuestPath: str, newQuestPath: str) -> set:
+    """Returns the relative paths of the quest files that were added, removed or changed between two generations.
+
+    Seeded files are hard links (or copies keeping the modification time) of the
+    previous generation's files, so only the files that were downloaded again differ.
+    """
+    oldStats = quest_file_stats(oldQuestPath)
+    newStats = quest_file_stats(newQuestPath)
+    return {
+        path
+        for path in oldStats.keys() | newStats.keys()
+        if oldStats.get(path) != newStats.get(path)
+    }
@@ -0,0 +1,105 @@
+"""
+Atomic writes of the downloaded data files.
+
+Every file is written to a `.tmp` file next to it and renamed over the real
+file once it is complete, so a crashed or cancelled download never leaves a
+half-written data file behind: readers see either the old file or the new one.
+Files still named `.tmp` after a crash are removed the next time their folder
+is written to.
+
+`DataWriter` batches the writes of a download: the temporary files of a batch
+are flushed to disk (fsync) together, renamed, and then their folders are
+flushed, instead of waiting on the disk once per file.
+"""
+
+import os
+
+TEMP_SUFFIX = ".tmp"
+
+
+def _fsync_folder(folder: str):
+    # Makes the renames in `folder` durable. Folders cannot be opened on Windows,
+    # where the rename is already durable once the file has been flushed
+    if os.name != "posix":
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, content: bytes):
+    """Writes `content` to `path`, replacing the file only once `content` is on disk."""
+    tempPath = path + TEMP_SUFFIX
+    with open(tempPath, "wb") as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tempPath, path)
+    _fsync_folder(os.path.dirname(os.path.abspath(path)))
+
+
+class DataWriter:
+    """Writes data files atomically, flushing them to disk in batches of `batchSize`.
+
+    Files are only visible under their real names after `flush`, which is called
+    when a batch is full and must be called once the writes are done (or use the
+    writer as a context manager).
+    """
+
+    def __init__(self, batchSize: int = 32) -> None:
+        self.batchSize = batchSize
+        # (temporary file, path) of the files waiting to be renamed
+        self.pending = []
+        # Folders that are known to exist
+        self.folders = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.flush()
+
+    def ensure_folder(self, folder: str):
+        """Creates `folder` if needed, only touching the disk the first time it is seen."""
+        if folder in self.folders:
+            return
+        os.makedirs(folder, exist_ok=True)
+        # Remove the temporary files left by a crashed download
+        with os.scandir(folder) as scan:
+            for entry in scan:
+                if entry.name.endswith(TEMP_SUFFIX) and entry.is_file():
+                    os.remove(entry.path)
+        self.folders.add(folder)
+
+    def write(self, path: str, content: bytes):
+        self.ensure_folder(os.path.dirname(os.path.abspath(path)))
+        file = open(path + TEMP_SUFFIX, "wb")
+        try:
+            file.write(content)
+            file.flush()
+        except BaseException:
+            file.close()
+            raise
+        self.pending.append((file, path))
+        if len(self.pending) >= self.batchSize:
+            self.flush()
+
+    def flush(self):
+        """Flushes the pending files to disk and renames them to their real names."""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        try:
+            for file, _ in pending:
+                os.fsync(file.fileno())
+        finally:
+            for file, _ in pending:
+                file.close()
+        folders = set()
+        for file, path in pending:
+            os.replace(file.name, path)
+            folders.add(os.path.dirname(os.path.abspath(path)))
+        for folder in folders:
+            _fsync_folder(folder)
@@ -0,0 +1,242 @@
+"""
+Watches the data files for changes made outside of the app.
+
+Files can be replaced while the app is open, by a download run from another
+process or a tool syncing the data folder. `FileWatcher` notices the changes
+with inotify on Linux (through ctypes, so no package is needed), and by
+polling the modification times of the files everywhere else, or once inotify
+cannot watch every folder (e.g. the watch limit is reached).
+
+Changes are collected by a background thread and debounced: `FileWatcher.poll`
+only returns them once no change has been seen for `debounce` seconds, so a
+tool replacing hundreds of files causes a single refresh. `poll` is called
+from the UI thread, which is the only one that touches the widgets.
+"""
+
+import os
+import sys
+import time
+import struct
+import select
+import threading
+import ctypes
+import ctypes.util
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+
+def is_affected(path: str, changed: set) -> bool:
+    """Returns True if `path` is in `changed`, or in one of its folders (a folder means anything in it may have changed)."""
+    if path in changed:
+        return True
+    return any(path.startswith(folder + os.sep) for folder in changed)
+
+
+class InotifyBackend:
+    """Waits for inotify events. Raises an OSError if inotify is not available."""
+
+    def __init__(self, targets: list) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.add_watch = libc.inotify_add_watch
+        self.add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch descriptor -> (folder, recursive)
+        self.watches = {}
+        # Set when a new subfolder could not be watched, its changes would be missed
+        self.failed = False
+        self.roots = [folder for folder, _ in targets]
+        try:
+            for folder, recursive in targets:
+                self.watch(folder, recursive)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def watch(self, folder: str, recursive: bool) -> list:
+        """Watches `folder` (and its subfolders if `recursive`), returns the files found in the new subfolders."""
+        found = []
+        if not os.path.isdir(folder):
+            return found
+        wd = self.add_watch(self.fd, os.fsencode(folder), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {folder}")
+        self.watches[wd] = (folder, recursive)
+        if recursive:
+            for entry in os.scandir(folder):
+                if entry.is_dir(follow_symlinks=False):
+                    found.extend(self.watch(entry.path, True))
+                else:
+                    found.append(entry.path)
+        return found
+
+    def read(self, timeout: float) -> set:
+        """Waits up to `timeout` seconds, returns the paths that changed."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = _EVENT.unpack_from(buffer, offset)
+            name = buffer[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, anything may have changed
+                changed.update(self.roots)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches:
+                continue
+            folder, recursive = self.watches[wd]
+            if not name:
+                # The watched folder itself was removed or moved
+                changed.add(folder)
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            changed.add(path)
+            if recursive and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # New subfolders are watched too, their files may have been written before the watch was added
+                try:
+                    changed.update(self.watch(path, True))
+                except FileNotFoundError:
+                    # Removed already, `path` is reported as changed
+                    pass
+                except OSError:
+                    # E.g. the watch limit is reached, the changes of the subfolder would be missed
+                    self.failed = True
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Compares the sizes and modification times of the files every `interval` seconds."""
+
+    def __init__(self, targets: list, interval: float = 1.0) -> None:
+        self.targets = targets
+        self.interval = interval
+        self.failed = False
+        self.stats = self.scan()
+
+    def scan(self) -> dict:
+        stats = {}
+        for folder, recursive in self.targets:
+            if recursive:
+                for subfolder, _, files in os.walk(folder):
+                    for name in files:
+                        self._stat(os.path.join(subfolder, name), stats)
+            elif os.path.isdir(folder):
+                for entry in os.scandir(folder):
+                    if entry.is_file():
+                        self._stat(entry.path, stats)
+        return stats
+
+    @staticmethod
+    def _stat(path: str, stats: dict):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Removed while scanning
+            return
+        stats[path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def read(self, timeout: float) -> set:
+        time.sleep(max(timeout, self.interval))
+        stats = self.scan()
+        changed = {path for path in stats.keys() | self.stats.keys() if stats.get(path) != self.stats.get(path)}
+        self.stats = stats
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_backend(targets: list):
+    """Returns an inotify backend where it can be used, and a polling backend otherwise."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyBackend(targets)
+        except (OSError, AttributeError):
+            # inotify is not available (e.g. the watch limit is reached), poll instead
+            pass
+    return PollingBackend(targets)
+
+
+class FileWatcher:
+    """Watches `targets`, a list of `(folder, recursive)`, on a background thread."""
+
+    def __init__(self, targets: list, debounce: float = 0.5) -> None:
+        self.debounce = debounce
+        self.targets = targets
+        self.backend = create_backend(targets)
+        self.lock = threading.Lock()
+        # Paths changed since the last `poll`, and when the last change was seen
+        self.pending = set()
+        self.lastChange = 0.0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                try:
+                    changed = self.backend.read(0.25)
+                except OSError:
+                    changed = {folder for folder, _ in self.targets}
+                    self.use_polling()
+                if self.backend.failed:
+                    # Part of the folders is no longer watched, poll them all instead
+                    changed |= {folder for folder, _ in self.targets}
+                    self.use_polling()
+                if changed:
+                    with self.lock:
+                        self.pending.update(changed)
+                        self.lastChange = time.monotonic()
+        finally:
+            self.backend.close()
+
+    def use_polling(self):
+        """Replaces the backend by a polling one, once inotify can no longer watch every folder."""
+        self.backend.close()
+        self.backend = PollingBackend(self.targets)
+
+    def poll(self) -> set:
+        """Returns the paths that changed, once they have stopped changing for `debounce` seconds."""
+        with self.lock:
+            if not self.pending or time.monotonic() - self.lastChange < self.debounce:
+                return set()
+            changed, self.pending = self.pending, set()
+        return changed
+
+    def stop(self):
+        self.stopped.set()
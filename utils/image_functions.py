@@ -0,0 +1,43 @@
+import os
+from io import BytesIO
+
+# Sizes the images are shown at: reward tiles and images inside of the quest steps
+ICON_SIZES = (74, 20)
+
+
+def scaled_image_path(imgPath: str, name: str, size: int) -> str:
+    """Path of the pre-scaled `size`x`size` copy of the image `name`."""
+    return os.path.join(imgPath, str(size), name)
+
+
+def has_scaled_images(imgPath: str, name: str) -> bool:
+    return all(os.path.exists(scaled_image_path(imgPath, name, size)) for size in ICON_SIZES)
+
+
+def find_image(imgPath: str, name: str, size: int) -> str | None:
+    """Returns the pre-scaled copy of the image if it exists, then the original image, then `None`."""
+    path = scaled_image_path(imgPath, name, size)
+    if os.path.exists(path):
+        return path
+    path = os.path.join(imgPath, name)
+    if os.path.exists(path):
+        return path
+    return None
+
+
+def save_scaled_images(imgPath: str, name: str, content: bytes) -> bool:
+    """Saves a copy of the image for each of the `ICON_SIZES`. Returns False if the image could not be decoded."""
+    from PIL import Image
+
+    try:
+        with Image.open(BytesIO(content)) as image:
+            image.load()
+            for size in ICON_SIZES:
+                path = scaled_image_path(imgPath, name, size)
+                if not os.path.exists(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                # Use LANCZOS for high-quality resampling
+                image.resize((size, size), Image.LANCZOS).save(path, format="PNG", optimize=True)
+    except (OSError, ValueError):
+        return False
+    return True
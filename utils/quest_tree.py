@@ -0,0 +1,152 @@
+def _iter_series(steps: list, subquests: list):
+    """Yields the quests inside of a quest series, recursing into acts."""
+    for quest in subquests:
+        if isinstance(quest, dict):
+            yield steps, quest["name"]
+            yield from _iter_series(steps + [quest["name"]], quest["subquests"])
+        else:
+            yield steps, quest
+
+
+def iter_world_quests(regions: dict):
+    """Generator. Walks the `regions` of `worldQuestDataDict.json` in the same layout as `Download` writes the quest files.
+
+    Yields `(steps, questID)`, where `steps` is the list of folders (region, series, act)
+    between the quests folder and the quest's `.json` file.
+    """
+    for region in regions:
+        for seriesID in regions[region]["series"]:
+            yield [region], seriesID
+            yield from _iter_series([region, seriesID], regions[region]["series"][seriesID])
+        for questID in regions[region]["single"]:
+            yield [region], questID
+
+
+def get_progress(regions: dict, completedQuestData: dict) -> tuple:
+    """Returns `(completed, started)`, two sets of `(*steps, questID)` tuples.
+
+    `completed` holds the completed quests. Quest series and acts count as completed
+    when all of their quests are completed. `started` holds the quest series and
+    acts that have an entry in `completedQuestData.json`.
+    """
+    completed = set()
+    started = set()
+    for region in completedQuestData:
+        completed.update((region, questID) for questID in completedQuestData[region]["single"])
+        for seriesID, quests in completedQuestData[region]["series"].items():
+            started.add((region, seriesID))
+            for quest in quests:
+                if isinstance(quest, dict):
+                    started.add((region, seriesID, quest["name"]))
+                    completed.update(
+                        (region, seriesID, quest["name"], questID) for questID in quest["subquests"]
+                    )
+                else:
+                    completed.add((region, seriesID, quest))
+
+    def rollup(key: tuple, subquests: list) -> bool:
+        done = True
+        for quest in subquests:
+            if isinstance(quest, dict):
+                done = rollup(key + (quest["name"],), quest["subquests"]) and done
+            else:
+                done = key + (quest,) in completed and done
+        if done:
+            completed.add(key)
+        return done
+
+    for region in regions:
+        for seriesID in regions[region]["series"]:
+            rollup((region, seriesID), regions[region]["series"][seriesID])
+
+    return completed, started
+
+
+def get_completed_quests(regions: dict, completedQuestData: dict) -> set:
+    """Returns the completed quests as a set of `(*steps, questID)` tuples, see `get_progress`."""
+    return get_progress(regions, completedQuestData)[0]
+
+
+class QuestNode:
+    """A region, quest series, act or quest in the quest tree.
+
+    `kind` is one of `"region"`, `"series"`, `"act"` or `"quest"`. Children are kept
+    in the order of `worldQuestDataDict.json`, quest series before single quests.
+    """
+
+    __slots__ = ("questID", "kind", "parent", "children", "childIndex", "key")
+
+    def __init__(self, questID: str, kind: str, parent=None) -> None:
+        self.questID = questID
+        self.kind = kind
+        self.parent = parent
+        self.children = []
+        # questID -> child node
+        self.childIndex = {}
+        # `(*steps, questID)`, the same keys as `get_progress`. The root's key is empty
+        self.key = parent.key + (questID,) if parent is not None else ()
+
+    @property
+    def steps(self) -> list:
+        """The folders between the quests folder and the node's `.json` file."""
+        return list(self.key[:-1])
+
+    def add_child(self, questID: str, kind: str):
+        node = QuestNode(questID, kind, self)
+        self.children.append(node)
+        self.childIndex[questID] = node
+        return node
+
+    def child(self, questID: str):
+        return self.childIndex.get(questID)
+
+    def is_container(self) -> bool:
+        """Returns True if the node can be expanded in the quest list."""
+        return self.kind in ["region", "series", "act"]
+
+
+class QuestTree:
+    """Tree of every region, quest series, act and quest of `worldQuestDataDict.json`.
+
+    Built once, nodes are looked up by their steps with a single dict lookup.
+    """
+
+    def __init__(self, regions: dict) -> None:
+        self.root = QuestNode(None, "root")
+        # `(*steps, questID)` -> node
+        self.nodes = {}
+
+        for region in regions:
+            regionNode = self._add(self.root, region, "region")
+            for seriesID in regions[region]["series"]:
+                seriesNode = self._add(regionNode, seriesID, "series")
+                self._add_series(seriesNode, regions[region]["series"][seriesID])
+            for questID in regions[region]["single"]:
+                self._add(regionNode, questID, "quest")
+
+    def _add(self, parent: QuestNode, questID: str, kind: str) -> QuestNode:
+        node = parent.add_child(questID, kind)
+        self.nodes[node.key] = node
+        return node
+
+    def _add_series(self, parent: QuestNode, subquests: list):
+        for quest in subquests:
+            if isinstance(quest, dict):
+                actNode = self._add(parent, quest["name"], "act")
+                self._add_series(actNode, quest["subquests"])
+            else:
+                self._add(parent, quest, "quest")
+
+    def find(self, steps: list) -> QuestNode | None:
+        """Returns the node at `steps` (e.g. `[region, seriesID]`), or `None` if it does not exist."""
+        return self.nodes.get(tuple(steps))
+
+    def get_state(self, node: QuestNode, completed: set, started: set) -> str:
+        """Returns the completion state of `node`, using the sets from `get_progress`."""
+        if node.kind == "quest":
+            return "completed" if node.key in completed else "uncompleted"
+        if node.key not in started:
+            return "uncompleted"
+        if node.key in completed:
+            return "completed"
+        return "in_progress"
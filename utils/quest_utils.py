@@ -1,4 +1,4 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
 from lib.quest_data.quest_data_series import QuestSeries
 from lib.quest_data.quest_data_single import QuestSingle
@@ -9,24 +9,24 @@ from lib.page.get_page import get_local_page
 from lib.page.get_wiki_url_from_name import get_wiki_url_from_name
 
 
-def getQuest(name:str, questsDict:dict, basepath:str, conversionRef:dict) -> QuestSeries|QuestSingle|QuestAct|QuestPlaceholder:
-    
+def getQuest(name:str, questsDict:dict, basepath:str, conversionRef:dict, refresh:bool=False) -> QuestSeries|QuestSingle|QuestAct|QuestPlaceholder:
+    """`refresh` fetches the page again instead of reading it from the cache."""
     quest_url = get_wiki_url_from_name(name, conversionRef)
-    html = get_local_page(quest_url, basepath)
+    html = get_local_page(quest_url, basepath, refresh)
 
-    # Parse the HTML content with Beautiful Soup
-    soup = BeautifulSoup(html, 'lxml')
+    # Only the categories are parsed here, the quest parses the whole page
+    soup = BeautifulSoup(html, 'lxml', parse_only=SoupStrainer('div', class_="page-header__categories"))
     soup = soup.select_one('div[class="page-header__categories"]')
     # Find all <a> tags in the page
     tags = soup.find_all('a')
     # Loop through all <a> tags
     for tag in tags:
         if "World Quest Series" in tag.text:
-            return QuestSeries(name, basepath, conversionRef)
+            return QuestSeries(name, basepath, conversionRef, html)
         if "World Quest Acts" in tag.text:
             #return QuestSeries(name, basepath)
-            return QuestAct(name, basepath, questsDict, conversionRef)
+            return QuestAct(name, basepath, questsDict, conversionRef, html)
         elif "World Quest" in tag.text:
-            return QuestSingle(name, basepath, conversionRef)
+            return QuestSingle(name, basepath, conversionRef, html)
 
-    return QuestPlaceholder(name, basepath, conversionRef)
\ No newline at end of file
+    return QuestPlaceholder(name, basepath, conversionRef, html)
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Startup snapshot of the quest list.
+
+Holds what the window shows when it opens: the region list, the filter state
+and the rows of the first region (quest ID, name, type and completion state),
+so the first frame is drawn from one small file instead of every quest file
+of the region. The snapshot is written after each download and progress
+change.
+
+It is only used if the fingerprints (modification time and size) of
+`worldQuestDataDict.json` (of the current dataset generation) and
+`completedQuestData.json` still match. The quest
+files of the region are checked afterwards, in the background, with
+`quest_files_fingerprint`.
+"""
+
+import os
+import json
+import hashlib
+
+STARTUP_SNAPSHOT_VERSION = 1
+
+
+def file_fingerprint(path: str) -> list | None:
+    """Returns `[modification time, size]` of the file, or `None` if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def quest_files_fingerprint(folder: str) -> str:
+    """Returns a hash of the names, modification times and sizes of the quest files in `folder`."""
+    entries = []
+    if os.path.exists(folder):
+        with os.scandir(folder) as scan:
+            for entry in scan:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    entries.append(f"{entry.name}:{stat.st_mtime_ns}:{stat.st_size}")
+    entries.sort()
+    return hashlib.sha1("\n".join(entries).encode("utf-8")).hexdigest()
+
+
+def source_fingerprints(worldQuestDataDictPath: str, completedQuestDataPath: str) -> dict:
+    return {
+        "worldQuestDataDict": file_fingerprint(worldQuestDataDictPath),
+        "completedQuestData": file_fingerprint(completedQuestDataPath),
+    }
+
+
+def save_startup_snapshot(
+    path: str,
+    regions: list,
+    region: str,
+    shownQuests: str,
+    rows: list,
+    sources: dict,
+    baseQuestPath: str,
+):
+    """Saves the snapshot. `rows` are `[questID, questName, questType, state]` of the quests listed in `region`,
+    `sources` the `source_fingerprints` of the data files."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "version": STARTUP_SNAPSHOT_VERSION,
+                "regions": regions,
+                "filter": {"region": region, "shownQuests": shownQuests},
+                "rows": rows,
+                "sources": sources,
+                "questFiles": quest_files_fingerprint(os.path.join(baseQuestPath, region)),
+            },
+            file,
+            separators=(",", ":"),
+        )
+
+
+def read_startup_snapshot(path: str) -> dict | None:
+    """Reads the snapshot, returns `None` if the file is missing, unreadable or was written by another snapshot version."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            snapshot = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("version") != STARTUP_SNAPSHOT_VERSION:
+        return None
+    return snapshot
+
+
+def load_startup_snapshot(path: str, regions: list, region: str, shownQuests: str, sources: dict) -> dict | None:
+    """Returns the snapshot if it matches the regions, the filter state and the data files, otherwise `None`."""
+    snapshot = read_startup_snapshot(path)
+    if snapshot is None:
+        return None
+    if snapshot["regions"] != regions:
+        return None
+    if snapshot["filter"] != {"region": region, "shownQuests": shownQuests}:
+        return None
+    if snapshot["sources"] != sources:
+        return None
+    return snapshot
+
+
+def remove_startup_snapshot(path: str):
+    if os.path.exists(path):
+        os.remove(path)
@@ -1,4 +1,5 @@
 import datetime
+import time
 
 def track_time(func):
     def wrapper(*args, **kwargs):
@@ -17,4 +18,27 @@ def track_time(func):
         print(f"DEBUG> Time taken by '{func.__name__}': {formatted_time}")
         
         return result
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+class StartupTimer:
+    """Records how long each stage of the startup takes, and prints them once the window is shown if `enabled`."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.start_time = time.perf_counter()
+        self.last_time = self.start_time
+        self.stages = []
+
+    def mark(self, stage: str):
+        """Ends the current stage, naming it `stage`."""
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last_time))
+        self.last_time = now
+
+    def report(self):
+        if not self.enabled:
+            return
+        total = self.last_time - self.start_time
+        breakdown = ", ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in self.stages)
+        print(f"DEBUG> Startup took {total * 1000:.0f}ms ({breakdown})")
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+
+from utils.cache_manager import imageStore
+from utils.image_functions import find_image
+
+
+class ImageCache:
+    """Least recently used cache of resized `PhotoImage`s, keyed by `(path, size)`.
+
+    The cache is bounded by the memory used by the decoded pixels (4 bytes per pixel).
+
+    `PhotoImage`s can only be created on the Tk thread, so background threads
+    `preload` images into a separate layer of decoded PIL images, which `get`
+    turns into `PhotoImage`s without touching the disk.
+    """
+
+    def __init__(self, maxBytes: int = 32 * 1024 * 1024, maxDecodedBytes: int = 8 * 1024 * 1024) -> None:
+        self.maxBytes = maxBytes
+        self.currentBytes = 0
+        # (path, size) -> (PhotoImage, size in bytes)
+        self.images = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        # (path, size) -> decoded PIL image, filled by `preload`
+        self.maxDecodedBytes = maxDecodedBytes
+        self.decodedBytes = 0
+        self.decoded = OrderedDict()
+        self.decodedLock = threading.Lock()
+
+    @staticmethod
+    def decode(path: str, size: tuple):
+        # PIL is imported on first use, it is not needed to show the window
+        from PIL import Image
+
+        # Read from the image folder, which keeps the images that are shown
+        imageStore.touch(path, hit=True)
+        with Image.open(path) as image:
+            image.load()
+            # Pre-scaled images are used as they are
+            if image.size != size:
+                # Use LANCZOS for high-quality resampling
+                return image.resize(size, Image.LANCZOS)
+            return image.copy()
+
+    def preload(self, imgPath: str, name: str, size: int):
+        """Decodes the image `name` at `size`x`size`, so that it can be shown without reading it. Safe to call from any thread."""
+        path = find_image(imgPath, name, size)
+        if path is None:
+            return
+        key = (path, (size, size))
+        # Already a PhotoImage, reading the dict from another thread is safe
+        if key in self.images:
+            return
+        with self.decodedLock:
+            if key in self.decoded:
+                return
+
+        image = self.decode(path, (size, size))
+
+        with self.decodedLock:
+            self.decoded[key] = image
+            self.decodedBytes += size * size * 4
+            while self.decodedBytes > self.maxDecodedBytes and len(self.decoded) > 1:
+                (_, (width, height)), _ = self.decoded.popitem(last=False)
+                self.decodedBytes -= width * height * 4
+
+    def get(self, path: str, size: tuple):
+        """Returns the image at `path` resized to `size`, loading it if it is not cached."""
+        key = (path, size)
+        if key in self.images:
+            self.hits += 1
+            self.images.move_to_end(key)
+            return self.images[key][0]
+
+        self.misses += 1
+        with self.decodedLock:
+            image = self.decoded.pop(key, None)
+            if image is not None:
+                self.decodedBytes -= size[0] * size[1] * 4
+        if image is None:
+            image = self.decode(path, size)
+
+        from PIL import ImageTk
+
+        photoImage = ImageTk.PhotoImage(image)
+
+        cost = size[0] * size[1] * 4
+        self.images[key] = (photoImage, cost)
+        self.currentBytes += cost
+        # Evict the least recently used images, widgets still showing them keep their own reference
+        while self.currentBytes > self.maxBytes and len(self.images) > 1:
+            _, (_, evictedCost) = self.images.popitem(last=False)
+            self.currentBytes -= evictedCost
+
+        return photoImage
+
+    def get_icon(self, imgPath: str, name: str, size: int):
+        """Returns the image `name` from the image folder at `size`x`size`, preferring the pre-scaled copy.
+
+        Returns `None` if the image has not been downloaded.
+        """
+        path = find_image(imgPath, name, size)
+        if path is None:
+            return None
+        return self.get(path, (size, size))
+
+    def clear(self):
+        self.images.clear()
+        self.currentBytes = 0
+        with self.decodedLock:
+            self.decoded.clear()
+            self.decodedBytes = 0
+
+
+# Shared by every widget that shows quest images
+imageCache = ImageCache()
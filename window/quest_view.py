@@ -0,0 +1,246 @@
+"""
+Prepared quest detail views, and the cache they are kept in.
+
+A `QuestView` holds everything `QuestDetailsFrame` needs to show a quest: the
+quest data, the rewards after the Xp to Mora conversion and the compiled runs
+of the steps and starting location. Revisiting a quest that is still cached
+does not touch the disk or parse anything.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from lib.quest_data.quest_records import Reward, load_quest_data
+from utils.data_generations import relative_quest_path
+from utils.file_watcher import is_affected
+from lib.quest_index.reward_matrix import XP_MORA_MULTIPLIER
+from window.image_cache import imageCache
+from window.render_model import RUN_IMAGE, compile_markdown, compile_steps
+
+
+def convert_rewards(rewardsList: list, convertXp: bool) -> list:
+    """Returns a copy of `rewardsList`, with the Adventure EXP added to the Mora if `convertXp` is True."""
+    rewardsList = [reward.copy() for reward in rewardsList]
+    if not convertXp:
+        return rewardsList
+
+    # Get total adventure rank xp amount
+    total_adventure_exp = sum(
+        int(reward["Value"].replace(",", ""))
+        for reward in rewardsList
+        if reward["Name"] == "Adventure EXP"
+    )
+
+    # Locate Mora object (If it exists)
+    mora_rewards = next(
+        filter(lambda reward: reward["Name"] == "Mora", rewardsList), None
+    )
+    if mora_rewards:
+        mora_rewards["Value"] = "{:,}".format(
+            int(mora_rewards["Value"].replace(",", ""))
+            + total_adventure_exp * XP_MORA_MULTIPLIER
+        )
+        # Kill the xp
+        for i, reward in enumerate(rewardsList):
+            if reward["Name"] == "Adventure EXP":
+                del rewardsList[i]
+                break
+
+    elif total_adventure_exp == 0:
+        pass  # This is normal
+    else:
+        # If there is adventure EXP but no Mora reward, replace Adventure EXP with Mora reward
+        for i, reward in enumerate(rewardsList):
+            if reward["Name"] == "Adventure EXP":
+                rewardsList[i] = Reward(
+                    "Mora",
+                    "{:,}".format(total_adventure_exp * XP_MORA_MULTIPLIER),
+                    "https://genshin-impact.fandom.com/wiki/Mora",
+                    "Item_Mora.png",
+                    "3",
+                )
+                break
+
+    return rewardsList
+
+
+class QuestView:
+    def __init__(self, path: str, questData: dict, convertXp: bool) -> None:
+        self.path = path
+        self.questData = questData
+        self.convertXp = convertXp
+
+        # Any of these are None if the quest does not have them
+        self.rewards = None
+        self.stepRuns = None
+        self.locationRuns = None
+        self.cost = 0
+
+        if questData.get("rewards") is not None:
+            self.rewards = convert_rewards(questData["rewards"], convertXp)
+        if questData.get("steps") is not None:
+            self.stepRuns = compile_steps(questData["steps"])
+        if questData.get("starting_location") is not None:
+            self.locationRuns = compile_markdown(questData["starting_location"]["text"])
+
+
+def prepare_quest_view(path: str, convertXp: bool) -> QuestView:
+    with open(path, "rb") as f:
+        content = f.read()
+    # The steps and rewards are loaded as records
+    view = QuestView(path, load_quest_data(content), convertXp)
+    # Rough size of the view in memory, used by the cache's budget
+    view.cost = len(content) * 4
+    return view
+
+
+class QuestViewCache:
+    """Least recently used cache of `QuestView`s, keyed by `(path, convertXp)`.
+
+    Bounded by the estimated memory of the views. Safe to use from the prefetch thread.
+    """
+
+    def __init__(self, maxBytes: int = 16 * 1024 * 1024) -> None:
+        self.maxBytes = maxBytes
+        self.currentBytes = 0
+        self.views = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, path: str, convertXp: bool) -> QuestView | None:
+        """Returns the cached view, without preparing it."""
+        with self.lock:
+            return self.views.get((path, convertXp))
+
+    def get(self, path: str, convertXp: bool) -> QuestView | None:
+        """Returns the view of the quest file at `path`, preparing it if it is not cached. Returns None if the file does not exist."""
+        key = (path, convertXp)
+        with self.lock:
+            if key in self.views:
+                self.hits += 1
+                self.views.move_to_end(key)
+                return self.views[key]
+            self.misses += 1
+
+        # Prepared outside of the lock, so the UI is not blocked by the prefetch thread
+        if not os.path.exists(path):
+            return None
+        view = prepare_quest_view(path, convertXp)
+
+        with self.lock:
+            if key in self.views:
+                return self.views[key]
+            self.views[key] = view
+            self.currentBytes += view.cost
+            while self.currentBytes > self.maxBytes and len(self.views) > 1:
+                _, evicted = self.views.popitem(last=False)
+                self.currentBytes -= evicted.cost
+        return view
+
+    def rebase(self, oldBase: str, newBase: str, changed: set):
+        """Moves the views of the quest files in `oldBase` to the same files in `newBase` (a new dataset generation).
+
+        The views of the `changed` files (paths relative to the bases) are dropped.
+        """
+        with self.lock:
+            views = OrderedDict()
+            for (path, convertXp), view in self.views.items():
+                relative = relative_quest_path(path, oldBase)
+                if relative is None or relative in changed:
+                    self.currentBytes -= view.cost
+                    continue
+                view.path = os.path.join(newBase, relative)
+                views[(view.path, convertXp)] = view
+            self.views = views
+
+    def invalidate_changed(self, changed: set):
+        """Removes the views of the files that changed on disk (see `utils.file_watcher.is_affected`)."""
+        with self.lock:
+            for key in [key for key in self.views if is_affected(key[0], changed)]:
+                self.currentBytes -= self.views.pop(key).cost
+
+    def invalidate(self, path: str = None):
+        """Removes the views of `path` from the cache, or every view if `path` is None."""
+        with self.lock:
+            if path is None:
+                self.views.clear()
+                self.currentBytes = 0
+                return
+            for convertXp in (False, True):
+                view = self.views.pop((path, convertXp), None)
+                if view is not None:
+                    self.currentBytes -= view.cost
+
+
+class QuestLoader:
+    """Prepares quest views in a background thread, so reading and parsing quest files does not block the UI.
+
+    `load` requests are worked on before `prefetch` requests. A new request
+    replaces any request of the same kind that has not been started yet, so
+    only the latest selection is loaded.
+    """
+
+    def __init__(self, cache: QuestViewCache) -> None:
+        self.cache = cache
+        # (path, convertXp, imgPath, callback) of the latest `load` request
+        self.request = None
+        self.pending = []
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        # Called with the condition held
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        self.condition.notify()
+
+    def load(self, path: str, convertXp: bool, imgPath: str, callback: callable):
+        """Prepares the view of `path` and decodes its images from `imgPath`, then calls `callback(view)` from the loader thread.
+
+        `view` is None if the quest could not be loaded.
+        """
+        with self.condition:
+            self.request = (path, convertXp, imgPath, callback)
+            self.start()
+
+    def prefetch(self, paths: list, convertXp: bool, imgPath: str):
+        """Prepares the views of `paths` into the cache, nearest first."""
+        with self.condition:
+            self.pending = [(path, convertXp, imgPath, None) for path in paths if path is not None]
+            self.start()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.request is None and not self.pending:
+                    self.condition.wait()
+                if self.request is not None:
+                    path, convertXp, imgPath, callback = self.request
+                    self.request = None
+                else:
+                    path, convertXp, imgPath, callback = self.pending.pop(0)
+
+            view = None
+            try:
+                view = self.cache.get(path, convertXp)
+                if view is not None:
+                    self._decode_images(view, imgPath)
+            except Exception as e:
+                print(f"Failed to load {path}: {e}")
+            if callback is not None:
+                callback(view)
+
+    def _decode_images(self, view: QuestView, imgPath: str):
+        for reward in view.rewards or []:
+            imageCache.preload(imgPath, reward["Image"], 74)
+        for kind, imageFile, _ in view.stepRuns or []:
+            if kind == RUN_IMAGE:
+                imageCache.preload(imgPath, imageFile, 20)
+
+
+# Shared by the quest details frame and the quest list
+questViewCache = QuestViewCache()
+questLoader = QuestLoader(questViewCache)
@@ -0,0 +1,147 @@
+"""
+Render model for the quest markdown.
+
+The markdown of the quest steps (◀text▶◁url▷ links and <img:id> images) is
+tokenised once into a flat list of runs, with the list prefixes and
+indentation already applied. The text widgets then only have to insert the
+runs, without parsing anything.
+
+Each run is a tuple of `(kind, text, extra)`:
+- `("text", text, None)`
+- `("link", text, url)`
+- `("image", imageFile, imageID)`
+"""
+
+import re
+
+RUN_TEXT = "text"
+RUN_LINK = "link"
+RUN_IMAGE = "image"
+
+_MARKDOWN_PATTERN = re.compile(r"◀(.*?)▶◁(.*?)▷|<img:([^>]*)>")
+
+
+class RunBuilder:
+    def __init__(self) -> None:
+        self.runs = []
+
+    def add_text(self, text: str):
+        if text == "":
+            return
+        # Special arrow character used for indentation
+        text = text.replace("🡂", "  ")
+        # Merge with the previous text run, so that it is inserted in one go
+        if self.runs and self.runs[-1][0] == RUN_TEXT:
+            self.runs[-1] = (RUN_TEXT, self.runs[-1][1] + text, None)
+        else:
+            self.runs.append((RUN_TEXT, text, None))
+
+    def add_markdown(self, markdown_string: str, image_dict: dict = None, start_text: str = ""):
+        """Adds a line of markdown, ending with a newline."""
+        self.add_text(start_text)
+        position = 0
+        for match in _MARKDOWN_PATTERN.finditer(markdown_string):
+            self.add_text(markdown_string[position : match.start()])
+            position = match.end()
+            linkText, linkUrl, imageID = match.groups()
+            if imageID is not None:
+                # Images that are not in the image dict are left out
+                if image_dict and imageID in image_dict:
+                    self.runs.append((RUN_IMAGE, image_dict[imageID], imageID))
+            elif linkText != "":
+                self.runs.append((RUN_LINK, linkText, linkUrl))
+        self.add_text(markdown_string[position:])
+        self.add_text("\n")
+
+
+def compile_markdown(markdown_string: str, image_dict: dict = None, start_text: str = "") -> list:
+    """Returns the runs of a single line of markdown."""
+    builder = RunBuilder()
+    builder.add_markdown(markdown_string, image_dict, start_text)
+    return builder.runs
+
+
+def compile_steps(steps: list) -> list:
+    """Returns the runs of a quest's `steps`, laid out the same way as the steps frame shows them.
+
+    Tags:
+    - h: headings (h2 or h3)
+    - p: paragraphs
+    - ul: unordered lists
+    - ol: ordered lists
+    - li: list items
+    """
+    builder = RunBuilder()
+
+    def _process_list(step: dict, indent_level: int):
+        list_type = step["tag"]
+        i = 0
+        for substep in step["steps"]:
+            if list_type == "ol":
+                prefix = f"{i + 1}. "
+            else:
+                prefix = "• "
+
+            if substep["tag"] == "li":
+                i += 1
+
+            if substep["tag"] in ["ul", "ol"]:
+                _process_list(substep, indent_level + 1)
+            elif substep["tag"] == "li":
+                builder.add_markdown(
+                    substep["text"],
+                    substep["img"] if "img" in substep else {},
+                    "🡂" * indent_level + prefix,
+                )
+            else:
+                raise ValueError(f"Invalid tag {substep['tag']}")
+
+    for step in steps:
+        if step["tag"] == "p":
+            builder.add_markdown(step["text"], step["img"] if "img" in step else {})
+        elif step["tag"] == "h":
+            # Add some spacing before headings
+            if builder.runs:
+                builder.add_text("\n")
+            builder.add_markdown(step["text"], step["img"] if "img" in step else {})
+        elif step["tag"] in ["ul", "ol"]:
+            _process_list(step, indent_level=1)
+        else:
+            print("WARNING: Unhandled tag", step["tag"])
+
+    return builder.runs
+
+
+def chunk_runs(runs: list, firstLines: int, linesPerChunk: int) -> list:
+    """Splits `runs` into chunks, the first holding `firstLines` lines and the rest `linesPerChunk` lines each.
+
+    Text runs are split at line ends, so every chunk (except the last) ends with a newline.
+    """
+    chunks = []
+    current = []
+    lines = 0
+    limit = firstLines
+    for run in runs:
+        if run[0] != RUN_TEXT:
+            current.append(run)
+            continue
+
+        text = run[1]
+        pieceStart = 0
+        end = text.find("\n")
+        while end != -1:
+            lines += 1
+            if lines >= limit:
+                current.append((RUN_TEXT, text[pieceStart : end + 1], None))
+                chunks.append(current)
+                current = []
+                lines = 0
+                limit = linesPerChunk
+                pieceStart = end + 1
+            end = text.find("\n", end + 1)
+        if pieceStart < len(text):
+            current.append((RUN_TEXT, text[pieceStart:], None))
+
+    if current:
+        chunks.append(current)
+    return chunks
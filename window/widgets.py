@@ -2,8 +2,8 @@ import json
 import os
 import webbrowser
 import sys
+import queue
 
-from PIL import Image, ImageTk
 from copy import deepcopy
 
 from tkinter import (
@@ -14,33 +14,48 @@ from tkinter import (
     Scrollbar,
     Label,
     Text,
+    Entry,
     Button,
     OptionMenu,
     StringVar,
+    PhotoImage,
 )
 from tkinter.messagebox import askyesno, showwarning, showerror
 from tkinter.font import Font
 from tkinter.scrolledtext import ScrolledText
 
 from utils.file_functions import name_to_id, load_json
-
-from lib.quest_extract.download_gui import resetAndDownload
-
-CURRENT_QUEST_FORMAT_VERSION = "1.1"
-
-
-def olderQuestFormatWarning(version):
-    if version != CURRENT_QUEST_FORMAT_VERSION:
-        do_update = askyesno(
-            "Old Quest Format",
-            f"The quest formatting version of the downloaded quests ({version}), is incorrect and will not work with the current quest version. {CURRENT_QUEST_FORMAT_VERSION}. Do you want to update? (Choosing NO will close the program)",
-            icon="error",
-        )
-        if do_update:
-            resetAndDownload()
-        else:
-            sys.exit()
-
+from utils.data_codec import read_data
+from utils.app_context import AppContext
+from utils.quest_tree import QuestNode, QuestTree, get_progress
+from utils.data_generations import relative_quest_path
+from utils.file_watcher import is_affected
+from utils.image_functions import find_image
+from window.image_cache import imageCache
+from window.render_model import RUN_IMAGE, RUN_LINK, chunk_runs, compile_markdown, compile_steps
+from window.quest_view import QuestView, questViewCache, questLoader
+
+from lib.quest_index.search_index import QuestSearchIndex, build_search_index
+from lib.quest_data.quest_records import QUEST_FORMAT_VERSION as CURRENT_QUEST_FORMAT_VERSION
+
+
+def olderQuestFormatWarning(version, context: AppContext):
+    # Files that could not be upgraded are not asked about again
+    if version == CURRENT_QUEST_FORMAT_VERSION or context.questFormatChecked:
+        return
+    context.questFormatChecked = True
+    do_update = askyesno(
+        "Old Quest Format",
+        f"The quest formatting version of the downloaded quests ({version}), is incorrect and will not work with the current quest version. {CURRENT_QUEST_FORMAT_VERSION}. Do you want to upgrade them? They are upgraded from the downloaded data, without downloading them again. (Choosing NO will close the program)",
+        icon="error",
+    )
+    if do_update:
+        # The upgrade is only imported when it is needed
+        from lib.quest_extract.download_gui import upgrade_quests
+
+        upgrade_quests(context)
+    else:
+        sys.exit()
 
 class ScrollableFrame(Frame):
     def __init__(self, container, *args, **kwargs):
@@ -143,9 +158,11 @@ def CreateToolTip(widget, text, track_motion=False):
     Attached to `widget` with the text `text`.
     If track_motion is True, tooltip will follow mouse movement."""
     toolTip = ToolTip(widget)
+    # Stored on the tooltip so that it can be changed later
+    toolTip.tipText = text
 
     def enter(event):
-        toolTip.id = widget.after(500, toolTip.showtip, text)
+        toolTip.id = widget.after(500, toolTip.showtip, toolTip.tipText)
 
     def leave(event):
         toolTip.hidetip()
@@ -163,17 +180,18 @@ def CreateToolTip(widget, text, track_motion=False):
 
 
 class WorldQuestFrameItem:
-    def __init__(self, path: str) -> None:
-        self.MAX_CHARS = 40
+    __slots__ = ("questName", "questType", "filePath")
+    MAX_CHARS = 40
 
-        with open(path, "r", encoding="utf-8") as f:
-            res = json.load(f)
+    def __init__(self, path: str, context: AppContext) -> None:
+        res = read_data(path)
 
         # Check if the quest format is correct
-        olderQuestFormatWarning(res["version"] if "version" in res else "-1.0")
+        olderQuestFormatWarning(res["version"] if "version" in res else "-1.0", context)
 
         self.questName = res["name"]
-        self.questType = res["type"]
+        # One of a few quest types, shared between the items
+        self.questType = sys.intern(res["type"])
         self.filePath = path
 
     def getDisplayName(self):
@@ -190,9 +208,10 @@ class WorldQuestFrameItem:
 
 
 class ErrorQuestItem:
-    def __init__(self, questID) -> None:
-        self.MAX_CHARS = 40
+    __slots__ = ("questName", "questType", "filePath")
+    MAX_CHARS = 40
 
+    def __init__(self, questID) -> None:
         self.questName = questID
         self.questType = "single"
         self.filePath = None
@@ -210,24 +229,60 @@ class ErrorQuestItem:
         return name_to_id(self.questName)
 
 
+class SearchQuestItem:
+    """A quest that is listed without reading its file: search results and rows from the startup snapshot."""
+
+    __slots__ = ("questID", "questName", "questType", "steps", "filePath")
+    MAX_CHARS = 40
+
+    def __init__(self, questID: str, questName: str, questType: str, steps: list, filePath: str) -> None:
+        self.questID = questID
+        self.questName = questName
+        self.questType = sys.intern(questType)
+        # The folders between the quests folder and the quest file
+        self.steps = steps
+        self.filePath = filePath
+
+    def getDisplayName(self):
+        if len(self.questName) >= self.MAX_CHARS:
+            return self.questName[: self.MAX_CHARS - 3] + "..."
+        return self.questName
+
+    def getQuestType(self):
+        return self.questType
+
+    def getQuestID(self):
+        return self.questID
+
+
 class WorldQuestFrame(Frame):
     def __init__(
         self,
         master,
+        context: AppContext,
         worldQuestData,
         *args,
         double_click: callable = None,
         select_listbox: callable = lambda _: None,
+        prefetch: callable = lambda _: None,
         **kwargs,
     ):  #
         self.data = []
+        self.context = context
         self.worldQuestData = worldQuestData
-        self.completedQuestData = load_json(
-            os.path.join(os.environ["dataPath"], "completedQuestData.json")
-        )
+        # Built once, used to find the quests of the current folder and their states
+        self.questTree = QuestTree(worldQuestData)
+        self.load_progress()
         self.current_region = None
         self.shown_quests = "None"  # Options: none, single, series, both
 
+        # Search mode
+        self.searchIndex = None
+        self.searchMode = False
+        self.searchQuery = ""
+        self.preSearchSteps = None
+        self.preSearchRegion = None
+
         super().__init__(master, **kwargs)
         self.pack_propagate(False)
         self.listbox = Listbox(self, fg="white", **kwargs)
@@ -246,21 +301,54 @@ class WorldQuestFrame(Frame):
         # Bind the on_item_select function to the Listbox double click event
         self.listbox.bind("<Double-Button-1>", lambda _: double_click())
         # Bind the on_item_select function to the Listbox select event
-        self.listbox.bind(
-            "<<ListboxSelect>>", lambda _: select_listbox(self.get_selected())
-        )
+        self.select_listbox = select_listbox
+        self.listbox.bind("<<ListboxSelect>>", lambda _: self.on_select())
+        # Called with the file paths of the quests next to the selected one, so they can be loaded ahead of time
+        self.prefetch = prefetch
+        self.PREFETCH_ROWS = (1, -1, 2)
+
+    # Row colours, by completion state and quest type
+    BACKGROUND_COLOURS = {
+        "completed": "#002902",
+        "uncompleted": "black",
+        "in_progress": "#0e2133",
+        "error": "red",
+    }
+    TEXT_COLOURS = {"single": "white", "series": "cyan", "act": "cyan"}
+
+    def on_select(self):
+        """Called when a listbox item is selected."""
+        selected = self.get_selected_item()
+        # Search results can be from any region or series, so move to the folder of the selected quest
+        if self.searchMode and selected is not None:
+            self.current_region = selected.steps[0]
+            self.context.questSteps = list(selected.steps)
+        self.select_listbox(self.get_selected())
+        self.prefetch_neighbours()
+
+    def prefetch_neighbours(self):
+        """Passes the quests next to the selected one to `prefetch`, nearest first."""
+        try:
+            index = self.listbox.curselection()[0]
+        except IndexError:
+            return
+        paths = []
+        for offset in self.PREFETCH_ROWS:
+            if 0 <= index + offset < len(self.data) and self.data[index + offset] is not None:
+                paths.append(self.data[index + offset].filePath)
+        self.prefetch(paths)
 
-    def append_quest(self, questID: str, completedQuestData: dict):
+    def append_quest(self, questID: str):
         """Uses a `questID` to create a WorldQuestFrameItem object and add it to the listbox and data list."""
-        path = os.path.join(os.environ["currentSelectedQuestPath"], f"{questID}.json")
+        path = self.context.quest_file(questID)
         # Check if the quest file exists
         errorFlag = False
         if os.path.exists(path):
-            item = WorldQuestFrameItem(path)
+            item = WorldQuestFrameItem(path, self.context)
         else:
             item = ErrorQuestItem(questID)
             errorFlag = True
-            os.environ["questLoadingErrorFlag"] = "True"
+            self.context.questLoadingError = True
         
         # Apply quest type filtering
         if self.shown_quests == "Single" and item.questType not in ["single"]:
@@ -271,185 +359,157 @@ class WorldQuestFrame(Frame):
             return
         # If shown_quests is "Both", show all types
         
-        name = item.getDisplayName()
-
-        self.listbox.insert("end", name)
-        # Change the colour of the text based on the quest type
-        background_colour = {
-            "completed": "#002902",
-            "uncompleted": "black",
-            "in_progress": "#0e2133",
-            "error": "red",
-        }
-        text_colour = {"single": "white", "series": "cyan", "act": "cyan"}
-
-        state = "uncompleted"
-
-        # Check what quest type the quest is
-        if item.questType in ["series", "act"]:
-            steps = (
-                os.environ["currentSelectedQuestPath"]
-                .replace(os.environ["baseQuestPath"], "")
-                .split(os.sep)[1:]
-            )
-
-            if len(steps) == 1:
-                if questID not in self.completedQuestData[steps[0]]["series"]:
-                    state = "uncompleted"
-                else:
-                    state = "in_progress"
-                    # Handle simple series: completed quests are a list of strings, not dicts
-                    completed_series = completedQuestData[steps[0]]["series"][questID]
-                    world_series = self.worldQuestData[steps[0]]["series"][questID]
-                    if (
-                        isinstance(completed_series, list)
-                        and all(not isinstance(q, dict) for q in completed_series)
-                    ):
-                        state = (
-                            "completed"
-                            if set(completed_series) == set(world_series)
-                            else "in_progress"
-                        )
-                    # If the quest is a complex series, which contain dictionaries, which contain subquests that are lists
-                    else:
-                        # Loop through the acts of the quest series
-                        for act in self.worldQuestData[steps[0]]["series"][questID]:
-                            # Check if the act is in the completed quests
-                            if act["name"] not in [
-                                act["name"]
-                                for act in completedQuestData[steps[0]]["series"][
-                                    questID
-                                ]
-                            ]:
-                                state = "in_progress"
-                                break
-                            else:
-                                # Sort the subquests of the act, and compare them to the completed quest's subquests
-                                if set(act["subquests"]) in [
-                                    set(subquest["subquests"])
-                                    for subquest in completedQuestData[steps[0]][
-                                        "series"
-                                    ][questID]
-                                ]:
-                                    state = "completed"
-                                else:
-                                    state = "in_progress"
-                                    break
-            elif len(steps) == 2:
-                # Processing acts
-
-                # No clue what this does, probably The Gourmet Supremos or something
-                if questID not in [
-                    quest["name"]
-                    for quest in self.worldQuestData[steps[0]]["series"][steps[1]]
-                ]:
-                    state = "uncompleted"
-                else:
-                    state = "in_progress"
-                    # Get all the subquests of the current act
-                    for quest in self.worldQuestData[steps[0]]["series"][steps[1]]:
-                        if quest["name"] == questID:
-                            quests = set(quest["subquests"])
-
-                    completed_quests = None
-                    # Check if the act is in the completed quests
-                    if steps[1] in completedQuestData[steps[0]]["series"]:
-                        # Get all the completed quests of the current act
-                        for quest in completedQuestData[steps[0]]["series"][steps[1]]:
-                            if quest["name"] == questID:
-                                completed_quests = set(quest["subquests"])
-
-                    if completed_quests is None:
-                        state = "uncompleted"
-                    elif quests == completed_quests:
-                        state = "completed"
-                    else:
-                        state = "in_progress"
-
-        if item.questType == "single":
-            steps = (
-                os.environ["currentSelectedQuestPath"]
-                .replace(os.environ["baseQuestPath"], "")
-                .split(os.sep)[1:]
-            )
-            if len(steps) == 1:
-                if questID in self.completedQuestData[steps[0]]["single"]:
-                    state = "completed"
-                else:
-                    state = "uncompleted"
-
-            elif len(steps) == 2:
-                # If the parent quest is not in the completed quests, set the state to uncompleted
-                if steps[1] not in self.completedQuestData[steps[0]]["series"]:
-                    state = "uncompleted"
-                elif questID in self.completedQuestData[steps[0]]["series"][steps[1]]:
-                    state = "completed"
-
-            elif len(steps) == 3:
-                # If the parent parent quest is not in the completed quests, set the state to uncompleted
-                if steps[1] not in self.completedQuestData[steps[0]]["series"]:
-                    state = "uncompleted"
-                else:
-                    current_quest = None
-                    # If the parent quest is not in the completed quests, set the state to uncompleted
-                    for quest in self.completedQuestData[steps[0]]["series"][steps[1]]:
-                        if quest["name"] == steps[2]:
-                            current_quest = quest
-                    if current_quest is None:
-                        state = "uncompleted"
-                    else:
-                        if questID in current_quest["subquests"]:
-                            state = "completed"
-
-            else:
-                showerror(
-                    "Error", f"Cannot determine the state of the quest {steps[-1]}"
-                )
-                state = "error"
-
+        state = self.get_quest_state(self.context.questSteps, questID)
         if errorFlag:
             state = "error"
+        self.insert_item(item, state)
+
+    def insert_item(self, item, state: str, index: int = None):
+        """Adds an item to the listbox and data list (at the end, or at `index`), coloured by its type and completion state."""
+        position = "end" if index is None else index
+        self.listbox.insert(position, item.getDisplayName())
         # Set the text colour of the item, according to the quest type
         self.listbox.itemconfig(
-            "end", fg=text_colour[item.questType], bg=background_colour[state]
+            position, fg=self.TEXT_COLOURS[item.questType], bg=self.BACKGROUND_COLOURS[state]
         )
-        self.data.append(item)
-
-    def load_quests(self, quests):
-        """Loads the quests from a dictionary or list into the listbox."""
-        with open(
-            os.path.join(os.environ["dataPath"], "completedQuestData.json"),
-            "r",
-            encoding="utf-8",
-        ) as f:
-            completedQuestData = json.load(f)
-        # Check if the dictionary contains "series" or "single" keys
-        # Process the single and series quest types with filtering
-        if isinstance(quests, dict) and {"series", "single"}.issubset(quests):
-            # Apply quest type filtering
-            if self.shown_quests in ["Series", "Both"]:
-                for quest in quests["series"]:
-                    self.append_quest(quest, completedQuestData)
-            if self.shown_quests in ["Single", "Both"]:
-                for quest in quests["single"]:
-                    self.append_quest(quest, completedQuestData)
+        if index is None:
+            self.data.append(item)
+        else:
+            self.data.insert(index, item)
+
+    def get_quest_state(self, steps: list, questID: str):
+        """Returns the completion state of a quest, `steps` being the folders between the quests folder and the quest."""
+        node = self.questTree.find(steps + [questID])
+        if node is None:
+            return "uncompleted"
+        return self.questTree.get_state(node, self.completed, self.started)
+
+    def set_data(self, worldQuestData: dict):
+        """Replaces the quests listed by the frame (the `regions` of `worldQuestDataDict.json`), without reloading."""
+        self.worldQuestData = worldQuestData
+        self.questTree = QuestTree(worldQuestData)
+        # Built from the previous quests, loaded again when it is next needed
+        self.searchIndex = None
+        self.load_progress()
+
+    def swap_data(self, worldQuestData: dict, oldBase: str, changed: set):
+        """Switches to the quests of a new dataset generation, `oldBase` being the previous quests folder.
+
+        The list is only reloaded if the shown folder's quests, or their files
+        (`changed`, paths relative to the quests folders), are different.
+        Otherwise the rows are just pointed at the new files.
+        """
+        oldTree = self.questTree
+        self.set_data(worldQuestData)
+        if self.searchMode:
+            # Searched again with the index of the new generation
+            self.search(self.searchQuery)
+            return
+        if self.current_region is None:
+            return
+
+        node = self.questTree.find(self.context.questSteps)
+        if node is None or not node.is_container():
+            # The shown quest series is gone, go back to the top of the region
+            self.context.set_region(self.current_region)
+            self.reload()
+            return
+
+        oldNode = oldTree.find(self.context.questSteps)
+        relativePaths = []
+        for item in self.data:
+            if item is None:
+                continue
+            relative = relative_quest_path(item.filePath, oldBase) if item.filePath is not None else None
+            relativePaths.append(relative)
+        if (
+            oldNode is None
+            or [(child.questID, child.kind) for child in node.children]
+            != [(child.questID, child.kind) for child in oldNode.children]
+            or any(relative is None or relative in changed for relative in relativePaths)
+        ):
+            self.reload_keeping_selection()
             return
 
-        # Check if the type of the quests is a list, and does not contain dictionaries
-        # Process simple quest series
-        if isinstance(quests, list) and all([not isinstance(quest, dict) for quest in quests]):
-            for quest in quests:
-                self.append_quest(quest, completedQuestData)
+        items = [item for item in self.data if item is not None]
+        for item, relative in zip(items, relativePaths):
+            item.filePath = os.path.join(self.context.baseQuestPath, relative)
+
+    def reload_keeping_selection(self):
+        selected = self.get_selected()
+        self.reload()
+        for index, item in enumerate(self.data):
+            if item is not None and selected is not None and item.getQuestID() == selected:
+                self.listbox.selection_set(index)
+                self.listbox.see(index)
+                break
+
+    def item_steps(self, item) -> list:
+        """The folders between the quests folder and the quest of a listed item."""
+        if isinstance(item, SearchQuestItem):
+            return list(item.steps)
+        return list(self.context.questSteps)
+
+    def refresh_files(self, changed: set):
+        """Refreshes the rows of the quest files that were changed on disk (see `utils.file_watcher.is_affected`)."""
+        # Built from the previous files
+        self.searchIndex = None
+        if self.searchMode:
+            if any(item is not None and is_affected(item.filePath, changed) for item in self.data):
+                self.reload_keeping_selection()
             return
 
-        # Check if the type of the quests is a list, and contains dictionaries
-        # Process complex quest series
-        if isinstance(quests, list) and all([isinstance(quest, dict) for quest in quests]):
-            for quest in quests:
-                self.append_quest(quest["name"], completedQuestData)
+        for index, item in enumerate(self.data):
+            if item is None:
+                continue
+            questID = item.getQuestID()
+            path = self.context.quest_file(questID, self.item_steps(item))
+            if not is_affected(path, changed):
+                continue
+            selected = index in self.listbox.curselection()
+            self.listbox.delete(index)
+            del self.data[index]
+            try:
+                newItem = WorldQuestFrameItem(path, self.context)
+                state = self.get_quest_state(self.item_steps(item), questID)
+            except (OSError, ValueError, KeyError):
+                # Removed, or not a readable quest file
+                newItem = ErrorQuestItem(questID)
+                state = "error"
+            self.insert_item(newItem, state, index)
+            if selected:
+                self.listbox.selection_set(index)
+
+    def refresh_states(self):
+        """Reads `completedQuestData.json` again, and recolours the rows whose completion state changed."""
+        self.load_progress()
+        for index, item in enumerate(self.data):
+            if item is None or isinstance(item, ErrorQuestItem):
+                continue
+            state = self.get_quest_state(self.item_steps(item), item.getQuestID())
+            self.listbox.itemconfig(index, bg=self.BACKGROUND_COLOURS[state])
+
+    def load_progress(self):
+        """Reads `completedQuestData.json`, and works out which quests are completed and started."""
+        self.completedQuestData = load_json(self.context.completedQuestDataPath)
+        self.completed, self.started = get_progress(self.worldQuestData, self.completedQuestData)
+
+    def load_quests(self, node: QuestNode):
+        """Loads the children of a region, quest series or act node into the listbox."""
+        if node.kind == "region":
+            # Apply quest type filtering, quest series are listed before single quests
+            if self.shown_quests in ["Series", "Both"]:
+                for child in node.children:
+                    if child.kind == "series":
+                        self.append_quest(child.questID)
+            if self.shown_quests in ["Single", "Both"]:
+                for child in node.children:
+                    if child.kind == "quest":
+                        self.append_quest(child.questID)
             return
 
-        raise ValueError("Invalid type for `quests`", type(quests))
+        for child in node.children:
+            self.append_quest(child.questID)
 
     def add_placeholder_text(self):
         """Adds placeholder text when no quests are available for the current filter."""
@@ -492,17 +552,22 @@ class WorldQuestFrame(Frame):
         self.listbox.delete(0, "end")
         self.data.clear()
 
-    def get_selected(self):
-        """Returns the quest ID of the selected quest in the listbox."""
+    def get_selected_item(self):
+        """Returns the item of the selected quest in the listbox."""
         try:
-            selected_item = self.data[self.listbox.curselection()[0]]
-            # Handle placeholder text (None items)
-            if selected_item is None:
-                return None
-            return selected_item.getQuestID()
+            # Placeholder text is stored as None
+            return self.data[self.listbox.curselection()[0]]
         except IndexError:
             return None
 
+    def get_selected(self):
+        """Returns the quest ID of the selected quest in the listbox."""
+        selected_item = self.get_selected_item()
+        # Handle placeholder text (None items)
+        if selected_item is None:
+            return None
+        return selected_item.getQuestID()
+
     def set_shown_types(self, shown_quests: str, reload: bool = True):
         """Sets the type of quests to be shown in the listbox.
 
@@ -521,9 +586,7 @@ class WorldQuestFrame(Frame):
     def set_region(self, regionName: str, reload: bool = True):
         """Sets the current region, and reloads the listbox with the quests from the region."""
         self.current_region = regionName
-        os.environ["currentSelectedQuestPath"] = os.path.join(
-            os.environ["baseQuestPath"], self.current_region
-        )
+        self.context.set_region(regionName)
         if reload:
             self.reload()
 
@@ -531,8 +594,70 @@ class WorldQuestFrame(Frame):
         """Returns the current region."""
         return self.current_region
 
+    def load_search_index(self):
+        """Loads the search index, building it from the quest files if it has not been built yet."""
+        self.searchIndex = QuestSearchIndex.load(self.context.searchIndexPath)
+        if self.searchIndex is None:
+            self.searchIndex = build_search_index(
+                self.worldQuestData, self.context.baseQuestPath, self.context.searchIndexPath
+            )
+
+    def search(self, query: str):
+        """Shows the quests matching `query` from every region. An empty query leaves search mode."""
+        if query.strip() == "":
+            if self.searchMode:
+                self.end_search()
+            return
+
+        if not self.searchMode:
+            self.searchMode = True
+            self.preSearchSteps = list(self.context.questSteps)
+            self.preSearchRegion = self.current_region
+        self.searchQuery = query
+
+        if self.searchIndex is None:
+            self.load_search_index()
+
+        self.clear_all()
+        if self.shown_quests == "None":
+            return
+        self.load_progress()
+
+        for questID, questName, questType, steps in self.searchIndex.search(query):
+            # Apply quest type filtering
+            if self.shown_quests == "Single" and questType not in ["single"]:
+                continue
+            elif self.shown_quests == "Series" and questType not in ["series", "act"]:
+                continue
+            item = SearchQuestItem(
+                questID, questName, questType, steps, self.context.quest_file(questID, steps)
+            )
+            self.insert_item(
+                item, self.get_quest_state(steps, questID)
+            )
+
+        if self.listbox.size() == 0:
+            self.listbox.insert("end", "No quests match the search.")
+            self.listbox.itemconfig(0, fg="#888888", bg=self.cget("background"))
+            self.data.append(None)
+
+    def end_search(self, restore_path: bool = True, reload: bool = True):
+        """Leaves search mode. If `restore_path` is True, goes back to where the list was before searching."""
+        self.searchMode = False
+        self.searchQuery = ""
+        if restore_path and self.preSearchSteps is not None:
+            self.context.questSteps = self.preSearchSteps
+            self.current_region = self.preSearchRegion
+        self.preSearchSteps = None
+        self.preSearchRegion = None
+        if reload:
+            self.reload()
+
     def reload(self):
         """Reloads the listbox with the quests from the current path."""
+        if self.searchMode:
+            self.search(self.searchQuery)
+            return
         self.clear_all()
         if self.current_region is None:
             return
@@ -540,46 +665,79 @@ class WorldQuestFrame(Frame):
             return
 
         # Reset the quest loading error flag at the start of each reload
-        os.environ["questLoadingErrorFlag"] = "False"
+        self.context.questLoadingError = False
 
         # Reopen the completed quest data file
-        self.completedQuestData = load_json(
-            os.path.join(os.environ["dataPath"], "completedQuestData.json")
-        )
+        self.load_progress()
 
-        steps = (
-            os.environ["currentSelectedQuestPath"]
-            .replace(os.environ["baseQuestPath"], "")
-            .split(os.sep)[1:]
-        )
-        current = self.worldQuestData
-        for step in steps:
-            # Check if the current step is valid
-            if step in current:
-                current = current[step]
-            # Check if there is a "series" key in "current"
-            elif "series" in current:
-                current = current["series"][step]
-            elif isinstance(current, list):
-                for quest in current:
-                    if quest["name"] == step:
-                        current = quest["subquests"]
-            else:
-                raise ValueError("Invalid step in path")
+        node = self.questTree.find(self.context.questSteps)
+        if node is None or not node.is_container():
+            raise ValueError("Invalid step in path")
 
-        self.load_quests(current)
+        self.load_quests(node)
         
         # Check if no quests were loaded and add placeholder text
         if self.listbox.size() == 0:
             self.add_placeholder_text()
         
-        if os.environ["questLoadingErrorFlag"] == "True":
+        if self.context.questLoadingError:
             showwarning(
                 "Error",
                 "There was an error loading one or more quests, please repair the quests and try again.",
             )
             # Reset the flag after showing the warning to prevent duplicate warnings
-            os.environ["questLoadingErrorFlag"] = "False"
+            self.context.questLoadingError = False
+
+    def get_rows(self):
+        """Returns `[questID, questName, questType, state]` of the quests listed at the top of the current region.
+
+        Returns `None` when searching, inside of a quest series, or if a quest could not be loaded.
+        """
+        if self.searchMode or self.current_region is None:
+            return None
+        if self.context.questSteps != [self.current_region]:
+            return None
+
+        rows = []
+        for item in self.data:
+            # Placeholder text
+            if item is None:
+                continue
+            if item.filePath is None:
+                return None
+            questID = os.path.splitext(os.path.basename(item.filePath))[0]
+            rows.append([questID, item.questName, item.questType, None])
+        return self.update_row_states(self.current_region, rows)
+
+    def update_row_states(self, region: str, rows: list):
+        """Returns `rows` with the completion states read from `completedQuestData.json`."""
+        self.load_progress()
+        return [
+            [
+                questID,
+                questName,
+                questType,
+                self.get_quest_state([region], questID),
+            ]
+            for questID, questName, questType, _ in rows
+        ]
+
+    def show_rows(self, rows: list):
+        """Lists `rows` (see `get_rows`) in the current region, without reading the quest files."""
+        self.clear_all()
+        for questID, questName, questType, state in rows:
+            self.insert_item(
+                SearchQuestItem(
+                    questID,
+                    questName,
+                    questType,
+                    [self.current_region],
+                    self.context.quest_file(questID, [self.current_region]),
+                ),
+                state,
+            )
+        if self.listbox.size() == 0:
+            self.add_placeholder_text()
 
     def mark_complete(self):
         """Marks a quest as complete in the `completedQuestData.json` file."""
@@ -587,30 +745,27 @@ class WorldQuestFrame(Frame):
         if len(self.listbox.curselection()) == 0:
             return
         # Load the completed quest data file
-        completedQuestData = load_json(
-            os.path.join(os.environ["dataPath"], "completedQuestData.json")
-        )
+        completedQuestData = load_json(self.context.completedQuestDataPath)
         # Add keys for all of the regions if they do not exist
         for region in self.worldQuestData:
             if region not in completedQuestData:
                 completedQuestData[region] = {"series": {}, "single": []}
         # Get the current path
-        steps = (
-            os.environ["currentSelectedQuestPath"]
-            .replace(os.environ["baseQuestPath"], "")
-            .split(os.sep)[1:]
-        )
+        steps = self.context.questSteps
         questID = self.get_selected()
+        node = self.questTree.find(steps + [questID])
+        if node is None:
+            return
 
         if len(steps) == 1:
             # Check if step is in the single quests
-            if questID in self.worldQuestData[steps[0]]["single"]:
+            if node.kind == "quest":
                 # Check if the quest is already in the completed quests
                 if questID not in completedQuestData[steps[0]]["single"]:
                     completedQuestData[steps[0]]["single"].append(questID)
 
             # Check if step is in the series quests
-            elif questID in self.worldQuestData[steps[0]]["series"]:
+            elif node.kind == "series":
                 # As this is just setting the quest as complete,
                 # we do not need to check if the quest is already in the completed quests
                 completedQuestData[steps[0]]["series"][questID] = self.worldQuestData[
@@ -619,7 +774,7 @@ class WorldQuestFrame(Frame):
 
         elif len(steps) == 2:
             # Check if the step is in the non-complex series quests
-            if questID in self.worldQuestData[steps[0]]["series"][steps[1]]:
+            if node.kind == "quest":
                 # Check if the world quest series is already in the completed quests
                 if steps[1] not in completedQuestData[steps[0]]["series"]:
                     completedQuestData[steps[0]]["series"][steps[1]] = []
@@ -648,32 +803,31 @@ class WorldQuestFrame(Frame):
                 current["subquests"].append(questID)
 
         # Save the completed quest data
-        with open(
-            os.path.join(os.environ["dataPath"], "completedQuestData.json"),
-            "w",
-            encoding="utf-8",
-        ) as f:
+        with open(self.context.completedQuestDataPath, "w", encoding="utf-8") as f:
             json.dump(completedQuestData, f, indent=4)
 
     def expand_quest_series(self, questID: str):
         """Expands the quest series of the selected quest."""
-        os.environ["currentSelectedQuestPath"] = os.path.join(
-            os.environ["currentSelectedQuestPath"], questID
-        )
+        # Expanding a search result leaves search mode, staying in the result's folder
+        if self.searchMode:
+            self.end_search(restore_path=False, reload=False)
+        node = self.questTree.find(self.context.questSteps + [questID])
+        if node is None or not node.is_container():
+            return
+        self.context.push_step(questID)
         self.reload()
 
     def collapse_quest_series(self):
         """Collapses the quest series of the selected quest."""
-        os.environ["currentSelectedQuestPath"] = os.path.dirname(
-            os.environ["currentSelectedQuestPath"]
-        )
+        self.context.pop_step()
         self.reload()
 
 
 class QuestDetailsFrame(Frame):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    def __init__(self, master, context: AppContext, *args, **kwargs):
+        super().__init__(master, *args, **kwargs)
         self.pack_propagate(False)
+        self.context = context
 
         self.questData = {
             "name": "No Quest Selected",
@@ -683,6 +837,16 @@ class QuestDetailsFrame(Frame):
             "rewards": None,
             "steps": None,
         }
+        # The prepared view of the shown quest
+        self.view = None
+        self.convertXp = False
+
+        # Background loading, every `load` gets a new generation and results of older generations are dropped
+        self.generation = 0
+        self.pendingLoad = None
+        self.loadedViews = queue.Queue()
+        self.pollAfterID = None
+        self.POLL_MS = 15
 
         self.place_widgets()
         self.format_widgets()
@@ -702,10 +866,16 @@ class QuestDetailsFrame(Frame):
             bg=self.cget("background"),
             wraplength=self.winfo_reqwidth(),
         )
-        self.questLocation = StartingLocationFrame(self, bg=self.cget("background"))
-        self.questRewards = QuestRewardFrame(self, bg=self.cget("background"))
+        self.questLocation = StartingLocationFrame(
+            self, self.context.imgPath, bg=self.cget("background")
+        )
+        self.questRewards = QuestRewardFrame(
+            self, self.context.imgPath, bg=self.cget("background")
+        )
         self.questHorizontalBar = Frame(self, height=1, bg="black")
-        self.questSteps = QuestStepsFrame(self, bg=self.cget("background"))
+        self.questSteps = QuestStepsFrame(
+            self, self.context.imgPath, bg=self.cget("background")
+        )
 
         self.questName.bind(
             "<Button-1>", lambda _: webbrowser.open(self.questData["url"])
@@ -727,6 +897,8 @@ class QuestDetailsFrame(Frame):
             "rewards": None,
             "steps": None,
         }
+        self.view = None
+        self.cancel_loading()
         self.questName.config(text=self.questData["name"])
         self.questType.config(text=self.questData["type"])
         self.questLocation.pack_forget()
@@ -755,12 +927,109 @@ class QuestDetailsFrame(Frame):
         if "steps" in self.questData and self.questData["steps"] is not None:
             self.questSteps.pack(padx=10, pady=5, fill="x")
 
-    def set_data(self, path: str):
-        if path is None or not os.path.exists(path):
+    def load(self, path: str, on_loaded: callable):
+        """Loads the quest at `path` in the background, then calls `on_loaded(view)` on the UI thread.
+
+        Loads that are superseded by a newer `load` (or a `reset`) are never passed to `on_loaded`.
+        """
+        self.generation += 1
+        self.pendingLoad = (self.generation, path, on_loaded)
+
+        # Already prepared quests are shown straight away
+        view = questViewCache.peek(path, self.convertXp)
+        if view is not None:
+            self.deliver(self.generation, path, view)
+            return
+
+        generation = self.generation
+        questLoader.load(
+            path,
+            self.convertXp,
+            self.context.imgPath,
+            lambda view: self.loadedViews.put((generation, path, view)),
+        )
+        if self.pollAfterID is None:
+            self.pollAfterID = self.after(self.POLL_MS, self.poll_loaded)
+
+    def poll_loaded(self):
+        """Applies the result of the latest load, if it has finished."""
+        self.pollAfterID = None
+        while True:
+            try:
+                generation, path, view = self.loadedViews.get_nowait()
+            except queue.Empty:
+                break
+            self.deliver(generation, path, view)
+        if self.pendingLoad is not None:
+            self.pollAfterID = self.after(self.POLL_MS, self.poll_loaded)
+
+    def deliver(self, generation: int, path: str, view: QuestView | None):
+        # Stale results are dropped
+        if self.pendingLoad is None or generation != self.pendingLoad[0]:
+            return
+        on_loaded = self.pendingLoad[2]
+        self.pendingLoad = None
+        if view is None:
             print(f"Quest file does not exist: {path.split(os.sep)[-1]}")
             return
-        with open(path, "r", encoding="utf-8") as f:
-            self.questData = json.load(f)
+        on_loaded(view)
+
+    def finish_loading(self):
+        """Finishes the pending load on the UI thread, for actions that need the details of the selected quest."""
+        if self.pendingLoad is None:
+            return
+        generation, path, _ = self.pendingLoad
+        self.deliver(generation, path, questViewCache.get(path, self.convertXp))
+
+    def cancel_loading(self):
+        self.generation += 1
+        self.pendingLoad = None
+
+    def swap_generation(self, oldBase: str, changed: set, on_loaded: callable):
+        """Points the shown quest at the new dataset generation, `oldBase` being the previous quests folder.
+
+        The quest is only loaded again if its file is in `changed` (paths relative to the quests folders).
+        """
+        if self.pendingLoad is not None:
+            # Load the quest that was being loaded from the new generation instead
+            _, path, on_loaded = self.pendingLoad
+            self.cancel_loading()
+            relative = relative_quest_path(path, oldBase)
+            if relative is not None:
+                self.load(os.path.join(self.context.baseQuestPath, relative), on_loaded)
+            return
+        if self.view is None:
+            return
+        relative = relative_quest_path(self.view.path, oldBase)
+        if relative is None:
+            # Already moved to the new generation by `questViewCache.rebase`
+            return
+        path = os.path.join(self.context.baseQuestPath, relative)
+        if relative not in changed:
+            self.view.path = path
+        elif os.path.exists(path):
+            self.load(path, on_loaded)
+        else:
+            self.reset()
+
+    def refresh_files(self, changed: set, on_loaded: callable):
+        """Loads the shown quest again if its file was changed on disk (see `utils.file_watcher.is_affected`)."""
+        if self.pendingLoad is not None:
+            _, path, pendingOnLoaded = self.pendingLoad
+            if is_affected(path, changed):
+                # The file may have been read before it changed
+                self.load(path, pendingOnLoaded)
+            return
+        if self.view is None or not is_affected(self.view.path, changed):
+            return
+        if os.path.exists(self.view.path):
+            self.load(self.view.path, on_loaded)
+        else:
+            self.reset()
+
+    def show_view(self, view: QuestView):
+        self.view = view
+        self.questData = view.questData
 
         self.questName.config(text=self.questData["name"])
 
@@ -768,19 +1037,18 @@ class QuestDetailsFrame(Frame):
         self.questType.config(text=questTypeText)
 
         # If the starting location is not N/A, set the starting location
-        if (
-            "starting_location" in self.questData
-            and self.questData["starting_location"] is not None
-        ):
-            self.questLocation.set_start(self.questData["starting_location"])
+        if view.locationRuns is not None:
+            self.questLocation.set_start(
+                self.questData["starting_location"], runs=view.locationRuns
+            )
 
         # If the rewards are not N/A, set the rewards
-        if "rewards" in self.questData and self.questData["rewards"] is not None:
-            self.questRewards.set_rewards(self.questData["rewards"])
+        if view.rewards is not None:
+            self.questRewards.set_rewards(view.rewards)
 
         # If the steps are not N/A, set the steps
-        if "steps" in self.questData and self.questData["steps"] is not None:
-            self.questSteps.set_steps(self.questData["steps"])
+        if view.stepRuns is not None:
+            self.questSteps.set_steps(self.questData["steps"], stepRuns=view.stepRuns)
 
         self.format_widgets()
 
@@ -791,9 +1059,13 @@ class QuestDetailsFrame(Frame):
         return self.questData["type"]
 
     def set_axp_mora_convert(self, value: bool):
-        self.questRewards.convertXp = value
-        if "rewards" in self.questData and self.questData["rewards"] is not None:
-            self.questRewards.set_rewards(self.questData["rewards"])
+        self.convertXp = value
+        if self.view is not None:
+            # Only the rewards depend on the conversion
+            view = questViewCache.get(self.view.path, self.convertXp)
+            if view is not None and view.rewards is not None:
+                self.view = view
+                self.questRewards.set_rewards(view.rewards)
 
 
 class QuestReward(Frame):
@@ -827,7 +1099,6 @@ class QuestReward(Frame):
         self.canvas.pack()
         self.imageDirPath = imgPath
 
-        self.questInfoDict = questInfoDict
         self.rarity_colours = [
             "#a0a0a0",
             "#a0a0a0",
@@ -837,24 +1108,12 @@ class QuestReward(Frame):
             "#de9053",
         ]
 
-        # Check if image exists
-        if os.path.exists(os.path.join(self.imageDirPath, self.questInfoDict["Image"])):
-            imgPath = os.path.join(self.imageDirPath, self.questInfoDict["Image"])
-        else:
-            imgPath = os.path.join(self.imageDirPath, "74.png")
-
-        # Load the image and resize it
-        self.image = Image.open(imgPath)
-        self.image = self.image.resize(
-            (74, 74), Image.LANCZOS
-        )  # Use LANCZOS for high-quality resampling
-        self.photo_image = ImageTk.PhotoImage(self.image)
-
-        self.canvas.create_rectangle(
-            1, 1, 74, 89, fill=self.rarity_colours[int(self.questInfoDict["Rarity"])]
+        # The canvas items are created once, and changed by `set_reward`
+        self.backgroundItem = self.canvas.create_rectangle(
+            1, 1, 74, 89
         )  # Draw the main rectangle FIXME: Use proper colour
-        self.canvas.create_image(
-            1, 1, anchor="nw", image=self.photo_image
+        self.imageItem = self.canvas.create_image(
+            1, 1, anchor="nw"
         )  # Place the image at the top left corner
         self.canvas.create_rectangle(
             1, 1, 74, 89, outline="black"
@@ -862,20 +1121,41 @@ class QuestReward(Frame):
         self.canvas.create_rectangle(
             1, 75, 74, 90, outline="black", fill="white"
         )  # Add a rectangle around the text
-        self.canvas.create_text(
+        self.textItem = self.canvas.create_text(
             37,
             83,
-            text=f"{self.questInfoDict['Value']}",
             anchor="center",
             font=("Arial", 10),
         )  # Add text below the image
 
-        CreateToolTip(self, text=self.questInfoDict["Name"])
+        self.toolTip = CreateToolTip(self, text="")
+        self.canvas.bind("<Button-1>", self.on_click)
+
+        self.set_reward(questInfoDict, click_event=click_event)
 
-        if click_event is not None:
-            self.canvas.bind("<Button-1>", click_event)
+    def set_reward(self, questInfoDict: dict, click_event: callable = None):
+        """Shows another reward on this tile. If `click_event` is None, clicking the tile opens the reward's link."""
+        self.questInfoDict = questInfoDict
+        self.click_event = click_event
+
+        # Get the resized image from the shared cache, using the placeholder if it does not exist
+        self.photo_image = imageCache.get_icon(
+            self.imageDirPath, self.questInfoDict["Image"], 74
+        ) or imageCache.get_icon(self.imageDirPath, "74.png", 74)
+
+        self.canvas.itemconfig(
+            self.backgroundItem,
+            fill=self.rarity_colours[int(self.questInfoDict["Rarity"])],
+        )
+        self.canvas.itemconfig(self.imageItem, image=self.photo_image)
+        self.canvas.itemconfig(self.textItem, text=f"{self.questInfoDict['Value']}")
+        self.toolTip.tipText = self.questInfoDict["Name"]
+
+    def on_click(self, event):
+        if self.click_event is not None:
+            self.click_event(event)
         else:
-            self.canvas.bind("<Button-1>", self.open_link)
+            self.open_link()
 
     def open_link(self, *args, **kwargs):
         resp = askyesno(
@@ -887,22 +1167,30 @@ class QuestReward(Frame):
 
 
 class QuestRewardFrame(Frame):
-    def __init__(self, parent, *args, **kwargs):
+    def __init__(self, parent, imgPath: str, *args, **kwargs):
         # Create frame that is the same width as the parent
         super().__init__(parent, *args, **kwargs)
         self.parent = parent
         self.max_x = 9
-        self.imgPath = os.environ["imgPath"]
-        self.convertXp = False
+        self.imgPath = imgPath
 
-    def rewards_popup(self, rewardsList: list):
+        # Pools of reward tiles, shown in this frame and in the rewards popup
+        self.rewardTiles = []
+        self.popup = None
+        self.popupFrame = None
+        self.popupTiles = []
+
+    def rewards_popup(self, rewardsList: list, title: str = "Rewards", reward_click: callable = None):
+        """Shows `rewardsList` in a popup. If `reward_click` is given, it is called with a reward when it is clicked, instead of opening its link."""
         rewardsList = deepcopy(rewardsList)
-        popup = Toplevel(self)
-        popup.title("Rewards")
-        popup.resizable(False, False)
-        frame = Frame(popup)
-        frame.pack(padx=5, pady=5)
-        current_pos = [0, 0]
+        # The popup and its tiles are reused, closing it only hides it
+        if self.popup is None:
+            self.popup = Toplevel(self)
+            self.popup.resizable(False, False)
+            self.popup.protocol("WM_DELETE_WINDOW", self.popup.withdraw)
+            self.popupFrame = Frame(self.popup)
+            self.popupFrame.pack(padx=5, pady=5)
+        self.popup.title(title)
         max_width = 6
         rewardsList.append(
             {
@@ -913,79 +1201,50 @@ class QuestRewardFrame(Frame):
                 "Rarity": "1",
             }
         )
-        for reward in rewardsList:
-            r = QuestReward(
-                frame,
-                self.imgPath,
-                questInfoDict=reward,
-                click_event=(lambda _: popup.destroy())
+        for i, reward in enumerate(rewardsList):
+            click_event = (
+                (lambda _: self.popup.withdraw())
                 if reward["Link"] is None
-                else None,
+                else (lambda _, reward=reward: reward_click(reward))
+                if reward_click is not None
+                else None
+            )
+            r = self.get_tile(self.popupTiles, self.popupFrame, i, reward, click_event)
+            r.grid(row=i // max_width, column=i % max_width, padx=1, pady=1)
+        for r in self.popupTiles[len(rewardsList):]:
+            r.grid_remove()
+        self.popup.deiconify()
+        self.popup.lift()
+
+    def get_tile(self, tiles: list, parent, index: int, reward: dict, click_event: callable = None):
+        """Returns the tile at `index` of the pool `tiles` showing `reward`, creating it if the pool is too small."""
+        if index < len(tiles):
+            tiles[index].set_reward(reward, click_event=click_event)
+        else:
+            tiles.append(
+                QuestReward(parent, self.imgPath, questInfoDict=reward, click_event=click_event)
             )
-            r.grid(row=current_pos[0], column=current_pos[1], padx=1, pady=1)
-            current_pos[1] += 1
-            if current_pos[1] >= max_width:
-                current_pos[0] += 1
-                current_pos[1] = 0
+        return tiles[index]
 
     def set_rewards(self, rewardsList: list):
-        self.clear_rewards()
+        """Shows the rewards, any Xp to Mora conversion is done by `window.quest_view.convert_rewards` beforehand."""
         show_more_flag = False
-        xp_multiplier = 10
-
-        if self.convertXp:
-            # Get total adventure rank xp amount
-            adventure_exp_rewards = filter(
-                lambda reward: reward["Name"] == "Adventure EXP", rewardsList
-            )
-            adventure_exp_values = map(
-                lambda reward: int(reward["Value"].replace(",", "")),
-                adventure_exp_rewards,
-            )
-            total_adventure_exp = sum(adventure_exp_values)
-
-            # Locate Mora object (If it exists)
-            mora_rewards = next(
-                filter(lambda reward: reward["Name"] == "Mora", rewardsList), None
-            )
-            if mora_rewards:
-                mora_rewards["Value"] = "{:,}".format(
-                    int(mora_rewards["Value"].replace(",", ""))
-                    + total_adventure_exp * xp_multiplier
-                )
-                # Kill the xp
-                for i, reward in enumerate(rewardsList):
-                    if reward["Name"] == "Adventure EXP":
-                        del rewardsList[i]
-                        break
-
-            elif total_adventure_exp == 0:
-                pass  # This is normal
-            else:
-                # If there is adventure EXP but no Mora reward, replace Adventure EXP with Mora reward
-                for i, reward in enumerate(rewardsList):
-                    if reward["Name"] == "Adventure EXP":
-                        rewardsList[i] = {
-                            "Name": "Mora",
-                            "Value": "{:,}".format(total_adventure_exp * xp_multiplier),
-                            "Link": "https://genshin-impact.fandom.com/wiki/Mora",
-                            "Image": "Item_Mora.png",
-                            "Rarity": "3",
-                        }
-                        break
 
         if len(rewardsList) > self.max_x:
             temp = rewardsList
             rewardsList = rewardsList[: self.max_x - 1]
             show_more_flag = True
-        for reward in rewardsList:
-            r = QuestReward(self, self.imgPath, questInfoDict=reward)
+        # Tiles are taken from the pool in order, so hidden tiles are always at the end of the packing order
+        for i, reward in enumerate(rewardsList):
+            r = self.get_tile(self.rewardTiles, self, i, reward)
             r.pack(side="left", padx=1)
+        shown = len(rewardsList)
         if show_more_flag:
-            r = QuestReward(
+            r = self.get_tile(
+                self.rewardTiles,
                 self,
-                self.imgPath,
-                questInfoDict={
+                shown,
+                {
                     "Name": "More",
                     "Value": f"{str(len(temp) - self.max_x + 1)}",
                     "Link": None,
@@ -995,11 +1254,92 @@ class QuestRewardFrame(Frame):
                 click_event=lambda _: self.rewards_popup(temp),
             )
             r.pack(side="left", padx=1)
+            shown += 1
+        for r in self.rewardTiles[shown:]:
+            r.pack_forget()
 
     def clear_rewards(self):
-        for widget in self.winfo_children():
-            widget.destroy()
-        self.nextPos = [0, 0]
+        # Hide the tiles, they are reused by the next `set_rewards`
+        for widget in self.rewardTiles:
+            widget.pack_forget()
+
+
+class LinkTagHandler:
+    """Handles every link of a text widget with shared tags and one set of bindings.
+
+    The url of a link is looked up in a side table, using the start index of the
+    link's tag range. Links alternate between two tags so that links next to each
+    other never merge into a single range.
+    """
+
+    TAGS = ("link", "link_alt")
+
+    def __init__(self, text_widget) -> None:
+        self.text_widget = text_widget
+        # Start index of a link -> url
+        self.urls = {}
+        self.nextTag = 0
+        self.toolTip = ToolTip(text_widget)
+
+        for tag in self.TAGS:
+            self.text_widget.tag_config(tag, foreground="blue", underline=True)
+            self.text_widget.tag_bind(tag, "<Button-1>", self.click_handler)
+            self.text_widget.tag_bind(tag, "<Enter>", self.enter_handler)
+            self.text_widget.tag_bind(tag, "<Leave>", self.leave_handler)
+            self.text_widget.tag_bind(tag, "<Motion>", self.motion_handler)
+
+    def next_tag(self):
+        """Returns the tag to insert the next link with."""
+        tag = self.TAGS[self.nextTag]
+        self.nextTag = 1 - self.nextTag
+        return tag
+
+    def add_links(self, start_index: str, links: list):
+        """Records the `(url, tag)` of each link inserted from `start_index`, in the order they were inserted."""
+        position = start_index
+        for url, tag in links:
+            linkRange = self.text_widget.tag_nextrange(tag, position)
+            if not linkRange:
+                return
+            self.urls[str(linkRange[0])] = url
+            position = linkRange[1]
+
+    def clear(self):
+        self.urls.clear()
+        self.nextTag = 0
+        self.toolTip.hidetip()
+
+    def url_at_pointer(self):
+        """Returns the url of the link under the mouse pointer."""
+        for tag in self.text_widget.tag_names("current"):
+            if tag in self.TAGS:
+                linkRange = self.text_widget.tag_prevrange(tag, "current + 1c")
+                if linkRange:
+                    return self.urls.get(str(linkRange[0]))
+        return None
+
+    def click_handler(self, event):
+        url = self.url_at_pointer()
+        if url:
+            webbrowser.open_new(url)
+
+    def enter_handler(self, event):
+        self.text_widget.config(cursor="hand2")
+        self.restart_tooltip()
+
+    def leave_handler(self, event):
+        self.text_widget.config(cursor="")
+        self.toolTip.hidetip()
+
+    def motion_handler(self, event):
+        # Always restart the timer - tooltip only shows after 500ms of no movement
+        self.restart_tooltip()
+
+    def restart_tooltip(self):
+        self.toolTip.hidetip()
+        url = self.url_at_pointer()
+        if url:
+            self.toolTip.id = self.text_widget.after(500, self.toolTip.showtip, url)
 
 
 class MarkdownTextGenerator:
@@ -1011,6 +1351,8 @@ class MarkdownTextGenerator:
         imageHost: list,
         imgDict: dict = {},
         startText: str = "",
+        linkHandler: LinkTagHandler = None,
+        lazyImages: dict = None,
     ):
         self.markdown_string = data_string
         self.text_widget = text_widget
@@ -1018,127 +1360,67 @@ class MarkdownTextGenerator:
         self.imgpath = imgPath
         self.imageDict = imgDict
         self.startText = startText
-
-        self.linkMode = False
-        self.imageMode = False
-        self.textBuffer = ""
-        self.linkText = ""
-        self.links = []  # Store link information for click handling
-        self.link_counter = 0  # Instance variable for unique link IDs
+        # Shared by everything inserted into the text widget
+        self.linkHandler = linkHandler if linkHandler is not None else LinkTagHandler(text_widget)
+        # If given, images are inserted as placeholders and recorded here, to be loaded when they come into view
+        self.lazyImages = lazyImages
 
     def insert_text(self, text, is_link=False, url=None):
         if text == "":
             return
-
-        start_index = self.text_widget.index("end-1c")
-        self.text_widget.insert("end", text)
-        end_index = self.text_widget.index("end-1c")
-
         if is_link and url:
-            # Create a unique tag name using the instance counter
-            tag_name = f"link_{self.link_counter}"
-            self.link_counter += 1
-
-            self.text_widget.tag_add(tag_name, start_index, end_index)
-            self.text_widget.tag_config(tag_name, foreground="blue", underline=True)
-
-            # Store link info for reference
-            self.links.append(url)
-
-            # Create functions instead of lambdas to comply with E731
-            def click_handler(event, link_url=url):
-                webbrowser.open_new(link_url)
-
-            def enter_handler(event, link_url=url):
-                self.text_widget.config(cursor="hand2")
-                # Create a new tooltip instance for this specific link
-                tooltip = ToolTip(self.text_widget)
-                # Store tooltip reference in the tag for cleanup
-                setattr(self.text_widget, f"{tag_name}_tooltip", tooltip)
-                # Schedule tooltip after 500ms delay
-                tooltip.id = self.text_widget.after(500, tooltip.showtip, link_url)
-
-            def leave_handler(event):
-                self.text_widget.config(cursor="")
-                # Get and cleanup the tooltip for this tag
-                tooltip = getattr(self.text_widget, f"{tag_name}_tooltip", None)
-                if tooltip:
-                    tooltip.hidetip()
-                    delattr(self.text_widget, f"{tag_name}_tooltip")
-
-            def motion_handler(event):
-                # Always cancel and restart tooltip timer on ANY mouse movement
-                tooltip = getattr(self.text_widget, f"{tag_name}_tooltip", None)
-                if tooltip:
-                    # Cancel any existing timer or hide existing tooltip
-                    if tooltip.id:
-                        self.text_widget.after_cancel(tooltip.id)
-                    if tooltip.tipwindow:
-                        tooltip.hidetip()
-                    # Always restart the timer - tooltip only shows after 500ms of no movement
-                    tooltip.id = self.text_widget.after(500, tooltip.showtip, url)
-
-            # Bind events with the URL-capturing functions
-            self.text_widget.tag_bind(tag_name, "<Button-1>", click_handler)
-            self.text_widget.tag_bind(tag_name, "<Enter>", enter_handler)
-            self.text_widget.tag_bind(tag_name, "<Leave>", leave_handler)
-            self.text_widget.tag_bind(tag_name, "<Motion>", motion_handler)
-
-    def insert_image(self, image):
-        # Remove the img: from the image string
-        image = image.replace("img:", "")
-
-        if image not in self.imageDict:
-            return
-
-        # Get the image path
-        image_path = os.path.join(self.imgpath, self.imageDict[image])
-
-        if not os.path.exists(image_path):
-            return
-
-        try:
-            # Load the image with pillow
-            img = Image.open(image_path)
-            # Resize the image
-            img = img.resize((20, 20), Image.LANCZOS)
-            # Convert the image to a Tkinter PhotoImage
-            img_tk = ImageTk.PhotoImage(img)
-            # Prevent the image from being garbage collected
-            self.imageHost.append(img_tk)
-            # Insert the image into the text widget
-            self.text_widget.image_create("end", image=img_tk)
-        except Exception:
-            # If image loading fails, insert placeholder text
-            self.insert_text(f"[{image}]")
-
-    def insert_image_with_dict(self, image, image_dict):
-        # Remove the img: from the image string
-        image = image.replace("img:", "")
+            tag = self.linkHandler.next_tag()
+            self.insert_segments([text, tag], [(url, tag)])
+        else:
+            self.insert_segments([text, ()], [])
 
-        if image_dict is None or image not in image_dict:
+    def insert_segments(self, segments: list, links: list):
+        """Inserts `[text, tags, text, tags, ...]` in a single insert. `links` are the `(url, tag)` of the links in `segments`, in order."""
+        if not segments:
             return
-
-        # Get the image path
-        image_path = os.path.join(self.imgpath, image_dict[image])
-
-        if not os.path.exists(image_path):
+        start_index = self.text_widget.index("end-1c")
+        self.text_widget.insert("end", *segments)
+        if links:
+            self.linkHandler.add_links(start_index, links)
+
+    def insert_image(self, image_file: str, image_id: str):
+        if self.lazyImages is not None:
+            # Missing images are skipped, as when they are loaded right away
+            if find_image(self.imgpath, image_file, 20) is None:
+                return
+            name = self.text_widget.image_create("end", image=self.lazyImages["placeholder"])
+            self.lazyImages[name] = (image_file, image_id)
             return
-
         try:
-            # Load the image with pillow
-            img = Image.open(image_path)
-            # Resize the image
-            img = img.resize((20, 20), Image.LANCZOS)
-            # Convert the image to a Tkinter PhotoImage
-            img_tk = ImageTk.PhotoImage(img)
+            # Get the resized image from the shared cache
+            img_tk = imageCache.get_icon(self.imgpath, image_file, 20)
+            if img_tk is None:
+                return
             # Prevent the image from being garbage collected
             self.imageHost.append(img_tk)
             # Insert the image into the text widget
             self.text_widget.image_create("end", image=img_tk)
         except Exception:
             # If image loading fails, insert placeholder text
-            self.insert_text(f"[{image}]")
+            self.insert_text(f"[{image_id}]")
+
+    def insert_runs(self, runs: list):
+        """Inserts compiled runs (see `window.render_model`), with one insert per stretch of text between images."""
+        pending = []
+        pendingLinks = []
+        for kind, text, extra in runs:
+            if kind == RUN_IMAGE:
+                self.insert_segments(pending, pendingLinks)
+                pending = []
+                pendingLinks = []
+                self.insert_image(text, extra)
+            elif kind == RUN_LINK:
+                tag = self.linkHandler.next_tag()
+                pending.extend((text, tag))
+                pendingLinks.append((extra, tag))
+            else:
+                pending.extend((text, ()))
+        self.insert_segments(pending, pendingLinks)
 
     def insert_markdown(self, markdown_string=None, start_text="", image_dict=None):
         # Use provided arguments or fall back to instance variables
@@ -1147,77 +1429,25 @@ class MarkdownTextGenerator:
         if image_dict is None:
             image_dict = self.imageDict
 
-        # Reset buffer states for clean processing
-        self.linkMode = False
-        self.imageMode = False
-        self.textBuffer = ""
-        self.linkText = ""
-
-        full_text = f"{start_text}{markdown_string}"
-
-        for char in full_text:
-            # Check for the start of a link
-            if char == "◀":
-                # Insert any buffered text first
-                self.insert_text(self.textBuffer)
-                self.textBuffer = ""
-                self.linkMode = True
-                continue
-
-            # Check for the end of the visible text content of a link
-            elif char == "▶" and self.linkMode:
-                self.linkText = self.textBuffer
-                self.textBuffer = ""
-                continue
-
-            # Check for the start of link URL
-            elif char == "◁" and self.linkMode:
-                continue
-
-            # Check for the end of a link
-            elif char == "▷" and self.linkMode:
-                # Insert the link
-                self.insert_text(self.linkText, is_link=True, url=self.textBuffer)
-                self.textBuffer = ""
-                self.linkText = ""
-                self.linkMode = False
-                continue
-
-            # Check for start of image
-            elif char == "<":
-                self.insert_text(self.textBuffer)
-                self.textBuffer = ""
-                self.imageMode = True
-                continue
-
-            # Check for end of image
-            elif char == ">" and self.imageMode:
-                self.insert_image_with_dict(self.textBuffer, image_dict)
-                self.textBuffer = ""
-                self.imageMode = False
-                continue
-
-            # Handle special arrow character
-            elif char == "🡂":
-                self.textBuffer += "  "
-                continue
-
-            # Add character to buffer
-            self.textBuffer += char
-
-        # Insert any remaining text
-        self.insert_text(self.textBuffer)
-        self.text_widget.insert("end", "\n")
+        self.insert_runs(compile_markdown(markdown_string, image_dict, start_text))
 
 
 class QuestStepsFrame(Frame):
-    def __init__(self, root, *args, **kwargs):
+    def __init__(self, root, imgPath: str, *args, **kwargs):
         super().__init__(root, *args, **kwargs)
 
-        self.imgPath = os.environ["imgPath"]
+        self.imgPath = imgPath
         self.image_host = []
         self.steps = []
 
+        # The first chunk fills the visible part of the steps, the rest are inserted in the background
+        self.FIRST_CHUNK_LINES = 40
+        self.CHUNK_LINES = 150
+        self.pendingChunks = []
+        self.chunkAfterID = None
+        self.imageAfterID = None
+        self.markdown_generator = None
+
         # Get the default tkinter font but make it size 10
         default_font = Font(root=root, size=10)
 
@@ -1230,75 +1460,31 @@ class QuestStepsFrame(Frame):
             wrap="word",
         )
         self.text_widget.pack(fill="both", expand=True, ipadx=0, ipady=0)
+        # One set of link bindings, shared by every quest shown
+        self.linkHandler = LinkTagHandler(self.text_widget)
 
-    def set_steps(self, stepsDict: dict):
-        # Tags to process:
-        # - h: headings (h2 or h3)
-        # - p: paragraphs
-        # - ul: unordered lists
-        # - ol: ordered lists
-        # - li: list items
+        # Images are shown as blank placeholders of the same size until they are scrolled into view
+        self.lazyImages = {"placeholder": PhotoImage(master=self.text_widget, width=20, height=20)}
+        # Scrolling (and inserting) calls the yscrollcommand, which is used to load the images that came into view
+        self.text_widget.configure(yscrollcommand=self.on_scroll)
 
+    def set_steps(self, stepsDict: dict, stepRuns: list = None):
+        """Shows the quest steps. `stepRuns` are the steps already compiled by `window.render_model`, they are compiled here if not given."""
         self.clear_steps()
-        self.text_widget.configure(state="normal")
 
         # Create a single MarkdownTextGenerator instance for all steps
-        markdown_generator = MarkdownTextGenerator(
-            self.text_widget, "", self.imgPath, self.image_host
+        self.markdown_generator = MarkdownTextGenerator(
+            self.text_widget,
+            "",
+            self.imgPath,
+            self.image_host,
+            linkHandler=self.linkHandler,
+            lazyImages=self.lazyImages,
         )
 
-        def _process_list(step: dict, indent_level: int):
-            list_type = step["tag"]
-            i = 0
-            for substep in step["steps"]:
-                if list_type == "ol":
-                    prefix = f"{i + 1}. "
-                else:
-                    prefix = "• "
-
-                if substep["tag"] == "li":
-                    i += 1
-
-                _process_list_item(substep, indent_level, prefix)
-
-        def _process_list_item(step: dict, indent_level: int, prefix: str):
-            if step["tag"] in ["ul", "ol"]:
-                _process_list(step, indent_level + 1)
-            elif step["tag"] == "li":
-                _process_li(step, prefix, indent_level)
-            else:
-                raise ValueError(f"Invalid tag {step['tag']}")
-
-        def _process_li(step: dict, prefix: str, indent_level: int):
-            newPrefix = "🡂" * indent_level + prefix
-            # Use the new parameter-based approach
-            markdown_generator.insert_markdown(
-                markdown_string=step["text"],
-                start_text=newPrefix,
-                image_dict=step["img"] if "img" in step else {},
-            )
-
-        def _process_p(step: dict):
-            # Use the new parameter-based approach
-            markdown_generator.insert_markdown(
-                markdown_string=step["text"],
-                start_text="",
-                image_dict=step["img"] if "img" in step else {},
-            )
-
         try:
-            for step in stepsDict:
-                if step["tag"] == "p":
-                    _process_p(step)
-                elif step["tag"] == "h":
-                    # Add some spacing before headings
-                    if self.text_widget.get("1.0", "end-1c"):  # If not empty
-                        self.text_widget.insert("end", "\n")
-                    _process_p(step)
-                elif step["tag"] in ["ul", "ol"]:
-                    _process_list(step, indent_level=1)
-                else:
-                    print("WARNING: Unhandled tag", step["tag"])
+            if stepRuns is None:
+                stepRuns = compile_steps(stepsDict)
         except Exception as e:
             showerror(
                 "Error",
@@ -1306,33 +1492,88 @@ class QuestStepsFrame(Frame):
             )
             raise e
 
+        self.pendingChunks = chunk_runs(stepRuns, self.FIRST_CHUNK_LINES, self.CHUNK_LINES)
+        # The first screenful is shown straight away
+        self.insert_next_chunk()
+        self.scroll_to_top()
+
+    def insert_next_chunk(self):
+        self.chunkAfterID = None
+        if not self.pendingChunks:
+            return
+        self.text_widget.configure(state="normal")
+        self.markdown_generator.insert_runs(self.pendingChunks.pop(0))
         self.text_widget.configure(state="disabled")
+        if self.pendingChunks:
+            self.chunkAfterID = self.after(1, self.insert_next_chunk)
+
+    def on_scroll(self, first, last):
+        self.text_widget.vbar.set(first, last)
+        if len(self.lazyImages) > 1 and self.imageAfterID is None:
+            self.imageAfterID = self.after_idle(self.load_visible_images)
+
+    def load_visible_images(self):
+        """Replaces the placeholders that are in view with their images."""
+        self.imageAfterID = None
+        top = self.text_widget.index("@0,0")
+        bottom = self.text_widget.index(f"@0,{self.text_widget.winfo_height()} lineend")
+        visible = [
+            name
+            for name in self.lazyImages
+            if name != "placeholder"
+            and self.text_widget.compare(name, ">=", top)
+            and self.text_widget.compare(name, "<=", bottom)
+        ]
+        if not visible:
+            return
 
-        self.scroll_to_top()
+        for name in visible:
+            image_file, image_id = self.lazyImages.pop(name)
+            try:
+                # Get the resized image from the shared cache
+                img_tk = imageCache.get_icon(self.imgPath, image_file, 20)
+            except Exception:
+                img_tk = None
+            if img_tk is None:
+                # The placeholder stays, inserting or deleting text would move the links after it
+                continue
+            # Prevent the image from being garbage collected
+            self.image_host.append(img_tk)
+            self.text_widget.image_configure(name, image=img_tk)
 
     def clear_steps(self):
+        # Stop inserting the steps of the previous quest
+        if self.chunkAfterID is not None:
+            self.after_cancel(self.chunkAfterID)
+            self.chunkAfterID = None
+        if self.imageAfterID is not None:
+            self.after_cancel(self.imageAfterID)
+            self.imageAfterID = None
+        self.pendingChunks = []
+        self.lazyImages = {"placeholder": self.lazyImages["placeholder"]}
+
         # Set the text widget to be editable
         self.text_widget.configure(state="normal")
         self.text_widget.delete("1.0", "end")
         self.text_widget.configure(state="disabled")
+        self.linkHandler.clear()
         self.steps = []
         self.image_host = []
 
     def scroll_to_top(self):
-        # Scroll to the end of the text widget
-        self.text_widget.see("end")
-        # Scroll to the top of the text widget
-        self.text_widget.see("1.0")
+        # Only the top of the text is laid out, the rest is laid out as it is scrolled to
+        self.text_widget.yview_moveto(0)
 
 
 class StartingLocationFrame(Frame):
-    def __init__(self, root, *args, **kwargs):
+    def __init__(self, root, imgPath: str, *args, **kwargs):
         super().__init__(root, *args, **kwargs)
         self.internal_frame = Frame(self, bg=self.cget("background"))
         self.internal_frame.pack(anchor="n", side="top")
-        self.imgPath = os.environ["imgPath"]
+        self.imgPath = imgPath
 
-    def set_start(self, infodict):
+    def set_start(self, infodict, runs: list = None):
+        """Shows the starting location. `runs` is the location already compiled by `window.render_model`, it is compiled here if not given."""
         self.clear_start()
 
         # Create a Text widget for the markdown content
@@ -1358,7 +1599,10 @@ class StartingLocationFrame(Frame):
         markdown_generator = MarkdownTextGenerator(
             text_widget, infodict["text"], self.imgPath, [], startText="Location: "
         )
-        markdown_generator.insert_markdown()
+        if runs is None:
+            markdown_generator.insert_markdown()
+        else:
+            markdown_generator.insert_runs(runs)
 
         # Apply center alignment to all text
         text_widget.tag_add("center", "1.0", "end")
@@ -1382,6 +1626,7 @@ class FilterFrame(Frame):
         update_type_command: callable = None,
         open_world_quest_command: callable = None,
         back_world_quest_command: callable = None,
+        search_command: callable = None,
         **kwargs,
     ):
         super().__init__(root, *args, bg=root.cget("background"), **kwargs)
@@ -1392,6 +1637,8 @@ class FilterFrame(Frame):
         self.update_region_command = update_region_command
         self.open_world_quest_command = open_world_quest_command
         self.back_world_quest_command = back_world_quest_command
+        self.search_command = search_command
+        self.searchAfterID = None
         self.place_widgets()
 
     def place_widgets(self):
@@ -1402,9 +1649,10 @@ class FilterFrame(Frame):
             self.regionFrame, text="Region: ", bg=self.cget("background")
         )
         self.regionLabel.pack(side="left")
+        self.regionText = StringVar(self, self.regions[0])
         self.regionDropdown = OptionMenu(
             self.regionFrame,
-            StringVar(self, self.regions[0]),
+            self.regionText,
             *self.regions,
             command=lambda _: self.update_region(),
         )
@@ -1427,6 +1675,18 @@ class FilterFrame(Frame):
 
         self.leftSide.pack(side="left")
 
+        self.searchFrame = Frame(self, bg=self.cget("background"))
+        self.searchLabel = Label(
+            self.searchFrame, text="Search: ", bg=self.cget("background")
+        )
+        self.searchLabel.pack(side="left")
+        self.searchText = StringVar(self, "")
+        self.searchEntry = Entry(self.searchFrame, textvariable=self.searchText, width=30)
+        self.searchEntry.pack(side="left")
+        self.searchEntry.bind("<Escape>", lambda _: self.searchText.set(""))
+        self.searchText.trace_add("write", lambda *_: self.schedule_search())
+        self.searchFrame.pack(side="left", padx=10)
+
         self.rightSide = Frame(self, bg=self.cget("background"))
         self.questSeriesOpenButton = Button(
             self.rightSide,
@@ -1452,6 +1712,46 @@ class FilterFrame(Frame):
     def update_region(self):
         self.update_region_command(self.regionDropdown.cget("text"))
 
+    def schedule_search(self):
+        # Wait for a short pause in typing before searching
+        if self.searchAfterID is not None:
+            self.after_cancel(self.searchAfterID)
+        self.searchAfterID = self.after(150, self.run_search)
+
+    def run_search(self):
+        self.searchAfterID = None
+        if self.search_command is not None:
+            self.search_command(self.searchText.get())
+
+    def clear_search(self):
+        """Empties the search box without running a search."""
+        self.searchText.set("")
+        # Cancel the search scheduled by emptying the box
+        if self.searchAfterID is not None:
+            self.after_cancel(self.searchAfterID)
+            self.searchAfterID = None
+
+    def get_filter(self):
+        """Returns the region and quest type selected in the dropdowns."""
+        return self.regionDropdown.cget("text"), self.questTypeDropdown.cget("text")
+
+    def set_regions(self, regions: list):
+        """Replaces the regions in the region dropdown, keeping the selected region if it still exists."""
+        self.regions = regions
+        menu = self.regionDropdown["menu"]
+        menu.delete(0, "end")
+        for region in regions:
+            menu.add_command(
+                label=region,
+                command=lambda region=region: (self.regionText.set(region), self.update_region()),
+            )
+        if self.regionText.get() not in regions:
+            self.regionText.set(regions[0])
+
+    def set_region_text(self, region: str):
+        """Changes the region shown in the region dropdown, without reloading."""
+        self.regionText.set(region)
+
     def update(self):
         # Call the commands with reload=False to avoid multiple reload() calls
         self.update_region_command(self.regionDropdown.cget("text"), reload=False)